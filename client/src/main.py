@@ -6,12 +6,15 @@ import threading
 import shutil
 import tempfile
 import requests
+import urllib3
 import subprocess
 import atexit
 import signal
 import datetime
 import psutil
 import logging
+import hashlib
+import zlib
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QLineEdit, QPushButton, 
                             QTabWidget, QProgressBar, QMessageBox, QFileDialog,
@@ -19,6 +22,12 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QObject, QTimer, QSize, QSettings
 from PyQt5.QtGui import QIcon, QPixmap, QFont, QColor, QPalette
 
+# zstd - необязательная зависимость: без неё сервер отдаёт моды в gzip
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -36,6 +45,9 @@ VERSION = "1.0.0"
 CONFIG_FILE = "config.json"
 MINECRAFT_DIR = os.path.join(os.getenv('APPDATA'), '.minecraft')
 
+# Постоянный кэш модов: между запусками скачиваются только изменённые файлы
+MODS_CACHE_DIR = os.path.join(os.getenv('APPDATA'), 'ZalypaSPB', 'mods')
+
 # Временная директория для загрузки файлов
 TEMP_DIR = tempfile.mkdtemp()
 logger.info(f"Создана временная директория: {TEMP_DIR}")
@@ -110,51 +122,384 @@ class KeyVerifier(QObject):
             logger.error(f"Ошибка при проверке ключа: {e}")
             self.result_signal.emit({"valid": False, "message": str(e)})
 
+# Максимальное суммарное ожидание в очереди сервера загрузок (секунд)
+MAX_QUEUE_WAIT = 600
+
+# Ошибки обрыва соединения, после которых загрузка продолжается с места остановки.
+# Тело ответа читается напрямую из urllib3 (response.raw), поэтому его исключения
+# не оборачиваются в исключения requests и перечисляются отдельно
+TRANSFER_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    urllib3.exceptions.HTTPError
+)
+
+# Количество попыток докачки после обрыва соединения
+MAX_TRANSFER_ATTEMPTS = 5
+
+# Пауза перед следующей попыткой после обрыва
+def transfer_retry_delay(attempt):
+    return min(2 ** attempt, 30)
+
+# Запрос к серверу загрузок с учётом очереди: при 503/429 с Retry-After
+# запрос повторяется через указанное время, сохраняя место в очереди
+def request_with_retry_after(method, url, on_wait=None, **kwargs):
+    waited = 0
+    while True:
+        response = requests.request(method, url, **kwargs)
+        retry_after = response.headers.get('Retry-After')
+        if response.status_code not in (429, 503) or not retry_after or not retry_after.isdigit():
+            return response
+        
+        delay = max(1, min(int(retry_after), 60))
+        if waited + delay > MAX_QUEUE_WAIT:
+            return response
+        
+        response.close()
+        logger.info(f"Сервер загрузок занят, повтор через {delay} с: {url}")
+        if on_wait:
+            on_wait(delay)
+        time.sleep(delay)
+        waited += delay
+
 # Класс для загрузки файлов
 class FileDownloader(QObject):
     progress_signal = pyqtSignal(int)
     finished_signal = pyqtSignal(str)
     error_signal = pyqtSignal(str)
     
-    def __init__(self, url, key, destination):
+    def __init__(self, url, key, destination, temporary=True, etag=None):
         super().__init__()
         self.url = url
         self.key = key
         self.destination = destination
+        # Временные файлы удаляются при выходе, файлы кэша модов - нет
+        self.temporary = temporary
+        # ETag ожидаемой версии файла: докачка возможна только если он не изменился
+        self.etag = etag
     
     def download(self):
+        last_error = None
+        
+        for attempt in range(1, MAX_TRANSFER_ATTEMPTS + 1):
+            try:
+                if self.download_attempt():
+                    # Добавление файла в список на удаление при выходе
+                    if self.temporary:
+                        files_to_delete.append(self.destination)
+                    
+                    self.finished_signal.emit(self.destination)
+                    return True
+                return False
+            except TRANSFER_ERRORS as e:
+                # Обрыв соединения: следующая попытка продолжит с уже скачанного байта
+                last_error = e
+                logger.warning(f"Обрыв загрузки {self.url} (попытка {attempt}): {e}")
+                time.sleep(transfer_retry_delay(attempt))
+            except Exception as e:
+                logger.error(f"Ошибка при загрузке файла: {e}")
+                self.error_signal.emit(f"Ошибка загрузки: {str(e)}")
+                return False
+        
+        logger.error(f"Ошибка при загрузке файла: {last_error}")
+        self.error_signal.emit(f"Ошибка загрузки: {str(last_error)}")
+        return False
+    
+    def download_attempt(self):
+        # Создание заголовков для авторизации по ключу лоадера
+        headers = {"X-Loader-Key": self.key}
+        
+        # Если часть файла уже скачана, запрашиваем только остаток без сжатия.
+        # If-Range гарантирует, что при смене версии сервер вернёт файл целиком
+        offset = os.path.getsize(self.destination) if os.path.exists(self.destination) else 0
+        if offset > 0:
+            headers["Range"] = f"bytes={offset}-"
+            headers["Accept-Encoding"] = "identity"
+            if self.etag:
+                headers["If-Range"] = self.etag
+        else:
+            headers["Accept-Encoding"] = "zstd, gzip" if zstandard else "gzip"
+        
+        # Запрос файла
+        response = request_with_retry_after('GET', self.url, headers=headers, stream=True, timeout=30)
+        
+        if response.status_code == 416:
+            # Локальный файл не меньше серверного - начинаем заново
+            os.remove(self.destination)
+            return self.download_attempt()
+        
+        if response.status_code == 206:
+            mode = 'ab'
+        elif response.status_code == 200:
+            mode = 'wb'
+            offset = 0
+        else:
+            self.error_signal.emit(f"Ошибка загрузки: {response.status_code}")
+            return False
+        
+        # Получение общего размера файла (для сжатого ответа - размер сжатых данных)
+        total_size = offset + int(response.headers.get('content-length', 0))
+        decompressor = self.create_decompressor(response.headers.get('content-encoding'))
+        
+        # Открытие файла для записи (дозапись при докачке).
+        # Сжатый поток распаковывается на лету, на диск пишется исходный файл
+        with open(self.destination, mode) as f:
+            downloaded = offset
+            for chunk in response.raw.stream(65536, decode_content=False):
+                if chunk:
+                    f.write(decompressor.decompress(chunk) if decompressor else chunk)
+                    downloaded += len(chunk)
+                    progress = int((downloaded / total_size) * 100) if total_size > 0 else 0
+                    self.progress_signal.emit(progress)
+            
+            if decompressor and hasattr(decompressor, 'flush'):
+                f.write(decompressor.flush())
+        
+        return True
+    
+    @staticmethod
+    def create_decompressor(encoding):
+        """Потоковый распаковщик для Content-Encoding ответа"""
+        if not encoding or encoding == 'identity':
+            return None
+        if encoding == 'gzip':
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if encoding == 'zstd' and zstandard:
+            return zstandard.ZstdDecompressor().decompressobj()
+        raise ValueError(f"Неподдерживаемое сжатие ответа: {encoding}")
+
+# Функция для подсчёта SHA-256 файла
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Адрес чанка (совпадает с серверным): первые 128 бит SHA-256 содержимого
+def chunk_digest(data):
+    return hashlib.sha256(data).hexdigest()[:32]
+
+# Класс для синхронизации модов по манифесту сервера
+class ModSynchronizer(QObject):
+    progress_signal = pyqtSignal(int)
+    status_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal(list)
+    error_signal = pyqtSignal(str)
+    
+    # Количество чанков в одном запросе к серверу
+    CHUNK_BATCH_SIZE = 64
+    # Сборка из чанков выгодна, если локально уже есть хотя бы такая доля файла,
+    # иначе файл скачивается целиком (в сжатом виде и с докачкой)
+    MIN_CHUNK_REUSE = 0.1
+    
+    def __init__(self, key, mods_dir=MODS_CACHE_DIR):
+        super().__init__()
+        self.key = key
+        self.mods_dir = mods_dir
+        self.manifest_file = os.path.join(mods_dir, 'manifest.json')
+        self.headers = {"X-Loader-Key": key}
+    
+    def load_local_manifest(self):
+        """Загружает манифест последней успешной синхронизации"""
         try:
-            # Создание заголовков для авторизации
-            headers = {"Authorization": f"Bearer {self.key}"}
-            
-            # Запрос файла
-            response = requests.get(self.url, headers=headers, stream=True)
-            
-            if response.status_code != 200:
-                self.error_signal.emit(f"Ошибка загрузки: {response.status_code}")
+            with open(self.manifest_file, 'r') as f:
+                return json.load(f)
+        except Exception:
+            return {'mods': []}
+    
+    def is_up_to_date(self, mod, local_mod):
+        """Файл не нужно скачивать, если его хеш совпадает с манифестом и файл на месте"""
+        path = os.path.join(self.mods_dir, mod['name'])
+        if not local_mod or local_mod.get('sha256') != mod['sha256']:
+            return False
+        return os.path.exists(path) and os.path.getsize(path) == mod['size']
+    
+    def build_chunk_map(self, local_mods):
+        """Адрес чанка -> (локальный файл, смещение, размер) по предыдущему манифесту"""
+        chunk_map = {}
+        for local_mod in local_mods.values():
+            path = os.path.join(self.mods_dir, local_mod['name'])
+            if not os.path.exists(path) or os.path.getsize(path) != local_mod['size']:
+                continue
+            offset = 0
+            for digest, size in local_mod.get('chunks', []):
+                chunk_map.setdefault(digest, (path, offset, size))
+                offset += size
+        return chunk_map
+    
+    def fetch_manifest(self, local_manifest):
+        """Запрашивает манифест с чанками; если моды не менялись, сервер отвечает 304"""
+        headers = dict(self.headers)
+        if local_manifest.get('version'):
+            headers["If-None-Match"] = f'"{local_manifest["version"]}-chunks"'
+        
+        response = requests.get(f"{API_URL}/mods/manifest", params={"chunks": "1"}, headers=headers, timeout=30)
+        if response.status_code == 304:
+            return local_manifest
+        if response.status_code != 200:
+            message = response.json().get('message', response.status_code)
+            raise RuntimeError(f"Ошибка получения списка модов: {message}")
+        return response.json()
+    
+    def download_whole(self, mod, tmp_path, on_progress):
+        """Скачивает файл целиком"""
+        errors = []
+        downloader = FileDownloader(
+            f"{API_URL}/download/{mod['name']}",
+            self.key,
+            tmp_path,
+            temporary=False,
+            etag=f'"{mod["sha256"]}"'
+        )
+        downloader.error_signal.connect(errors.append)
+        downloader.progress_signal.connect(on_progress)
+        if not downloader.download():
+            raise RuntimeError(errors[0] if errors else f"Ошибка загрузки {mod['name']}")
+    
+    def assemble_from_chunks(self, mod, chunk_map, tmp_path, on_progress):
+        """
+        Собирает новую версию файла: совпадающие чанки берутся из локальных файлов,
+        недостающие запрашиваются у сервера пачками
+        """
+        missing = []
+        sources = {}
+        try:
+            with open(tmp_path, 'wb') as out:
+                offset = 0
+                for digest, size in mod['chunks']:
+                    data = None
+                    if digest in chunk_map:
+                        path, source_offset, _ = chunk_map[digest]
+                        if path not in sources:
+                            sources[path] = open(path, 'rb')
+                        sources[path].seek(source_offset)
+                        data = sources[path].read(size)
+                        if chunk_digest(data) != digest:
+                            data = None
+                    
+                    if data is None:
+                        missing.append((digest, size, offset))
+                    else:
+                        out.seek(offset)
+                        out.write(data)
+                    offset += size
+                
+                logger.info(f"{mod['name']}: из кэша {len(mod['chunks']) - len(missing)} чанков, загружается {len(missing)}")
+                
+                for i in range(0, len(missing), self.CHUNK_BATCH_SIZE):
+                    self.fetch_chunks(mod, missing[i:i + self.CHUNK_BATCH_SIZE], out)
+                    on_progress(int(min(i + self.CHUNK_BATCH_SIZE, len(missing)) * 100 / len(missing)))
+        finally:
+            for source in sources.values():
+                source.close()
+    
+    def fetch_chunks(self, mod, batch, out):
+        """
+        Запрашивает пачку чанков и записывает их на свои места в файле.
+        После обрыва соединения повторно запрашиваются только ещё не полученные чанки
+        """
+        pending = list(batch)
+        last_error = None
+        for attempt in range(1, MAX_TRANSFER_ATTEMPTS + 1):
+            try:
+                response = request_with_retry_after(
+                    'POST',
+                    f"{API_URL}/mods/chunks",
+                    on_wait=lambda delay: self.status_signal.emit(f"Ожидание в очереди загрузок ({delay} с)..."),
+                    json={"chunks": [digest for digest, _, _ in pending]},
+                    headers=self.headers,
+                    stream=True,
+                    timeout=30
+                )
+                if response.status_code != 200:
+                    raise RuntimeError(f"Ошибка загрузки чанков {mod['name']}: {response.status_code}")
+                
+                with response:
+                    while pending:
+                        digest, size, chunk_offset = pending[0]
+                        data = b''
+                        while len(data) < size:
+                            part = response.raw.read(size - len(data))
+                            if not part:
+                                break
+                            data += part
+                        if len(data) != size:
+                            # Соединение закрылось раньше конца ответа
+                            raise requests.ConnectionError(f"Ответ оборвался на чанке {digest}")
+                        if chunk_digest(data) != digest:
+                            raise RuntimeError(f"Повреждённый чанк в {mod['name']}")
+                        out.seek(chunk_offset)
+                        out.write(data)
+                        pending.pop(0)
                 return
+            except TRANSFER_ERRORS as e:
+                last_error = e
+                logger.warning(f"Обрыв загрузки чанков {mod['name']} (попытка {attempt}): {e}")
+                time.sleep(transfer_retry_delay(attempt))
+        
+        raise RuntimeError(f"Ошибка загрузки чанков {mod['name']}: {last_error}")
+    
+    def sync(self):
+        try:
+            os.makedirs(self.mods_dir, exist_ok=True)
+            
+            self.status_signal.emit("Получение списка модов...")
+            local_manifest = self.load_local_manifest()
+            manifest = self.fetch_manifest(local_manifest)
+            mods = manifest.get('mods', [])
+            local_mods = {mod['name']: mod for mod in local_manifest.get('mods', [])}
+            
+            # Сравнение с локальной копией: скачиваются только изменённые файлы
+            changed = [mod for mod in mods if not self.is_up_to_date(mod, local_mods.get(mod['name']))]
+            total_bytes = sum(mod['size'] for mod in changed) or 1
+            done_bytes = 0
+            chunk_map = self.build_chunk_map(local_mods) if changed else {}
+            
+            logger.info(f"Модов в манифесте: {len(mods)}, требуют загрузки: {len(changed)}")
+            
+            for mod in changed:
+                self.status_signal.emit(f"Загрузка {mod['name']}...")
+                destination = os.path.join(self.mods_dir, mod['name'])
+                tmp_path = destination + '.part'
+                on_progress = lambda p, base=done_bytes, size=mod['size']: self.progress_signal.emit(
+                    int((base + size * p / 100) * 100 / total_bytes)
+                )
+                
+                # Изменения внутри файла: качаются только отличающиеся чанки
+                reused = sum(size for digest, size in mod.get('chunks', []) if digest in chunk_map)
+                if mod.get('chunks') and reused >= mod['size'] * self.MIN_CHUNK_REUSE:
+                    self.assemble_from_chunks(mod, chunk_map, tmp_path, on_progress)
+                else:
+                    self.download_whole(mod, tmp_path, on_progress)
+                
+                if file_sha256(tmp_path) != mod['sha256']:
+                    os.remove(tmp_path)
+                    self.error_signal.emit(f"Контрольная сумма {mod['name']} не совпадает")
+                    return
+                
+                os.replace(tmp_path, destination)
+                done_bytes += mod['size']
             
-            # Получение общего размера файла
-            total_size = int(response.headers.get('content-length', 0))
-            
-            # Открытие файла для записи
-            with open(self.destination, 'wb') as f:
-                downloaded = 0
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        progress = int((downloaded / total_size) * 100) if total_size > 0 else 0
-                        self.progress_signal.emit(progress)
+            # Удаление модов, которых больше нет в манифесте
+            names = {mod['name'] for mod in mods}
+            for name in local_mods:
+                if name not in names:
+                    path = os.path.join(self.mods_dir, name)
+                    if os.path.exists(path):
+                        os.remove(path)
+                        logger.info(f"Удалён устаревший мод: {name}")
             
-            # Добавление файла в список на удаление при выходе
-            files_to_delete.append(self.destination)
+            with open(self.manifest_file, 'w') as f:
+                json.dump(manifest, f)
             
-            self.finished_signal.emit(self.destination)
+            self.progress_signal.emit(100)
+            self.finished_signal.emit([os.path.join(self.mods_dir, mod['name']) for mod in mods])
             
         except Exception as e:
-            logger.error(f"Ошибка при загрузке файла: {e}")
-            self.error_signal.emit(f"Ошибка загрузки: {str(e)}")
+            logger.error(f"Ошибка при синхронизации модов: {e}")
+            self.error_signal.emit(f"Ошибка синхронизации модов: {str(e)}")
 
 # Класс для запуска Minecraft
 class MinecraftLauncher(QObject):
@@ -481,31 +826,35 @@ class LoaderWindow(QMainWindow):
         
         self.log("Подготовка к запуску Minecraft...")
         self.status_label.setText("Подготовка к запуску...")
-        
-        # Загрузка необходимых файлов
-        # В реальном приложении здесь был бы код для загрузки модов и других файлов
-        
-        # Для примера, делаем вид, что загружаем файлы
         self.progress_bar.setValue(0)
-        self.status_label.setText("Загрузка модов...")
         
-        # В реальном приложении вы бы загружали настоящие файлы с сервера
-        # Для примера создадим временный файл
-        mod_file = os.path.join(TEMP_DIR, "example_mod.jar")
-        with open(mod_file, 'w') as f:
-            f.write("Это имитация мода для Minecraft")
+        self.launch_button.setEnabled(False)
+        self.verify_button.setEnabled(False)
+        
+        # Синхронизация модов с сервером в отдельном потоке
+        self.mod_synchronizer = ModSynchronizer(self.key)
+        self.mod_sync_thread = QThread()
+        self.mod_synchronizer.moveToThread(self.mod_sync_thread)
         
-        # Добавление файла в список на удаление
-        files_to_delete.append(mod_file)
+        self.mod_synchronizer.progress_signal.connect(self.progress_bar.setValue)
+        self.mod_synchronizer.status_signal.connect(self.update_minecraft_status)
+        self.mod_synchronizer.error_signal.connect(self.on_mod_sync_error)
+        self.mod_synchronizer.finished_signal.connect(self.on_mods_synced)
+        self.mod_sync_thread.started.connect(self.mod_synchronizer.sync)
         
-        # Имитация процесса загрузки
-        for i in range(101):
-            self.progress_bar.setValue(i)
-            if i % 10 == 0:
-                self.log(f"Загрузка модов: {i}%")
-            time.sleep(0.01)
+        self.download_threads.append(self.mod_sync_thread)
+        self.mod_sync_thread.start()
+    
+    def on_mod_sync_error(self, error):
+        self.mod_sync_thread.quit()
+        self.mod_sync_thread.wait()
+        self.on_minecraft_error(error)
+    
+    def on_mods_synced(self, mod_files):
+        self.mod_sync_thread.quit()
+        self.mod_sync_thread.wait()
         
-        self.log("Моды успешно загружены")
+        self.log(f"Моды синхронизированы ({len(mod_files)} файлов)")
         self.status_label.setText("Запуск игры...")
         
         # Создание и запуск потока для запуска Minecraft
@@ -518,9 +867,6 @@ class LoaderWindow(QMainWindow):
         self.minecraft_launcher.finished_signal.connect(self.on_minecraft_finished)
         self.minecraft_thread.started.connect(self.minecraft_launcher.launch)
         
-        self.launch_button.setEnabled(False)
-        self.verify_button.setEnabled(False)
-        
         self.minecraft_thread.start()
     
     def update_minecraft_status(self, status):
@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, create_engine, Table
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Index, UniqueConstraint, create_engine, Table
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, literal
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.ext.compiler import compiles
 import os
 import secrets
 import string
@@ -58,6 +60,29 @@ def generate_random_string(length=16):
     characters = string.ascii_letters + string.digits
     return ''.join(secrets.choice(characters) for _ in range(length))
 
+# SQL-выражение "дата + N секунд", где N может быть колонкой
+class add_seconds(FunctionElement):
+    """Прибавляет к дате количество секунд на стороне базы данных"""
+    type = DateTime()
+    name = "add_seconds"
+    inherit_cache = True
+
+@compiles(add_seconds)
+def _compile_add_seconds(element, compiler, **kw):
+    timestamp, seconds = list(element.clauses)
+    return "(%s + %s * INTERVAL '1 second')" % (
+        compiler.process(timestamp, **kw),
+        compiler.process(seconds, **kw)
+    )
+
+@compiles(add_seconds, "sqlite")
+def _compile_add_seconds_sqlite(element, compiler, **kw):
+    timestamp, seconds = list(element.clauses)
+    return "datetime(%s, '+' || %s || ' seconds')" % (
+        compiler.process(timestamp, **kw),
+        compiler.process(seconds, **kw)
+    )
+
 # Модель пользователя
 class User(Base):
     __tablename__ = "users"
@@ -79,6 +104,9 @@ class User(Base):
     last_login = Column(DateTime, nullable=True)
     last_ip = Column(String(45), nullable=True)  # IPv6 может быть до 45 символов
     
+    # Время последнего изменения (для синхронизации изменений в админ-панели)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, index=True)
+    
     # Отношения
     keys = relationship("Key", back_populates="user")
     created_invites = relationship("Invite", back_populates="created_by", foreign_keys="Invite.created_by_id")
@@ -100,12 +128,13 @@ class Key(Base):
 
     id = Column(Integer, primary_key=True)
     key = Column(String(50), unique=True, nullable=False, default=lambda: generate_random_string(32))
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     created_at = Column(DateTime, server_default=func.now())
     activated_at = Column(DateTime, nullable=True)
-    expires_at = Column(DateTime, nullable=False)  # Явный столбец для даты истечения
+    expires_at = Column(DateTime, nullable=False, index=True)  # Явный столбец для даты истечения
     duration = Column(Integer, nullable=False, default=86400)  # Длительность в секундах (по умолчанию 1 день)
     is_active = Column(Boolean, default=True)  # Активен ли ключ (можно отозвать)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, index=True)
     
     # Отношения
     user = relationship("User", back_populates="keys")
@@ -141,7 +170,10 @@ class Key(Base):
 
     @classmethod
     def create_custom_key(cls, db, duration_hours=24, user_id=None, custom_key=None):
-        """Создает ключ с заданными параметрами"""
+        """
+        Создает ключ с заданными параметрами. Изменения не фиксируются: вызывающий
+        код делает db.commit(), чтобы ключ и события сайта записались одной транзакцией
+        """
         duration_seconds = duration_hours * 3600
         expires_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=duration_seconds)
         
@@ -159,11 +191,56 @@ class Key(Base):
             key.key = custom_key
         
         db.add(key)
-        db.commit()
-        db.refresh(key)
+        db.flush()
         
         return key
 
+    @classmethod
+    def redeem(cls, db, key_string, user_id):
+        """
+        Привязывает свободный ключ к пользователю одним условным UPDATE.
+        Срок действия отсчитывается заново от момента активации на duration секунд.
+        Возвращает (ключ, None) при успехе или (None, код_ошибки):
+        not_found, expired, inactive, taken.
+        При успехе UPDATE не фиксируется: вызывающий код делает db.commit() вместе
+        с событием key_redeemed. При ошибке транзакция откатывается здесь же
+        """
+        now = datetime.datetime.utcnow()
+        
+        redeemed = db.query(Key).filter(
+            Key.key == key_string,
+            Key.user_id == None,
+            Key.is_active == True,
+            Key.expires_at > now
+        ).update({
+            "user_id": user_id,
+            "activated_at": now,
+            "expires_at": add_seconds(literal(now, DateTime()), Key.duration)
+        }, synchronize_session=False)
+        
+        # Состояние ключа читаем уже после UPDATE (в той же транзакции): при успехе
+        # для ответа, при неудаче - чтобы понять причину
+        key = db.query(Key).filter(Key.key == key_string).populate_existing().first()
+        if redeemed == 1:
+            return key, None
+        
+        if not key:
+            error = "not_found"
+        elif key.is_expired():
+            error = "expired"
+        elif not key.is_active:
+            error = "inactive"
+        elif key.user_id != user_id:
+            error = "taken"
+        else:
+            # Ключ уже принадлежит этому пользователю
+            return key, None
+        
+        # UPDATE открыл пишущую транзакцию даже без изменённых строк: если её не закрыть,
+        # сессия держит блокировку (на SQLite следующая запись получает "database is locked")
+        db.rollback()
+        return None, error
+
 # Модель инвайт-кода
 class Invite(Base):
     __tablename__ = "invites"
@@ -175,6 +252,7 @@ class Invite(Base):
     expires_at = Column(DateTime, nullable=False)
     used = Column(Boolean, default=False)
     used_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, index=True)
     
     # Отношения
     created_by = relationship("User", back_populates="created_invites", foreign_keys=[created_by_id])
@@ -184,6 +262,75 @@ class Invite(Base):
         """Проверяет, истёк ли инвайт-код"""
         return datetime.datetime.utcnow() > self.expires_at
 
+# Удалённые строки: по ним админ-панель убирает записи при синхронизации изменений
+class DeletedRow(Base):
+    __tablename__ = "deleted_rows"
+    
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String(50), nullable=False)
+    row_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_deleted_rows_table_deleted_at", "table_name", "deleted_at"),
+    )
+
+# Состояние Discord бота, которое должно переживать перезапуск (курсоры фоновых задач и т.п.)
+class BotState(Base):
+    __tablename__ = "bot_state"
+    
+    name = Column(String(100), primary_key=True)
+    value = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+# Очередь изменений ролей Discord: на участника и роль хранится одна запись
+# с последним нужным действием, повторная постановка её перезаписывает
+class RoleChange(Base):
+    __tablename__ = "role_changes"
+    
+    id = Column(Integer, primary_key=True)
+    guild_id = Column(String(30), nullable=False)
+    discord_id = Column(String(30), nullable=False)
+    role_id = Column(String(30), nullable=False)
+    action = Column(String(10), nullable=False)  # add или remove
+    revision = Column(Integer, nullable=False, default=0)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow, index=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint("guild_id", "discord_id", "role_id", name="uq_role_changes_member_role"),
+    )
+
+# Исходящие события сайта для Discord бота (ключи, баны, привязка Discord).
+# Сайт записывает событие в той же транзакции, бот обрабатывает и удаляет
+class DomainEvent(Base):
+    __tablename__ = "domain_events"
+    
+    id = Column(Integer, primary_key=True)
+    event_type = Column(String(30), nullable=False)
+    user_id = Column(Integer, nullable=True)
+    # Discord ID на момент события: после отвязки у пользователя его уже нет
+    discord_id = Column(String(30), nullable=True)
+    payload = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+# Отправленные Discord ботом напоминания об окончании подписки: одно на пользователя,
+# окно (24h, 1h) и момент истечения, поэтому после продления напоминание придёт снова
+class SentReminder(Base):
+    __tablename__ = "sent_reminders"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    window = Column(String(10), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    sent_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "window", "expires_at", name="uq_sent_reminders_user_window"),
+    )
+
 # Модель кода для привязки Discord аккаунта
 class DiscordCode(Base):
     __tablename__ = "discord_codes"
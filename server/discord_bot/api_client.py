@@ -0,0 +1,157 @@
+import time
+import random
+import asyncio
+
+import aiohttp
+
+from metrics import LatencyRecorder
+
+# Ответы шлюза, при которых сервер сайта запрос не обрабатывал - его можно повторить
+RETRY_STATUSES = {502, 503, 504}
+
+
+class CircuitBreaker:
+    """
+    Предохранитель для API сайта: после failure_threshold ошибок подряд запросы
+    не отправляются reset_timeout секунд, затем пропускается один пробный запрос
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def failure(self):
+        self.failures += 1
+        self.probe_in_flight = False
+        if self.failures >= self.failure_threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+
+class APIClient:
+    """
+    Асинхронный клиент API сайта: одна сессия aiohttp с пулом соединений,
+    таймауты, ограниченное число повторов с экспоненциальной задержкой
+    и предохранитель. Задержка запросов записывается по эндпоинтам
+    """
+
+    def __init__(self, base_url, timeout=10, retries=2, backoff=0.5, pool_size=20):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.session = None
+        self.breaker = CircuitBreaker()
+        self.latency = LatencyRecorder()
+
+    def get_session(self):
+        # Сессия создаётся внутри работающего цикла событий
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(limit=self.pool_size)
+            )
+        return self.session
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    async def request(self, method, path, json=None, headers=None, idempotent=False):
+        """
+        Возвращает (данные, статус). Неидемпотентные запросы повторяются только если
+        соединение не было установлено или шлюз ответил 502/503/504
+        """
+        if not self.breaker.allow():
+            return {"success": False, "message": "Сервер временно недоступен, попробуйте позже"}, 503
+
+        url = f"{self.base_url}{path}"
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                async with self.get_session().request(method, url, json=json, headers=headers) as response:
+                    try:
+                        data = await response.json(content_type=None)
+                    except ValueError:
+                        data = {"success": False, "message": "Некорректный ответ сервера"}
+                    status = response.status
+                error = None
+            except aiohttp.ClientConnectorError as e:
+                # Соединение не установлено - запрос точно не дошёл до сервера
+                data, status, error = None, None, e
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                data, status, error = None, None, e
+                if not idempotent:
+                    # Запрос мог быть выполнен сервером - повтор небезопасен
+                    self.latency.record(path, time.perf_counter() - started, error=True)
+                    self.breaker.failure()
+                    print(f"Ошибка при запросе к API {path}: {e!r}")
+                    return {"success": False, "message": "Ошибка сервера"}, 500
+
+            failed = error is not None or status in RETRY_STATUSES
+            self.latency.record(path, time.perf_counter() - started, error=failed)
+            if not failed:
+                self.breaker.success()
+                return data, status
+
+            self.breaker.failure()
+            if attempt >= self.retries or not self.breaker.allow():
+                print(f"Ошибка при запросе к API {path}: {error!r}" if error else f"API {path} ответил {status}")
+                if data is not None:
+                    return data, status
+                return {"success": False, "message": "Ошибка сервера"}, 500
+
+            # Экспоненциальная задержка со случайной добавкой
+            await asyncio.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+            attempt += 1
+
+    async def verify_discord_code(self, code, discord_id, discord_username):
+        """Проверка кода привязки Discord аккаунта"""
+        return await self.request("POST", "/discord/verify-code", json={
+            "code": code,
+            "discord_id": discord_id,
+            "discord_username": discord_username
+        })
+
+    async def redeem_key(self, key, discord_id):
+        """Привязка ключа к аккаунту через Discord"""
+        # Повторная активация своего ключа возвращает успех, поэтому запрос можно повторять
+        return await self.request("POST", "/discord/redeem-key", json={
+            "key": key,
+            "discord_id": discord_id
+        }, idempotent=True)
+
+    async def generate_key(self, duration_hours=24, token=None):
+        """Генерация ключа для админов/модераторов"""
+        headers = {}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        return await self.request("POST", "/keys/generate", json={
+            "duration_hours": duration_hours
+        }, headers=headers)
@@ -1,11 +1,10 @@
 import discord
 from discord import app_commands
-from discord.ext import commands, tasks
+from discord.ext import commands
 import os
 import sys
 import asyncio
 import datetime
-import requests
 import json
 import aiohttp
 from dotenv import load_dotenv
@@ -13,7 +12,20 @@ from dotenv import load_dotenv
 # Добавление пути к корню проекта
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database.models import SessionLocal, User, Key, DiscordCode
+from state import ensure_bot_schema
+from expiry_scheduler import ExpiryScheduler
+from api_client import APIClient
+from role_queue import RoleQueue, pending_role_changes
+from event_consumer import EventConsumer, resolve_subscriber_changes
+from db_executor import run_db, db_latency
+from metrics import LoopLagMonitor
+from queries import has_valid_key, get_subscription_status, set_user_banned, get_user_info, is_discord_entitled
+from member_cache import LinkedMemberCache
+from command_sync import sync_command_tree
+from sharding import ShardMonitor
+from reminders import ReminderScheduler
+# Адрес уведомлений разбирается так же, как на стороне сайта
+from website.events import parse_address
 
 # Загрузка переменных окружения
 load_dotenv()
@@ -21,6 +33,8 @@ load_dotenv()
 # Настройка Discord бота
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 SERVER_API_URL = os.getenv("SERVER_API_URL", "http://localhost:5000/api")
+# Адрес, на который сайт отправляет уведомление о новых событиях (пустое значение - только периодическая проверка)
+BOT_EVENTS_ADDR = os.getenv("BOT_EVENTS_ADDR", "127.0.0.1:5055")
 
 # Настройка ролей на сервере Discord только через ID
 ADMIN_ROLE_ID = int(os.getenv("DISCORD_ADMIN_ROLE_ID", "0"))
@@ -32,77 +46,47 @@ intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
+# Шардирование: BOT_SHARDING=auto запускает AutoShardedBot (число шардов задаёт
+# Discord или BOT_SHARD_COUNT), иначе бот работает одним подключением
+BOT_SHARDING = os.getenv("BOT_SHARDING", "off").lower() == "auto"
+BOT_SHARD_COUNT = int(os.getenv("BOT_SHARD_COUNT") or 0)
+BotBase = commands.AutoShardedBot if BOT_SHARDING else commands.Bot
+
+class LoaderBot(BotBase):
+    background_started = False
+    
+    async def setup_hook(self):
+        # Вызывается один раз при запуске, а не при каждом переподключении.
+        # Команды отправляются в Discord, только если изменились с прошлой синхронизации
+        try:
+            await sync_command_tree(self.tree, self.application_id, force=os.getenv("FORCE_COMMAND_SYNC") == "1")
+        except Exception as e:
+            print(f"Ошибка при синхронизации команд: {e}")
+    
+    async def close(self):
+        # Закрываем сессию HTTP клиента вместе с ботом
+        await api_client.close()
+        await super().close()
+
 # Создание бота с настроенными интентами
-bot = commands.Bot(
+bot = LoaderBot(
     command_prefix='!', 
     intents=intents,
     # Отключаем автоматический chunking при запуске
     chunk_guild_at_startup=False,
     # Не запрашиваем большие списки участников при добавлении на сервер
-    fetch_offline_members=False
+    fetch_offline_members=False,
+    # Участники не кэшируются автоматически: в кэше только привязанные (см. member_cache)
+    member_cache_flags=discord.MemberCacheFlags.none(),
+    **({"shard_count": BOT_SHARD_COUNT} if BOT_SHARDING and BOT_SHARD_COUNT else {})
 )
 
-# Создание API клиента для взаимодействия с сервером
-class APIClient:
-    @staticmethod
-    def verify_discord_code(code, discord_id, discord_username):
-        """Проверка кода привязки Discord аккаунта"""
-        url = f"{SERVER_API_URL}/discord/verify-code"
-        data = {
-            "code": code,
-            "discord_id": discord_id,
-            "discord_username": discord_username
-        }
-        
-        try:
-            response = requests.post(url, json=data)
-            return response.json(), response.status_code
-        except Exception as e:
-            print(f"Ошибка при запросе к API: {e}")
-            return {"success": False, "message": "Ошибка сервера"}, 500
-    
-    @staticmethod
-    def redeem_key(key, discord_id):
-        """Привязка ключа к аккаунту через Discord"""
-        url = f"{SERVER_API_URL}/discord/redeem-key"
-        data = {
-            "key": key,
-            "discord_id": discord_id
-        }
-        
-        try:
-            response = requests.post(url, json=data)
-            return response.json(), response.status_code
-        except Exception as e:
-            print(f"Ошибка при запросе к API: {e}")
-            return {"success": False, "message": "Ошибка сервера"}, 500
-    
-    @staticmethod
-    def generate_key(duration_hours=24, token=None):
-        """Генерация ключа для админов/модераторов"""
-        url = f"{SERVER_API_URL}/keys/generate"
-        data = {
-            "duration_hours": duration_hours
-        }
-        headers = {}
-        
-        if token:
-            headers["Authorization"] = f"Bearer {token}"
-        
-        try:
-            response = requests.post(url, json=data, headers=headers)
-            return response.json(), response.status_code
-        except Exception as e:
-            print(f"Ошибка при запросе к API: {e}")
-            return {"success": False, "message": "Ошибка сервера"}, 500
-
-# Функция для получения сессии базы данных
-def get_db():
-    db = SessionLocal()
-    try:
-        return db
-    finally:
-        db.close()
+# Общий асинхронный клиент API сайта (одна сессия aiohttp на всё время работы бота)
+api_client = APIClient(
+    SERVER_API_URL,
+    timeout=float(os.getenv("API_TIMEOUT", "10")),
+    retries=int(os.getenv("API_RETRIES", "2"))
+)
 
 # Функция для форматирования времени
 def format_time_left(seconds):
@@ -163,61 +147,117 @@ async def on_ready():
     if hasattr(bot, 'chunks_on_guild_available'):
         bot.chunks_on_guild_available = False
     
-    # Синхронизация команд с Discord
-    try:
-        synced = await bot.tree.sync()
-        print(f"Синхронизировано {len(synced)} команд")
-    except Exception as e:
-        print(f"Ошибка при синхронизации команд: {e}")
+    # on_ready приходит после каждого нового подключения к шлюзу,
+    # а фоновые задачи запускаются один раз за время работы процесса
+    if not bot.background_started:
+        bot.background_started = True
+        expiry_scheduler.start()
+        role_queue.start()
+        event_consumer.start(parse_address(BOT_EVENTS_ADDR))
+        loop_lag.start()
+        shard_monitor.start()
+        reminder_scheduler.start()
     
-    # Запуск задачи проверки истекших ключей
-    check_expired_keys.start()
+    # После нового подключения кэш участников пуст - привязанные загружаются заново.
+    # При шардировании это делает on_shard_ready для каждого шарда отдельно
+    if not BOT_SHARDING:
+        member_cache.start(bot.guilds)
+
+@bot.event
+async def on_shard_ready(shard_id):
+    """Шард подключился (в том числе после переподключения с новой сессией)"""
+    guilds = [guild for guild in bot.guilds if guild.shard_id == shard_id]
+    print(f"Шард {shard_id} подключен, серверов: {len(guilds)}")
+    member_cache.start(guilds, key=shard_id)
+
+@bot.event
+async def on_member_join(member):
+    """Вошедшему привязанному участнику с действующим ключом выдаётся роль подписчика"""
+    member_cache.joined(member)
+    if member.id in member_cache.linked and await run_db(is_discord_entitled, str(member.id)):
+        await queue_subscriber_role([member.id], "add", [member.guild])
+
+@bot.event
+async def on_raw_member_remove(payload):
+    member_cache.left(payload.guild_id, payload.user.id)
+
+# Кэш участников, привязанных к аккаунтам сайта
+member_cache = LinkedMemberCache()
 
-@tasks.loop(hours=1)
-async def check_expired_keys():
-    """Проверка и удаление истекших ключей подписчиков"""
-    print("Проверка истекших ключей...")
+# Очередь изменений ролей: команды не ждут ответа Discord, а массовые изменения
+# не упираются в лимиты запросов
+role_queue = RoleQueue(
+    bot,
+    member_cache.get,
+    member_cache.ensure,
+    guild_interval=float(os.getenv("ROLE_QUEUE_INTERVAL", "0.5"))
+)
+
+async def queue_subscriber_role(discord_ids, action, guilds=None):
+    """Ставит выдачу (add) или снятие (remove) роли подписчика в очередь (по умолчанию на всех серверах бота)"""
+    if not SUBSCRIBER_ROLE_ID:
+        return
     
-    db = get_db()
+    guilds = bot.guilds if guilds is None else guilds
+    await role_queue.enqueue([
+        (guild.id, discord_id, SUBSCRIBER_ROLE_ID, action)
+        for guild in guilds if guild and guild.get_role(SUBSCRIBER_ROLE_ID)
+        for discord_id in discord_ids
+    ])
+
+async def remove_subscriber_roles(lapsed_users):
+    """Снятие роли подписчика у пользователей, чей последний ключ истёк"""
+    await queue_subscriber_role([discord_id for user_id, discord_id in lapsed_users], "remove")
+
+# Снятие ролей в момент истечения ключей
+expiry_scheduler = ExpiryScheduler(
+    remove_subscriber_roles,
+    max_sleep=int(os.getenv("EXPIRY_MAX_SLEEP", "60"))
+)
+
+async def sync_roles_from_events(events):
+    """Выдача и снятие роли подписчика по событиям сайта (ключи, баны, привязка Discord)"""
+    for item in events:
+        if item["event_type"] == "discord_linked" and item["discord_id"]:
+            member_cache.link(item["discord_id"])
+        elif item["event_type"] == "discord_unlinked" and item["discord_id"]:
+            member_cache.unlink(item["discord_id"])
     
-    try:
-        # Получение всех пользователей с привязанным Discord ID
-        users_with_discord = db.query(User).filter(User.discord_id != None).all()
-        
-        for user in users_with_discord:
-            # Получение активных ключей пользователя
-            active_keys = db.query(Key).filter(
-                Key.user_id == user.id,
-                Key.is_active == True
-            ).all()
-            
-            has_valid_key = False
-            for key in active_keys:
-                if not key.is_expired():
-                    has_valid_key = True
-                    break
-            
-            # Если у пользователя нет активных ключей, но есть роль подписчика
-            if not has_valid_key:
-                # Поиск сервера и участника
-                for guild in bot.guilds:
-                    member = guild.get_member(int(user.discord_id))
-                    if member:
-                        # Поиск роли подписчика по ID
-                        if SUBSCRIBER_ROLE_ID:
-                            subscriber_role = guild.get_role(SUBSCRIBER_ROLE_ID)
-                            if subscriber_role and subscriber_role in member.roles:
-                                # Удаление роли подписчика
-                                try:
-                                    await member.remove_roles(subscriber_role)
-                                    print(f"У пользователя {member.name} удалена роль {subscriber_role.name}")
-                                except Exception as e:
-                                    print(f"Ошибка при удалении роли у {member.name}: {e}")
+    add, remove = await run_db(resolve_subscriber_changes, events)
+    await queue_subscriber_role(add, "add")
+    await queue_subscriber_role(remove, "remove")
     
-    except Exception as e:
-        print(f"Ошибка при проверке истекших ключей: {e}")
-    finally:
-        db.close()
+    # Новый или восстановленный ключ может истечь раньше, чем ожидает планировщик
+    if any(item["event_type"] in ("key_redeemed", "key_restored", "user_unbanned", "discord_linked") for item in events):
+        expiry_scheduler.wake()
+
+# События сайта
+event_consumer = EventConsumer(
+    sync_roles_from_events,
+    poll_interval=int(os.getenv("EVENTS_POLL_INTERVAL", "30"))
+)
+
+async def send_expiry_reminder(discord_id, expires_at):
+    """Личное сообщение о скором окончании подписки"""
+    seconds_left = int((expires_at - datetime.datetime.utcnow()).total_seconds())
+    user = bot.get_user(int(discord_id)) or await bot.fetch_user(int(discord_id))
+    await user.send(
+        f"⏳ Ваша подписка закончится через {format_time_left(seconds_left)}.\n"
+        "Чтобы продлить её, активируйте новый ключ командой /redeem или на сайте."
+    )
+
+# Напоминания за 24 часа и за 1 час до истечения последнего ключа
+reminder_scheduler = ReminderScheduler(
+    send_expiry_reminder,
+    interval=int(os.getenv("REMINDER_INTERVAL", "300")),
+    send_interval=float(os.getenv("REMINDER_SEND_INTERVAL", "1"))
+)
+
+# Метрики шардов для /stats
+shard_monitor = ShardMonitor(bot)
+
+# Замер задержки цикла событий для /stats
+loop_lag = LoopLagMonitor()
 
 # Обработчик ошибок
 @bot.event
@@ -237,36 +277,21 @@ async def link_discord(interaction: discord.Interaction, code: str):
     discord_username = f"{interaction.user.name}"
     
     # Проверка кода через API
-    result, status_code = APIClient.verify_discord_code(code, discord_id, discord_username)
+    result, status_code = await api_client.verify_discord_code(code, discord_id, discord_username)
     
     if status_code == 200 and result.get("success", False):
         # Успешная привязка
+        member_cache.link(discord_id)
         await interaction.followup.send("✅ Ваш Discord аккаунт успешно привязан к аккаунту на сайте.")
         
         # Проверка наличия активных ключей и выдача роли подписчика
-        db = get_db()
         try:
             user_id = result.get("user_id")
-            active_keys = db.query(Key).filter(
-                Key.user_id == user_id,
-                Key.is_active == True
-            ).all()
-            
-            has_valid_key = False
-            for key in active_keys:
-                if not key.is_expired():
-                    has_valid_key = True
-                    break
-            
-            if has_valid_key and SUBSCRIBER_ROLE_ID:
-                subscriber_role = interaction.guild.get_role(SUBSCRIBER_ROLE_ID)
-                if subscriber_role:
-                    await interaction.user.add_roles(subscriber_role)
-                    await interaction.followup.send("🔑 Вам выдана роль подписчика.")
+            if SUBSCRIBER_ROLE_ID and await run_db(has_valid_key, user_id):
+                await queue_subscriber_role([discord_id], "add", [interaction.guild])
+                await interaction.followup.send("🔑 Вам выдана роль подписчика.")
         except Exception as e:
             print(f"Ошибка при проверке ключей пользователя: {e}")
-        finally:
-            db.close()
     else:
         # Ошибка при привязке
         error_message = result.get("message", "Неизвестная ошибка")
@@ -282,7 +307,7 @@ async def redeem_key(interaction: discord.Interaction, key: str):
     discord_id = str(interaction.user.id)
     
     # Привязка ключа через API
-    result, status_code = APIClient.redeem_key(key, discord_id)
+    result, status_code = await api_client.redeem_key(key, discord_id)
     
     if status_code == 200 and result.get("success", False):
         # Успешная активация ключа
@@ -293,10 +318,10 @@ async def redeem_key(interaction: discord.Interaction, key: str):
         formatted_time = format_time_left(time_left)
         
         # Добавление роли подписчика
-        if SUBSCRIBER_ROLE_ID:
-            subscriber_role = interaction.guild.get_role(SUBSCRIBER_ROLE_ID)
-            if subscriber_role:
-                await interaction.user.add_roles(subscriber_role)
+        await queue_subscriber_role([discord_id], "add", [interaction.guild])
+        
+        # Новый ключ может истечь раньше, чем ожидает планировщик
+        expiry_scheduler.wake()
         
         await interaction.followup.send(f"✅ Ключ успешно активирован!\nСрок действия: {formatted_time}")
     else:
@@ -312,35 +337,19 @@ async def check_status(interaction: discord.Interaction):
     # Получение информации о пользователе
     discord_id = str(interaction.user.id)
     
-    db = get_db()
     try:
-        # Поиск пользователя по Discord ID
-        user = db.query(User).filter(User.discord_id == discord_id).first()
-        
-        if not user:
+        # Поиск пользователя по Discord ID и его действующих ключей
+        status = await run_db(get_subscription_status, discord_id)
+
+        if not status:
             await interaction.followup.send("❌ Ваш Discord аккаунт не привязан к аккаунту на сайте.")
             return
-        
-        if user.is_banned:
+
+        if status["is_banned"]:
             await interaction.followup.send("🚫 Ваш аккаунт заблокирован.")
             return
-        
-        # Получение активных ключей пользователя
-        active_keys = db.query(Key).filter(
-            Key.user_id == user.id,
-            Key.is_active == True
-        ).all()
-        
-        # Создание списка активных ключей
-        valid_keys = []
-        for key in active_keys:
-            if not key.is_expired():
-                valid_keys.append({
-                    "key": key.key,
-                    "time_left": key.time_left(),
-                    "expires_at": key.expires_at
-                })
-        
+
+        valid_keys = status["keys"]
         if not valid_keys:
             await interaction.followup.send("⚠️ У вас нет активных ключей.")
             return
@@ -353,7 +362,7 @@ async def check_status(interaction: discord.Interaction):
         
         embed.add_field(
             name="Имя пользователя",
-            value=user.username,
+            value=status["username"],
             inline=False
         )
         
@@ -370,8 +379,6 @@ async def check_status(interaction: discord.Interaction):
     except Exception as e:
         print(f"Ошибка при проверке статуса: {e}")
         await interaction.followup.send("❌ Произошла ошибка при проверке статуса.")
-    finally:
-        db.close()
 
 @bot.tree.command(name="genkey", description="Генерация ключа (только для админов и саппорта)")
 @app_commands.describe(duration="Продолжительность ключа в часах (по умолчанию 24)")
@@ -385,7 +392,7 @@ async def generate_key(interaction: discord.Interaction, duration: int = 24):
         return
     
     # Генерация ключа через API
-    result, status_code = APIClient.generate_key(duration_hours=duration)
+    result, status_code = await api_client.generate_key(duration_hours=duration)
     
     if status_code == 200 and "key" in result:
         # Успешная генерация ключа
@@ -433,43 +440,27 @@ async def ban_user(interaction: discord.Interaction, username: str):
         await interaction.followup.send("❌ У вас недостаточно прав для выполнения этой команды.")
         return
     
-    db = get_db()
     try:
-        # Поиск пользователя по имени
-        user = db.query(User).filter(User.username == username).first()
+        # Бан пользователя (саппорт не может банить админов и саппортов)
+        result = await run_db(set_user_banned, username, True, is_admin(interaction))
         
-        if not user:
+        if not result:
             await interaction.followup.send(f"❌ Пользователь {username} не найден.")
             return
         
-        # Проверка прав на бан
-        is_requester_admin = is_admin(interaction)
-        if not is_requester_admin and (user.is_admin or user.is_support):
+        if result["forbidden"]:
             await interaction.followup.send("❌ У вас недостаточно прав для бана администратора или саппорта.")
             return
         
-        # Бан пользователя
-        user.is_banned = True
-        db.commit()
-        
         # Если у пользователя есть привязанный Discord аккаунт, удаляем роль подписчика
-        if user.discord_id and SUBSCRIBER_ROLE_ID:
-            try:
-                member = interaction.guild.get_member(int(user.discord_id))
-                if member:
-                    subscriber_role = interaction.guild.get_role(SUBSCRIBER_ROLE_ID)
-                    if subscriber_role and subscriber_role in member.roles:
-                        await member.remove_roles(subscriber_role)
-            except Exception as e:
-                print(f"Ошибка при удалении роли: {e}")
+        if result["discord_id"]:
+            await queue_subscriber_role([result["discord_id"]], "remove", [interaction.guild])
         
         await interaction.followup.send(f"✅ Пользователь {username} заблокирован.")
         
     except Exception as e:
         print(f"Ошибка при бане пользователя: {e}")
         await interaction.followup.send("❌ Произошла ошибка при бане пользователя.")
-    finally:
-        db.close()
 
 @bot.tree.command(name="unban", description="Разбан пользователя (только для админов и саппорта)")
 @app_commands.describe(username="Имя пользователя на сайте")
@@ -482,55 +473,27 @@ async def unban_user(interaction: discord.Interaction, username: str):
         await interaction.followup.send("❌ У вас недостаточно прав для выполнения этой команды.")
         return
     
-    db = get_db()
     try:
-        # Поиск пользователя по имени
-        user = db.query(User).filter(User.username == username).first()
+        # Разбан пользователя (саппорт не может разбанивать админов и саппортов)
+        result = await run_db(set_user_banned, username, False, is_admin(interaction))
         
-        if not user:
+        if not result:
             await interaction.followup.send(f"❌ Пользователь {username} не найден.")
             return
         
-        # Проверка прав на разбан
-        is_requester_admin = is_admin(interaction)
-        if not is_requester_admin and (user.is_admin or user.is_support):
+        if result["forbidden"]:
             await interaction.followup.send("❌ У вас недостаточно прав для разбана администратора или саппорта.")
             return
         
-        # Разбан пользователя
-        user.is_banned = False
-        db.commit()
-        
         # Если у пользователя есть привязанный Discord аккаунт и активный ключ, возвращаем роль подписчика
-        if user.discord_id:
-            active_keys = db.query(Key).filter(
-                Key.user_id == user.id,
-                Key.is_active == True
-            ).all()
-            
-            has_valid_key = False
-            for key in active_keys:
-                if not key.is_expired():
-                    has_valid_key = True
-                    break
-            
-            if has_valid_key and SUBSCRIBER_ROLE_ID:
-                try:
-                    member = interaction.guild.get_member(int(user.discord_id))
-                    if member:
-                        subscriber_role = interaction.guild.get_role(SUBSCRIBER_ROLE_ID)
-                        if subscriber_role:
-                            await member.add_roles(subscriber_role)
-                except Exception as e:
-                    print(f"Ошибка при добавлении роли: {e}")
+        if result["has_valid_key"]:
+            await queue_subscriber_role([result["discord_id"]], "add", [interaction.guild])
         
         await interaction.followup.send(f"✅ Пользователь {username} разблокирован.")
         
     except Exception as e:
         print(f"Ошибка при разбане пользователя: {e}")
         await interaction.followup.send("❌ Произошла ошибка при разбане пользователя.")
-    finally:
-        db.close()
 
 @bot.tree.command(name="user", description="Информация о пользователе (только для админов и саппорта)")
 @app_commands.describe(username="Имя пользователя на сайте")
@@ -543,87 +506,69 @@ async def user_info(interaction: discord.Interaction, username: str):
         await interaction.followup.send("❌ У вас недостаточно прав для выполнения этой команды.")
         return
     
-    db = get_db()
     try:
-        # Поиск пользователя по имени
-        user = db.query(User).filter(User.username == username).first()
+        # Поиск пользователя по имени и его действующих ключей
+        user = await run_db(get_user_info, username)
         
         if not user:
             await interaction.followup.send(f"❌ Пользователь {username} не найден.")
             return
         
-        # Получение активных ключей пользователя
-        active_keys = db.query(Key).filter(
-            Key.user_id == user.id,
-            Key.is_active == True
-        ).all()
-        
         # Создание эмбеда с информацией о пользователе
         embed = discord.Embed(
             title=f"Информация о пользователе {username}",
-            color=discord.Color.blue() if not user.is_banned else discord.Color.red()
+            color=discord.Color.blue() if not user["is_banned"] else discord.Color.red()
         )
         
         embed.add_field(
             name="ID",
-            value=str(user.id),
+            value=str(user["id"]),
             inline=True
         )
         
         embed.add_field(
             name="Email",
-            value=user.email,
+            value=user["email"],
             inline=True
         )
         
         embed.add_field(
             name="Создан",
-            value=user.created_at.strftime("%d.%m.%Y %H:%M"),
+            value=user["created_at"].strftime("%d.%m.%Y %H:%M"),
             inline=True
         )
         
         embed.add_field(
             name="Роль",
-            value="Администратор" if user.is_admin else "Саппорт" if user.is_support else "Пользователь",
+            value="Администратор" if user["is_admin"] else "Саппорт" if user["is_support"] else "Пользователь",
             inline=True
         )
         
         embed.add_field(
             name="Статус",
-            value="Заблокирован" if user.is_banned else "Активен",
+            value="Заблокирован" if user["is_banned"] else "Активен",
             inline=True
         )
         
         embed.add_field(
             name="Discord привязка",
-            value=f"<@{user.discord_id}>" if user.discord_id else "Нет",
+            value=f"<@{user['discord_id']}>" if user["discord_id"] else "Нет",
             inline=True
         )
         
         # Добавление информации о ключах
-        if active_keys:
-            valid_keys = []
-            for key in active_keys:
-                if not key.is_expired():
-                    valid_keys.append(key)
+        valid_keys = user["keys"]
+        if valid_keys:
+            keys_info = []
+            for key in valid_keys:
+                formatted_time = format_time_left(key["time_left"])
+                keys_info.append(f"{key['key']} (осталось: {formatted_time})")
             
-            if valid_keys:
-                keys_info = []
-                for key in valid_keys:
-                    formatted_time = format_time_left(key.time_left())
-                    keys_info.append(f"{key.key} (осталось: {formatted_time})")
-                
-                embed.add_field(
-                    name=f"Активные ключи ({len(valid_keys)})",
-                    value="\n".join(keys_info) if len(keys_info) <= 5 else "\n".join(keys_info[:5]) + f"\n... и ещё {len(keys_info) - 5}",
-                    inline=False
-                )
-            else:
-                embed.add_field(
-                    name="Активные ключи",
-                    value="Нет",
-                    inline=False
-                )
+            embed.add_field(
+                name=f"Активные ключи ({len(valid_keys)})",
+                value="\n".join(keys_info) if len(keys_info) <= 5 else "\n".join(keys_info[:5]) + f"\n... и ещё {len(keys_info) - 5}",
+                inline=False
+            )
         else:
             embed.add_field(
                 name="Активные ключи",
@@ -636,8 +581,67 @@ async def user_info(interaction: discord.Interaction, username: str):
     except Exception as e:
         print(f"Ошибка при получении информации о пользователе: {e}")
         await interaction.followup.send("❌ Произошла ошибка при получении информации о пользователе.")
-    finally:
-        db.close()
+
+def format_latency(snapshot):
+    """Строки вида "имя: p50/p99, запросов, ошибок" для эмбеда"""
+    if not snapshot:
+        return "Нет данных"
+    return "\n".join(
+        f"`{name}`: p50 {item['p50_ms']} мс, p99 {item['p99_ms']} мс, "
+        f"запросов {item['count']}, ошибок {item['errors']}"
+        for name, item in sorted(snapshot.items())
+    )
+
+def format_shards(snapshot):
+    """Строка на шард: состояние, задержка шлюза, серверы и частота событий"""
+    return "\n".join(
+        f"`{shard_id}`: {'подключен' if item['ready'] else 'нет подключения'}, "
+        f"задержка {item['latency_ms'] if item['latency_ms'] is not None else '-'} мс, "
+        f"серверов {item['guilds']}, событий {item['events_per_sec']}/с"
+        for shard_id, item in sorted(snapshot.items())
+    ) or "Нет данных"
+
+@bot.tree.command(name="stats", description="Метрики бота (только для админов)")
+async def bot_stats(interaction: discord.Interaction):
+    """Задержки запросов к API сайта и базе, задержка цикла событий"""
+    if not is_admin(interaction):
+        await interaction.response.send_message("❌ У вас недостаточно прав для выполнения этой команды.", ephemeral=True)
+        return
+
+    embed = discord.Embed(title="Метрики бота", color=discord.Color.blue())
+    embed.add_field(name="API сайта", value=format_latency(api_client.latency.snapshot()), inline=False)
+    embed.add_field(name="Запросы к базе", value=format_latency(db_latency.snapshot()), inline=False)
+    embed.add_field(name="События сайта", value=f"обработано {event_consumer.processed}", inline=True)
+    embed.add_field(
+        name="Кэш участников",
+        value=f"{member_cache.cached_count(bot.guilds)} из {len(member_cache.linked)} привязанных, "
+              f"запросов к шлюзу {member_cache.requests}",
+        inline=True
+    )
+    pending = await run_db(pending_role_changes)
+    embed.add_field(
+        name="Очередь ролей",
+        value=f"в очереди {pending}, применено {role_queue.stats['applied']}, "
+              f"повторов {role_queue.stats['retried']}, отложено {role_queue.stats['postponed']}, "
+              f"отброшено {role_queue.stats['dropped']}",
+        inline=False
+    )
+    embed.add_field(
+        name="Напоминания",
+        value=f"отправлено {reminder_scheduler.stats['sent']}, "
+              f"закрыты личные сообщения {reminder_scheduler.stats['undeliverable']}, "
+              f"ошибок {reminder_scheduler.stats['failed']}",
+        inline=False
+    )
+    lag = loop_lag.snapshot()
+    embed.add_field(
+        name="Задержка цикла событий",
+        value=f"p50 {lag['p50_ms']} мс, p99 {lag['p99_ms']} мс, максимум {lag['max_ms']} мс",
+        inline=False
+    )
+    embed.add_field(name="Предохранитель API", value=api_client.breaker.state, inline=True)
+    embed.add_field(name="Шарды", value=format_shards(shard_monitor.snapshot()), inline=False)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
 # Запуск бота
 def main():
@@ -645,6 +649,8 @@ def main():
         print("Ошибка: DISCORD_TOKEN не найден в переменных окружения.")
         return
     
+    ensure_bot_schema()
+    
     try:
         # Запускаем бота с автоматическим переподключением
         # Примечание: интенты уже настроены при создании бота
@@ -0,0 +1,210 @@
+"""
+Офлайн-проверка шардирования бота без подключения к Discord:
+
+    python check_sharding.py [число_шардов] [число_серверов]
+
+1. Распределение серверов по шардам совпадает с discord.Guild.shard_id.
+2. Очередь ролей применяет изменения серверов подключённых шардов и откладывает
+   (без расхода попыток) изменения серверов шарда, который переподключается.
+3. ShardMonitor считает частоту событий по номеру последовательности шлюза.
+
+База создаётся во временном файле, реальная не используется.
+"""
+import os
+import sys
+import random
+import asyncio
+import tempfile
+import collections
+
+db_file = os.path.join(tempfile.mkdtemp(), "check_sharding.db")
+os.environ["USE_POSTGRES"] = "false"
+os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+
+from database.models import RoleChange, SessionLocal
+from state import ensure_bot_schema
+from role_queue import RoleQueue
+from sharding import shard_for_guild, ShardMonitor
+
+
+def make_guild_id():
+    """Snowflake сервера со случайным временем создания"""
+    timestamp = random.randint(0, 10 * 365 * 86400 * 1000)
+    return (timestamp << 22) | random.getrandbits(22)
+
+
+class FakeState:
+    def __init__(self, shard_count):
+        self.shard_count = shard_count
+
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+        self.name = f"role{role_id}"
+
+    def __eq__(self, other):
+        return self.id == other.id
+
+    def __hash__(self):
+        return self.id
+
+
+class FakeMember:
+    def __init__(self, member_id, applied):
+        self.id = member_id
+        self.name = f"member{member_id}"
+        self.roles = [FakeRole(0)]
+        self.applied = applied
+
+    async def add_roles(self, *roles, reason=None):
+        self.applied.append(self.id)
+        self.roles.extend(roles)
+
+    async def remove_roles(self, *roles, reason=None):
+        self.applied.append(self.id)
+        self.roles = [role for role in self.roles if role not in roles]
+
+
+class FakeGuild:
+    def __init__(self, guild_id, shard_count, applied):
+        self.id = guild_id
+        self._state = FakeState(shard_count)
+        self.role = FakeRole(1)
+        self.members = {}
+        self.applied = applied
+
+    @property
+    def shard_id(self):
+        # Та же формула, что у discord.Guild
+        return discord.Guild.shard_id.fget(self)
+
+    def get_role(self, role_id):
+        return self.role if role_id == self.role.id else None
+
+    def get_member(self, member_id):
+        return self.members.setdefault(member_id, FakeMember(member_id, self.applied))
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sequence = 0
+
+
+class FakeShard:
+    def __init__(self, closed):
+        self.closed = closed
+        self._parent = type("Parent", (), {"ws": FakeWebSocket()})()
+        self.latency = 0.05
+
+    def is_closed(self):
+        return self.closed
+
+
+class FakeShardedClient:
+    """Минимальный аналог AutoShardedBot: шарды, серверы, задержки"""
+
+    def __init__(self, shard_count, guilds, closed_shards):
+        self.shard_count = shard_count
+        self.shards = {shard_id: FakeShard(shard_id in closed_shards) for shard_id in range(shard_count)}
+        self.guilds = guilds
+        self.by_id = {guild.id: guild for guild in guilds}
+
+    def get_shard(self, shard_id):
+        return self.shards.get(shard_id)
+
+    def get_guild(self, guild_id):
+        return self.by_id.get(guild_id)
+
+    @property
+    def latencies(self):
+        return [(shard_id, shard.latency) for shard_id, shard in self.shards.items()]
+
+
+def check(condition, message):
+    print(("OK   " if condition else "FAIL ") + message)
+    return condition
+
+
+async def check_role_queue(shard_count, guilds):
+    applied = []
+    for guild in guilds:
+        guild.applied = applied
+    closed = {shard_count - 1}
+    client = FakeShardedClient(shard_count, guilds, closed)
+
+    async def get_member(guild, discord_id):
+        return guild.get_member(discord_id)
+
+    queue = RoleQueue(client, get_member, guild_interval=0)
+    await queue.enqueue([(guild.id, 1000 + index, guild.role.id, "add") for index, guild in enumerate(guilds)])
+    await queue.drain()
+
+    expected_applied = sum(1 for guild in guilds if guild.shard_id not in closed)
+    db = SessionLocal()
+    try:
+        waiting = db.query(RoleChange).all()
+        waiting_shards = {shard_for_guild(row.guild_id, shard_count) for row in waiting}
+        ok = check(len(applied) == expected_applied,
+                   f"применено {len(applied)} изменений серверов подключённых шардов (ожидалось {expected_applied})")
+        ok &= check(waiting_shards <= closed and len(waiting) == len(guilds) - expected_applied,
+                    f"отложено {len(waiting)} изменений шарда {sorted(closed)}")
+        ok &= check(all(row.attempts == 0 for row in waiting), "отложенные изменения не расходуют попытки")
+    finally:
+        db.close()
+
+    # Шард переподключился - его изменения применяются при следующей обработке
+    for shard_id in closed:
+        client.shards[shard_id].closed = False
+    db = SessionLocal()
+    try:
+        db.query(RoleChange).update({RoleChange.next_attempt_at: RoleChange.created_at})
+        db.commit()
+    finally:
+        db.close()
+    await queue.drain()
+    ok &= check(len(applied) == len(guilds), "после переподключения шарда применены все изменения")
+    return ok, client
+
+
+def check_monitor(client):
+    monitor = ShardMonitor(client)
+    monitor.sample(now=0)
+    for shard_id, shard in client.shards.items():
+        shard._parent.ws.sequence += (shard_id + 1) * 100
+    monitor.sample(now=10)
+    snapshot = monitor.snapshot()
+    ok = check(all(snapshot[shard_id]["events_per_sec"] == (shard_id + 1) * 10 for shard_id in client.shards),
+               "частота событий по шардам: " + ", ".join(f"{k}: {v['events_per_sec']}/с" for k, v in sorted(snapshot.items())))
+    ok &= check(sum(item["guilds"] for item in snapshot.values()) == len(client.guilds), "серверы в метриках учтены по шардам")
+    return ok
+
+
+def main():
+    shard_count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    guild_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    random.seed(42)
+    ensure_bot_schema()
+
+    guilds = [FakeGuild(make_guild_id(), shard_count, []) for _ in range(guild_count)]
+    ok = check(all(shard_for_guild(guild.id, shard_count) == guild.shard_id for guild in guilds),
+               f"{guild_count} серверов распределены так же, как в discord.py")
+    ok &= check(shard_for_guild(guilds[0].id, None) == 0, "без шардирования все серверы на шарде 0")
+
+    distribution = collections.Counter(guild.shard_id for guild in guilds)
+    print("     серверов по шардам: " + ", ".join(f"{k}: {v}" for k, v in sorted(distribution.items())))
+
+    queue_ok, client = asyncio.run(check_role_queue(shard_count, guilds))
+    ok &= queue_ok
+    ok &= check_monitor(client)
+
+    print("Все проверки пройдены" if ok else "Есть ошибки")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import json
+import hashlib
+
+from state import load_state, save_state
+from db_executor import run_db
+
+# Имя записи в bot_state с хешем последнего синхронизированного дерева команд
+STATE_NAME = "command_tree_hash"
+
+
+def command_tree_hash(tree, application_id):
+    """Хеш глобальных команд в том виде, в каком они отправляются в Discord"""
+    commands = sorted((command.to_dict(tree) for command in tree.get_commands()), key=lambda item: item["name"])
+    payload = json.dumps({"application_id": application_id, "commands": commands}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def sync_command_tree(tree, application_id, force=False):
+    """
+    Синхронизирует команды с Discord, только если они изменились с прошлой
+    синхронизации. Возвращает True, если синхронизация выполнялась
+    """
+    current = command_tree_hash(tree, application_id)
+    if not force and await run_db(load_state, STATE_NAME) == current:
+        print("Команды не изменились, синхронизация пропущена")
+        return False
+
+    synced = await tree.sync()
+    await run_db(save_state, STATE_NAME, current)
+    print(f"Синхронизировано {len(synced)} команд")
+    return True
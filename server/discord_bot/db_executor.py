@@ -0,0 +1,37 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from database.models import SessionLocal
+from metrics import LatencyRecorder
+
+# Отдельный пул потоков для запросов к базе: блокировка SQLite или медленный
+# запрос занимает поток пула, а не цикл событий бота
+DB_WORKERS = int(os.getenv("DB_WORKERS", "4"))
+executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="bot-db")
+
+# Время выполнения запросов (включая ожидание свободного потока) по именам функций
+db_latency = LatencyRecorder()
+
+
+def call_with_session(func, args):
+    """Вызывает func(db, *args) в собственной сессии; при ошибке изменения откатываются"""
+    db = SessionLocal()
+    try:
+        return func(db, *args)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def run_db(func, *args):
+    """
+    Выполняет func(db, *args) в пуле потоков базы данных.
+    func должна возвращать обычные данные, а не объекты ORM: сессия закрывается
+    до возврата в цикл событий
+    """
+    loop = asyncio.get_running_loop()
+    with db_latency.timer(func.__name__):
+        return await loop.run_in_executor(executor, call_with_session, func, args)
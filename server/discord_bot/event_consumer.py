@@ -0,0 +1,123 @@
+import asyncio
+import datetime
+
+from sqlalchemy import exists
+
+from database.models import DomainEvent, User, Key
+from db_executor import run_db
+
+
+def fetch_events(db, limit):
+    rows = db.query(DomainEvent).order_by(DomainEvent.id).limit(limit).all()
+    return [
+        {
+            "id": row.id,
+            "event_type": row.event_type,
+            "user_id": row.user_id,
+            "discord_id": row.discord_id
+        }
+        for row in rows
+    ]
+
+
+def delete_events(db, ids):
+    db.query(DomainEvent).filter(DomainEvent.id.in_(ids)).delete(synchronize_session=False)
+    db.commit()
+
+
+def resolve_subscriber_changes(db, events):
+    """
+    По пачке событий определяет, кому выдать роль подписчика, а у кого снять.
+    Решение принимается по текущему состоянию пользователя (привязка, бан,
+    действующий ключ), поэтому порядок и повторы событий не важны.
+    Возвращает (discord_id для выдачи, discord_id для снятия)
+    """
+    now = datetime.datetime.utcnow()
+    has_valid_key = exists().where(
+        Key.user_id == User.id,
+        Key.is_active == True,
+        Key.expires_at > now
+    )
+
+    add, remove = set(), set()
+    user_ids = {item["user_id"] for item in events if item["user_id"]}
+    if user_ids:
+        rows = db.query(User.discord_id, User.is_banned, has_valid_key.label("has_valid_key")).filter(
+            User.id.in_(user_ids),
+            User.discord_id != None
+        ).all()
+        for discord_id, is_banned, valid in rows:
+            (add if valid and not is_banned else remove).add(discord_id)
+
+    # После отвязки роль снимается по прежнему Discord ID, если он не привязан заново
+    unlinked = {item["discord_id"] for item in events if item["event_type"] == "discord_unlinked" and item["discord_id"]}
+    unlinked -= add
+    if unlinked:
+        relinked = {discord_id for (discord_id,) in db.query(User.discord_id).filter(User.discord_id.in_(unlinked))}
+        remove |= unlinked - relinked
+
+    return sorted(add), sorted(remove)
+
+
+class EventConsumer:
+    """
+    Обработка событий сайта из таблицы domain_events пачками по batch_size.
+    Сайт будит бота датаграммой на listen_address сразу после записи события,
+    а раз в poll_interval секунд таблица проверяется на случай потерянной датаграммы
+    """
+
+    def __init__(self, on_events, batch_size=200, poll_interval=30):
+        # on_events - корутина, получающая список событий; после неё события удаляются
+        self.on_events = on_events
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.wake_event = asyncio.Event()
+        self.transport = None
+        self.processed = 0
+        self.task = None
+
+    def start(self, listen_address=None):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run(listen_address))
+
+    def wake(self):
+        self.wake_event.set()
+
+    async def listen(self, address):
+        consumer = self
+
+        class WakeProtocol(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                consumer.wake()
+
+        loop = asyncio.get_running_loop()
+        try:
+            self.transport, _ = await loop.create_datagram_endpoint(WakeProtocol, local_addr=address)
+            print(f"Ожидание событий сайта на {address[0]}:{address[1]}")
+        except OSError as e:
+            print(f"Не удалось открыть адрес событий {address[0]}:{address[1]}: {e}. Только периодическая проверка")
+
+    async def run(self, listen_address):
+        if listen_address and self.transport is None:
+            await self.listen(listen_address)
+
+        while True:
+            try:
+                await self.drain()
+            except Exception as e:
+                print(f"Ошибка при обработке событий сайта: {e}")
+
+            try:
+                await asyncio.wait_for(self.wake_event.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wake_event.clear()
+
+    async def drain(self):
+        while True:
+            events = await run_db(fetch_events, self.batch_size)
+            if not events:
+                return
+            await self.on_events(events)
+            await run_db(delete_events, [item["id"] for item in events])
+            self.processed += len(events)
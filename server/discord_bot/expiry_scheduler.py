@@ -0,0 +1,125 @@
+import asyncio
+import datetime
+
+from sqlalchemy import func, exists
+from sqlalchemy.orm import aliased
+
+from database.models import User, Key
+from state import load_state, save_state
+from db_executor import run_db
+
+# Имя курсора в bot_state: момент, до которого истечения уже обработаны
+CURSOR_NAME = "expiry_cursor"
+
+
+def find_lapsed_users(db, since, now):
+    """
+    Пользователи с привязанным Discord, у которых в интервале (since, now]
+    истёк ключ и не осталось другого действующего.
+    Выборка идёт по индексу keys.expires_at, поэтому стоимость зависит
+    от числа истёкших ключей, а не от числа пользователей
+    """
+    other_key = aliased(Key)
+    still_valid = exists().where(
+        other_key.user_id == User.id,
+        other_key.is_active == True,
+        other_key.expires_at > now
+    )
+    return db.query(User.id, User.discord_id).join(Key, Key.user_id == User.id).filter(
+        User.discord_id != None,
+        Key.is_active == True,
+        Key.expires_at > since,
+        Key.expires_at <= now,
+        ~still_valid
+    ).distinct().all()
+
+
+def find_users_without_valid_key(db, now):
+    """Все привязанные пользователи без действующего ключа - для первого запуска без курсора"""
+    valid_key = exists().where(
+        Key.user_id == User.id,
+        Key.is_active == True,
+        Key.expires_at > now
+    )
+    return db.query(User.id, User.discord_id).filter(User.discord_id != None, ~valid_key).all()
+
+
+def next_expiry_after(db, now):
+    """Ближайшее истечение действующего ключа у привязанного пользователя"""
+    return db.query(func.min(Key.expires_at)).join(User, Key.user_id == User.id).filter(
+        User.discord_id != None,
+        Key.is_active == True,
+        Key.expires_at > now
+    ).scalar()
+
+
+class ExpiryScheduler:
+    """
+    Снятие роли подписчика по событию истечения ключа: задача спит до ближайшего
+    истечения среди привязанных пользователей и обрабатывает только тех,
+    у кого истёк последний действующий ключ. Обработанный момент сохраняется
+    в bot_state, поэтому после перезапуска обрабатывается только пропущенный интервал.
+
+    Новый ключ может истечь раньше ожидаемого момента, поэтому сон ограничен
+    max_sleep секундами; wake() прерывает его сразу (например, после /redeem)
+    """
+
+    def __init__(self, on_lapsed, max_sleep=60):
+        # on_lapsed - корутина, получающая список (user_id, discord_id)
+        self.on_lapsed = on_lapsed
+        self.max_sleep = max_sleep
+        self.wake_event = asyncio.Event()
+        self.task = None
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    def wake(self):
+        self.wake_event.set()
+
+    async def load_cursor(self):
+        value = await run_db(load_state, CURSOR_NAME)
+        return datetime.datetime.fromisoformat(value) if value else None
+
+    async def run(self):
+        cursor = await self.load_cursor()
+        if cursor is None:
+            # Курсора ещё нет - один раз сверяем всех привязанных пользователей
+            now = datetime.datetime.utcnow()
+            lapsed = await run_db(find_users_without_valid_key, now)
+            print(f"Первая проверка подписок: без действующего ключа {len(lapsed)} пользователей")
+            await self.process(lapsed)
+            cursor = now
+            await run_db(save_state, CURSOR_NAME, cursor.isoformat())
+
+        while True:
+            try:
+                now = datetime.datetime.utcnow()
+                lapsed = await run_db(find_lapsed_users, cursor, now)
+                if lapsed:
+                    print(f"Истекли подписки у {len(lapsed)} пользователей")
+                    await self.process(lapsed)
+                cursor = now
+                await run_db(save_state, CURSOR_NAME, cursor.isoformat())
+
+                next_expiry = await run_db(next_expiry_after, now)
+                delay = self.max_sleep
+                if next_expiry:
+                    # Небольшой запас, чтобы ключ уже считался истёкшим при проверке
+                    delay = min(delay, (next_expiry - now).total_seconds() + 0.5)
+            except Exception as e:
+                print(f"Ошибка при проверке истекших ключей: {e}")
+                delay = self.max_sleep
+
+            try:
+                await asyncio.wait_for(self.wake_event.wait(), timeout=max(delay, 0))
+            except asyncio.TimeoutError:
+                pass
+            self.wake_event.clear()
+
+    async def process(self, lapsed):
+        try:
+            await self.on_lapsed(lapsed)
+        except Exception as e:
+            print(f"Ошибка при снятии ролей подписчика: {e}")
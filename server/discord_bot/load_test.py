@@ -0,0 +1,309 @@
+"""
+Нагрузочная проверка команд бота без подключения к Discord:
+
+    python load_test.py [пользователей] [вызовов_команды] [параллельно] [задержка_api_мс]
+
+Команды /code, /redeem и /status вызываются напрямую с поддельными Interaction,
+Guild и Member. База создаётся во временном файле и заполняется привязанными
+пользователями с ключами. API сайта заменено локальным сервером aiohttp,
+который отвечает с заданной задержкой. Для каждой команды выводятся p50/p99,
+число запросов к базе на вызов, а также задержка цикла событий за всё время проверки.
+
+Проверка истёкших ключей (бывшая check_expired_keys) выполняется так же,
+как в ExpiryScheduler: полная сверка при первом запуске и выборка
+истечений за последние сутки.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import datetime
+import tempfile
+import collections
+
+db_file = os.path.join(tempfile.mkdtemp(), "load_test.db")
+os.environ["USE_POSTGRES"] = "false"
+os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+os.environ["DISCORD_SUBSCRIBER_ROLE_ID"] = "3"
+os.environ["DISCORD_ADMIN_ROLE_ID"] = "1"
+os.environ["DISCORD_SUPPORT_ROLE_ID"] = "2"
+# Порт заглушки API выбирается при запуске; уведомления от сайта не слушаем
+API_PORT = int(os.getenv("LOAD_TEST_API_PORT", "5099"))
+os.environ["SERVER_API_URL"] = f"http://127.0.0.1:{API_PORT}/api"
+os.environ["BOT_EVENTS_ADDR"] = ""
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web
+from sqlalchemy import event
+
+from database.models import Base, User, Key, engine
+from db_executor import run_db, db_latency
+from metrics import LatencyRecorder, LoopLagMonitor
+from expiry_scheduler import find_users_without_valid_key, find_lapsed_users
+from role_queue import pending_role_changes
+
+import bot
+
+# Discord ID привязанных пользователей: id пользователя + смещение
+DISCORD_ID_BASE = 10 ** 17
+SUBSCRIBER_ROLE_ID = int(os.environ["DISCORD_SUBSCRIBER_ROLE_ID"])
+
+
+# Число SQL запросов ко всей базе; команды замеряются по очереди,
+# поэтому прирост счётчика за этап относится к одной команде
+query_count = collections.Counter()
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    query_count["total"] += 1
+
+
+def seed_database(user_count):
+    """
+    Пользователи с привязанным Discord: у 70% есть действующий ключ, у 10% ключ
+    истёк за последние сутки, 1% заблокирован. Вставка пачками через Core
+    """
+    Base.metadata.create_all(bind=engine)
+    now = datetime.datetime.utcnow()
+    users = []
+    keys = []
+    for user_id in range(1, user_count + 1):
+        users.append({
+            "id": user_id,
+            "username": f"user{user_id}",
+            "email": f"user{user_id}@example.com",
+            "password_hash": "-",
+            "is_banned": user_id % 100 == 0,
+            "discord_id": str(DISCORD_ID_BASE + user_id),
+            "discord_username": f"member{user_id}"
+        })
+        roll = random.random()
+        if roll < 0.7:
+            expires_at = now + datetime.timedelta(seconds=random.randint(60, 30 * 86400))
+        elif roll < 0.8:
+            expires_at = now - datetime.timedelta(seconds=random.randint(60, 86400))
+        else:
+            expires_at = now - datetime.timedelta(days=random.randint(2, 90))
+        keys.append({
+            "key": f"{user_id:032d}",
+            "user_id": user_id,
+            "activated_at": expires_at - datetime.timedelta(days=30),
+            "expires_at": expires_at,
+            "duration": 30 * 86400,
+            "is_active": True
+        })
+        # Свободные ключи для /redeem
+        keys.append({
+            "key": f"FREE-{user_id:027d}",
+            "user_id": None,
+            "activated_at": None,
+            "expires_at": now + datetime.timedelta(days=30),
+            "duration": 30 * 86400,
+            "is_active": True
+        })
+
+    with engine.begin() as connection:
+        for start in range(0, len(users), 5000):
+            connection.execute(User.__table__.insert(), users[start:start + 5000])
+        for start in range(0, len(keys), 5000):
+            connection.execute(Key.__table__.insert(), keys[start:start + 5000])
+    bot.ensure_bot_schema()
+
+
+class StubAPI:
+    """Заглушка API сайта: отвечает на запросы бота с задержкой delay секунд"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.requests = collections.Counter()
+        self.runner = None
+
+    async def verify_code(self, request):
+        data = await request.json()
+        self.requests["verify-code"] += 1
+        await asyncio.sleep(self.delay)
+        # Код привязки - это id пользователя, дополненный нулями
+        return web.json_response({"success": True, "user_id": int(data["code"])})
+
+    async def redeem_key(self, request):
+        await request.json()
+        self.requests["redeem-key"] += 1
+        await asyncio.sleep(self.delay)
+        return web.json_response({"success": True, "expires_at": None, "time_left": 30 * 86400})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/api/discord/verify-code", self.verify_code)
+        app.router.add_post("/api/discord/redeem-key", self.redeem_key)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", API_PORT).start()
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.subscriber_role = FakeRole(SUBSCRIBER_ROLE_ID)
+
+    def get_role(self, role_id):
+        return self.subscriber_role if role_id == SUBSCRIBER_ROLE_ID else None
+
+    def get_member(self, member_id):
+        return None
+
+
+class FakeMember:
+    def __init__(self, member_id, guild):
+        self.id = member_id
+        self.name = f"member{member_id}"
+        self.guild = guild
+        self.roles = []
+
+
+class FakeResponse:
+    async def defer(self, ephemeral=False, thinking=False):
+        pass
+
+
+class FakeFollowup:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, content=None, *, embed=None, ephemeral=False):
+        self.messages.append(content if embed is None else embed.title)
+
+
+class FakeInteraction:
+    def __init__(self, user, guild):
+        self.user = user
+        self.guild = guild
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+
+
+def command_callback(name):
+    return bot.bot.tree.get_command(name).callback
+
+
+async def run_command(name, calls, concurrency, make_args, latency):
+    """Вызывает команду calls раз, не более concurrency одновременно"""
+    callback = command_callback(name)
+    semaphore = asyncio.Semaphore(concurrency)
+    replies = collections.Counter()
+
+    async def invoke(index):
+        interaction, args = make_args(index)
+        async with semaphore:
+            with latency.timer(f"/{name}"):
+                await callback(interaction, *args)
+        replies[str(interaction.followup.messages[0]).splitlines()[0]] += 1
+
+    before = query_count["total"]
+    started = time.perf_counter()
+    await asyncio.gather(*(invoke(index) for index in range(calls)))
+    elapsed = time.perf_counter() - started
+    return {
+        "elapsed": elapsed,
+        "queries": (query_count["total"] - before) / calls,
+        "replies": replies
+    }
+
+
+async def run_expiry_check(latency):
+    """Выборки ExpiryScheduler и постановка снятия ролей в очередь"""
+    guild = FakeGuild(1)
+    now = datetime.datetime.utcnow()
+    results = {}
+    for name, func, args in (
+        ("expiry: первая сверка", find_users_without_valid_key, (now,)),
+        ("expiry: истечения за сутки", find_lapsed_users, (now - datetime.timedelta(days=1), now))
+    ):
+        before = query_count["total"]
+        started = time.perf_counter()
+        with latency.timer(name):
+            lapsed = await run_db(func, *args)
+            await bot.queue_subscriber_role([discord_id for user_id, discord_id in lapsed], "remove", [guild])
+        results[name] = {
+            "elapsed": time.perf_counter() - started,
+            "queries": query_count["total"] - before,
+            "replies": collections.Counter({f"пользователей: {len(lapsed)}": 1})
+        }
+    return results
+
+
+async def main():
+    user_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    api_delay = float(sys.argv[4]) / 1000 if len(sys.argv) > 4 else 0.02
+    random.seed(42)
+
+    started = time.perf_counter()
+    seed_database(user_count)
+    print(f"База заполнена: {user_count} пользователей за {time.perf_counter() - started:.1f} с")
+
+    api = StubAPI(api_delay)
+    await api.start()
+    loop_lag = LoopLagMonitor(interval=0.05)
+    loop_lag.start()
+    latency = LatencyRecorder(window=calls)
+    guild = FakeGuild(1)
+
+    def member_interaction(user_id):
+        return FakeInteraction(FakeMember(DISCORD_ID_BASE + user_id, guild), guild)
+
+    def random_user():
+        return random.randint(1, user_count)
+
+    def status_args(index):
+        return member_interaction(random_user()), ()
+
+    def redeem_args(index):
+        user_id = random_user()
+        return member_interaction(user_id), (f"FREE-{user_id:027d}",)
+
+    def code_args(index):
+        user_id = random_user()
+        return member_interaction(user_id), (f"{user_id:06d}",)
+
+    results = {}
+    try:
+        for name, make_args in (("status", status_args), ("redeem", redeem_args), ("code", code_args)):
+            results[f"/{name}"] = await run_command(name, calls, concurrency, make_args, latency)
+        results.update(await run_expiry_check(latency))
+    finally:
+        await api.stop()
+        await bot.api_client.close()
+
+    snapshot = latency.snapshot()
+    print(f"\nВызовов каждой команды: {calls}, одновременно: {concurrency}, задержка API: {api_delay * 1000:.0f} мс")
+    print(f"{'команда':<28}{'p50, мс':>10}{'p99, мс':>10}{'в секунду':>12}{'запросов к БД':>16}")
+    for name, result in results.items():
+        item = snapshot[name]
+        rate = item["count"] / result["elapsed"] if result["elapsed"] else 0.0
+        print(f"{name:<28}{item['p50_ms']:>10}{item['p99_ms']:>10}{rate:>12.1f}{result['queries']:>16.1f}")
+        for reply, count in result["replies"].most_common(3):
+            print(f"    {count:>6} x {reply}")
+
+    lag = loop_lag.snapshot()
+    print(f"\nЗадержка цикла событий: p50 {lag['p50_ms']} мс, p99 {lag['p99_ms']} мс, максимум {lag['max_ms']} мс")
+    print("Запросы к базе по функциям (с ожиданием потока пула):")
+    for name, item in sorted(db_latency.snapshot().items()):
+        print(f"    {name:<32} {item['count']:>7}  p50 {item['p50_ms']} мс, p99 {item['p99_ms']} мс")
+    print(f"Запросов к заглушке API: {dict(api.requests)}")
+    print(f"Изменений ролей в очереди: {await run_db(pending_role_changes)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+import asyncio
+import collections
+
+from database.models import User
+from db_executor import run_db
+
+# Максимум ID в одном запросе участников через шлюз
+QUERY_BATCH = 100
+
+
+def linked_discord_ids(db):
+    return {
+        int(discord_id)
+        for (discord_id,) in db.query(User.discord_id).filter(User.discord_id != None)
+        if discord_id.isdigit()
+    }
+
+
+class LinkedMemberCache:
+    """
+    Кэш участников серверов только для Discord ID, привязанных к аккаунтам сайта.
+    Бот не загружает всех участников (chunking отключён, member_cache_flags пустые),
+    а запрашивает привязанных пачками по 100 ID через шлюз (query_members).
+    Загруженные участники хранятся в кэше сервера discord.py, поэтому их роли
+    обновляются событиями GUILD_MEMBER_UPDATE. ID, которых нет на сервере,
+    запоминаются, чтобы не запрашивать их повторно до входа участника
+    """
+
+    def __init__(self):
+        self.linked = set()
+        self.absent = collections.defaultdict(set)
+        self.locks = collections.defaultdict(asyncio.Lock)
+        self.requests = 0
+        self.tasks = {}
+
+    def start(self, guilds, key=0):
+        """
+        Загрузка привязанных участников серверов (key - шард, к которому они относятся).
+        Пока загрузка шарда идёт, повторный вызов для него не запускает вторую
+        """
+        task = self.tasks.get(key)
+        if task is None or task.done():
+            self.tasks[key] = asyncio.create_task(self.warm(list(guilds)))
+
+    async def warm(self, guilds):
+        try:
+            # Участники могли войти, пока бот был отключён
+            for guild in guilds:
+                self.absent.pop(guild.id, None)
+            self.linked = await run_db(linked_discord_ids)
+            for guild in guilds:
+                await self.ensure(guild, self.linked)
+            print(f"Загружены привязанные участники: {self.cached_count(guilds)} из {len(self.linked)} "
+                  f"(запросов к шлюзу: {self.requests})")
+        except Exception as e:
+            print(f"Ошибка при загрузке привязанных участников: {e}")
+
+    async def ensure(self, guild, discord_ids):
+        """Запрашивает отсутствующих в кэше участников пачками по QUERY_BATCH"""
+        absent = self.absent[guild.id]
+        missing = [int(i) for i in discord_ids if guild.get_member(int(i)) is None and int(i) not in absent]
+        if not missing:
+            return
+        # Один сервер - один запрос за раз, чтобы параллельные вызовы не запрашивали одно и то же
+        async with self.locks[guild.id]:
+            missing = [i for i in missing if guild.get_member(i) is None and i not in absent]
+            for start in range(0, len(missing), QUERY_BATCH):
+                batch = missing[start:start + QUERY_BATCH]
+                members = await guild.query_members(user_ids=batch, limit=QUERY_BATCH, cache=True)
+                self.requests += 1
+                absent.update(set(batch) - {member.id for member in members})
+
+    async def get(self, guild, discord_id):
+        """Участник сервера или None, если его нет на сервере"""
+        member = guild.get_member(discord_id)
+        if member is None and discord_id not in self.absent[guild.id]:
+            await self.ensure(guild, [discord_id])
+            member = guild.get_member(discord_id)
+        return member
+
+    def link(self, discord_id):
+        self.linked.add(int(discord_id))
+
+    def unlink(self, discord_id):
+        self.linked.discard(int(discord_id))
+
+    def joined(self, member):
+        # Вошедший участник будет запрошен при следующем обращении
+        self.absent[member.guild.id].discard(member.id)
+
+    def left(self, guild_id, discord_id):
+        self.absent[guild_id].add(discord_id)
+
+    def cached_count(self, guilds):
+        return sum(1 for guild in guilds for discord_id in self.linked if guild.get_member(discord_id))
@@ -0,0 +1,99 @@
+import time
+import asyncio
+import collections
+
+
+def percentile(values, fraction):
+    """Перцентиль по отсортированному списку (fraction от 0 до 1)"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+class LatencyRecorder:
+    """
+    Задержки по именам (эндпоинт API, команда): хранятся последние window
+    замеров, из них считаются p50/p99. Ошибки считаются отдельно
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.samples = collections.defaultdict(lambda: collections.deque(maxlen=self.window))
+        self.counts = collections.Counter()
+        self.errors = collections.Counter()
+
+    def record(self, name, seconds, error=False):
+        self.samples[name].append(seconds)
+        self.counts[name] += 1
+        if error:
+            self.errors[name] += 1
+
+    def timer(self, name):
+        return Timer(self, name)
+
+    def snapshot(self):
+        result = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            result[name] = {
+                "count": self.counts[name],
+                "errors": self.errors[name],
+                "p50_ms": round(percentile(ordered, 0.5) * 1000, 1),
+                "p99_ms": round(percentile(ordered, 0.99) * 1000, 1)
+            }
+        return result
+
+
+class Timer:
+    """Замер блока кода: async with/with recorder.timer("имя")"""
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.recorder.record(self.name, time.perf_counter() - self.started, error=exc_type is not None)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+class LoopLagMonitor:
+    """
+    Задержка цикла событий: задача засыпает на interval секунд и записывает,
+    насколько позже она проснулась. Рост задержки означает, что что-то
+    блокирует цикл (синхронный запрос к базе, тяжёлые вычисления)
+    """
+
+    def __init__(self, interval=0.5, window=1000):
+        self.interval = interval
+        self.latency = LatencyRecorder(window)
+        self.max_lag = 0.0
+        self.task = None
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.max_lag = max(self.max_lag, lag)
+            self.latency.record("loop_lag", lag)
+
+    def snapshot(self):
+        result = self.latency.snapshot().get("loop_lag", {"p50_ms": 0.0, "p99_ms": 0.0})
+        result["max_ms"] = round(self.max_lag * 1000, 1)
+        return result
@@ -0,0 +1,91 @@
+"""
+Запросы команд бота. Функции выполняются в пуле потоков через run_db,
+получают сессию первым аргументом и возвращают словари вместо объектов ORM
+"""
+import datetime
+
+from sqlalchemy import exists
+
+from database.models import User, Key
+
+
+def valid_keys_query(db, user_id, now):
+    return db.query(Key).filter(
+        Key.user_id == user_id,
+        Key.is_active == True,
+        Key.expires_at > now
+    )
+
+
+def has_valid_key(db, user_id):
+    """Есть ли у пользователя действующий ключ"""
+    now = datetime.datetime.utcnow()
+    return db.query(exists().where(
+        Key.user_id == user_id,
+        Key.is_active == True,
+        Key.expires_at > now
+    )).scalar()
+
+
+def is_discord_entitled(db, discord_id):
+    """Должна ли у Discord аккаунта быть роль подписчика: привязан, не забанен, есть действующий ключ"""
+    user = db.query(User.id, User.is_banned).filter(User.discord_id == discord_id).first()
+    return bool(user) and not user.is_banned and has_valid_key(db, user.id)
+
+
+def serialize_valid_keys(db, user_id):
+    now = datetime.datetime.utcnow()
+    return [
+        {"key": key.key, "time_left": int((key.expires_at - now).total_seconds())}
+        for key in valid_keys_query(db, user_id, now).order_by(Key.expires_at).all()
+    ]
+
+
+def get_subscription_status(db, discord_id):
+    """Статус подписки по Discord ID или None, если аккаунт не привязан"""
+    user = db.query(User).filter(User.discord_id == discord_id).first()
+    if not user:
+        return None
+    return {
+        "username": user.username,
+        "is_banned": user.is_banned,
+        "keys": [] if user.is_banned else serialize_valid_keys(db, user.id)
+    }
+
+
+def set_user_banned(db, username, banned, allow_staff):
+    """
+    Бан или разбан пользователя по имени. Возвращает None, если пользователь не найден,
+    {"forbidden": True}, если нельзя менять статус админа/саппорта, иначе данные
+    для синхронизации роли подписчика
+    """
+    user = db.query(User).filter(User.username == username).first()
+    if not user:
+        return None
+    if not allow_staff and (user.is_admin or user.is_support):
+        return {"forbidden": True}
+
+    user.is_banned = banned
+    db.commit()
+    return {
+        "forbidden": False,
+        "discord_id": user.discord_id,
+        "has_valid_key": bool(user.discord_id) and not banned and has_valid_key(db, user.id)
+    }
+
+
+def get_user_info(db, username):
+    """Данные пользователя для команды /user или None"""
+    user = db.query(User).filter(User.username == username).first()
+    if not user:
+        return None
+    return {
+        "id": user.id,
+        "email": user.email,
+        "created_at": user.created_at,
+        "is_admin": user.is_admin,
+        "is_support": user.is_support,
+        "is_banned": user.is_banned,
+        "discord_id": user.discord_id,
+        "keys": serialize_valid_keys(db, user.id)
+    }
@@ -0,0 +1,158 @@
+import time
+import asyncio
+import datetime
+import collections
+
+import discord
+from sqlalchemy import exists, insert, or_, and_
+from sqlalchemy.orm import aliased
+
+from database.models import User, Key, SentReminder
+from db_executor import run_db
+
+# Окна напоминаний: (имя, верхняя граница, нижняя граница) от текущего момента.
+# Окна не пересекаются, поэтому ключ, истекающий через 30 минут, получает только
+# напоминание "1h", а не оба сразу
+WINDOWS = (
+    ("1h", datetime.timedelta(hours=1), datetime.timedelta(0)),
+    ("24h", datetime.timedelta(hours=24), datetime.timedelta(hours=1))
+)
+# Сколько получателей выбирается и отмечается за раз
+BATCH_SIZE = 50
+# Записи об отправке хранятся ещё сутки после истечения ключа
+KEEP_SENT = datetime.timedelta(days=1)
+
+
+def find_reminder_targets(db, window, lower, upper, min_duration, after, limit):
+    """
+    Пользователи, у которых последний действующий ключ истекает в интервале
+    (lower, upper] и напоминание для этого окна и момента истечения ещё не отправлено.
+    Выборка идёт по индексу keys.expires_at. Ключи не длиннее min_duration секунд
+    пропускаются: напоминание сразу после активации не нужно.
+    after - (expires_at, user_id) последней строки предыдущей пачки или None
+    """
+    later_key = aliased(Key)
+    has_later_key = exists().where(
+        later_key.user_id == Key.user_id,
+        later_key.is_active == True,
+        later_key.expires_at > Key.expires_at
+    )
+    already_sent = exists().where(
+        SentReminder.user_id == Key.user_id,
+        SentReminder.window == window,
+        SentReminder.expires_at == Key.expires_at
+    )
+    query = db.query(User.id, User.discord_id, Key.expires_at).join(User, Key.user_id == User.id).filter(
+        Key.is_active == True,
+        Key.expires_at > lower,
+        Key.expires_at <= upper,
+        Key.duration > min_duration,
+        User.discord_id != None,
+        User.is_banned.isnot(True),
+        ~has_later_key,
+        ~already_sent
+    )
+    if after:
+        last_expires_at, last_user_id = after
+        query = query.filter(or_(
+            Key.expires_at > last_expires_at,
+            and_(Key.expires_at == last_expires_at, User.id > last_user_id)
+        ))
+    return [tuple(row) for row in query.distinct().order_by(Key.expires_at, User.id).limit(limit)]
+
+
+def mark_reminders_sent(db, window, targets):
+    """Отмечает напоминания отправленными одной вставкой"""
+    now = datetime.datetime.utcnow()
+    db.execute(insert(SentReminder), [
+        {"user_id": user_id, "window": window, "expires_at": expires_at, "sent_at": now}
+        for user_id, discord_id, expires_at in targets
+    ])
+    db.commit()
+
+
+def delete_old_reminders(db, before):
+    db.query(SentReminder).filter(SentReminder.expires_at < before).delete(synchronize_session=False)
+    db.commit()
+
+
+class RateLimiter:
+    """Не больше одного действия в interval секунд (общий темп для всех отправок)"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.next_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            delay = self.next_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.next_at = time.monotonic() + self.interval
+
+
+class ReminderScheduler:
+    """
+    Напоминания в личные сообщения за 24 часа и за 1 час до истечения последнего
+    действующего ключа. Раз в interval секунд для каждого окна выполняется выборка
+    по диапазону expires_at, напоминания отправляются не чаще одного в send_interval
+    секунд, а отправленные отмечаются в sent_reminders пачками, поэтому повторно
+    (в том числе после перезапуска) не отправляются. Ошибка отправки повторяется
+    при следующей проверке; закрытые личные сообщения не повторяются
+    """
+
+    def __init__(self, send_reminder, interval=300, send_interval=1.0):
+        # send_reminder(discord_id, expires_at) - корутина отправки сообщения
+        self.send_reminder = send_reminder
+        self.interval = interval
+        self.limiter = RateLimiter(send_interval)
+        self.stats = collections.Counter()
+        self.task = None
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                print(f"Ошибка при отправке напоминаний: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def check(self, now=None):
+        now = now or datetime.datetime.utcnow()
+        await run_db(delete_old_reminders, now - KEEP_SENT)
+        for window, upper, lower in WINDOWS:
+            after = None
+            while True:
+                targets = await run_db(
+                    find_reminder_targets, window, now + lower, now + upper, upper.total_seconds(), after, BATCH_SIZE
+                )
+                if not targets:
+                    break
+                delivered = [target for target in targets if await self.deliver(target)]
+                if delivered:
+                    await run_db(mark_reminders_sent, window, delivered)
+                if len(targets) < BATCH_SIZE:
+                    break
+                after = (targets[-1][2], targets[-1][0])
+
+    async def deliver(self, target):
+        """True, если напоминание отправлено или отправлять его бесполезно"""
+        user_id, discord_id, expires_at = target
+        await self.limiter.wait()
+        try:
+            await self.send_reminder(discord_id, expires_at)
+            self.stats["sent"] += 1
+            return True
+        except (discord.Forbidden, discord.NotFound):
+            # Личные сообщения закрыты или аккаунт удалён
+            self.stats["undeliverable"] += 1
+            return True
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"Ошибка при отправке напоминания пользователю {discord_id}: {e}")
+            return False
@@ -0,0 +1,301 @@
+import asyncio
+import datetime
+import collections
+
+import discord
+from sqlalchemy import func, insert
+
+from database.models import RoleChange
+from db_executor import run_db
+from sharding import shard_for_guild, is_shard_ready
+
+# После стольких неудачных попыток изменение отбрасывается
+MAX_ATTEMPTS = 8
+# Пауза перед повтором: RETRY_BASE * 2^попытка, но не больше RETRY_MAX секунд
+RETRY_BASE = 2
+RETRY_MAX = 600
+# Сколько изменений забирается из очереди за раз
+BATCH_SIZE = 100
+# Сколько ID участников проверяется одним запросом при постановке в очередь
+UPSERT_BATCH = 500
+# Через сколько секунд повторить изменения серверов шарда, который переподключается
+SHARD_WAIT = 5
+
+
+def upsert_role_changes(db, changes):
+    """
+    Ставит изменения (guild_id, discord_id, role_id, action) в очередь.
+    Для участника и роли остаётся одно последнее действие: выдача и снятие
+    подряд схлопываются, а повторная постановка увеличивает revision,
+    чтобы обработчик не удалил запись, изменённую во время применения
+    """
+    desired = {}
+    for guild_id, discord_id, role_id, action in changes:
+        desired[(str(guild_id), str(discord_id), str(role_id))] = action
+
+    # Уже стоящие в очереди записи загружаются пачками по серверу и роли,
+    # а не отдельным запросом на каждого участника
+    by_guild_role = collections.defaultdict(list)
+    for guild_id, discord_id, role_id in desired:
+        by_guild_role[(guild_id, role_id)].append(discord_id)
+    existing = {}
+    for (guild_id, role_id), discord_ids in by_guild_role.items():
+        for start in range(0, len(discord_ids), UPSERT_BATCH):
+            rows = db.query(RoleChange).filter(
+                RoleChange.guild_id == guild_id,
+                RoleChange.role_id == role_id,
+                RoleChange.discord_id.in_(discord_ids[start:start + UPSERT_BATCH])
+            )
+            existing.update({(row.guild_id, row.discord_id, row.role_id): row for row in rows})
+
+    now = datetime.datetime.utcnow()
+    new_rows = []
+    for (guild_id, discord_id, role_id), action in desired.items():
+        row = existing.get((guild_id, discord_id, role_id))
+        if row:
+            row.action = action
+            row.revision += 1
+            row.attempts = 0
+            row.next_attempt_at = now
+            row.last_error = None
+        else:
+            new_rows.append({"guild_id": guild_id, "discord_id": discord_id, "role_id": role_id,
+                             "action": action, "next_attempt_at": now})
+    # Новые записи вставляются одним executemany (ORM вставлял бы их по одной ради id)
+    if new_rows:
+        db.execute(insert(RoleChange), new_rows)
+    db.commit()
+
+
+def due_role_changes(db, now, limit):
+    rows = db.query(RoleChange).filter(
+        RoleChange.next_attempt_at <= now
+    ).order_by(RoleChange.next_attempt_at).limit(limit).all()
+    return [
+        {
+            "id": row.id,
+            "guild_id": row.guild_id,
+            "discord_id": row.discord_id,
+            "role_id": row.role_id,
+            "action": row.action,
+            "revision": row.revision,
+            "attempts": row.attempts
+        }
+        for row in rows
+    ]
+
+
+def finish_role_changes(db, items):
+    """Удаляет применённые (или отброшенные) изменения, если их не перезаписали"""
+    for item in items:
+        db.query(RoleChange).filter(
+            RoleChange.id == item["id"],
+            RoleChange.revision == item["revision"]
+        ).delete(synchronize_session=False)
+    db.commit()
+
+
+def retry_role_changes(db, items, next_attempt_at, error):
+    for item in items:
+        db.query(RoleChange).filter(
+            RoleChange.id == item["id"],
+            RoleChange.revision == item["revision"]
+        ).update({
+            RoleChange.attempts: item["attempts"] + 1,
+            RoleChange.next_attempt_at: next_attempt_at,
+            RoleChange.last_error: error[:500]
+        }, synchronize_session=False)
+    db.commit()
+
+
+def postpone_role_changes(db, items, next_attempt_at):
+    """Откладывает изменения без увеличения числа попыток"""
+    for item in items:
+        db.query(RoleChange).filter(
+            RoleChange.id == item["id"],
+            RoleChange.revision == item["revision"]
+        ).update({RoleChange.next_attempt_at: next_attempt_at}, synchronize_session=False)
+    db.commit()
+
+
+def next_role_change_at(db):
+    return db.query(func.min(RoleChange.next_attempt_at)).scalar()
+
+
+def pending_role_changes(db):
+    return db.query(func.count(RoleChange.id)).scalar()
+
+
+class RoleQueue:
+    """
+    Постоянная очередь изменений ролей Discord. Команды и фоновые задачи только
+    ставят изменения в таблицу role_changes, а задача очереди применяет их:
+    изменения одного участника объединяются в один запрос, запросы к одному серверу
+    идут не чаще guild_interval секунд, ошибки Discord повторяются с нарастающей
+    паузой. Очередь хранится в базе, поэтому переживает перезапуск бота
+    """
+
+    def __init__(self, client, get_member, prefetch_members=None, guild_interval=0.5, max_sleep=60):
+        # get_member - корутина (guild, discord_id) -> участник или None,
+        # prefetch_members - необязательная корутина (guild, discord_ids) для загрузки участников пачкой
+        self.client = client
+        self.get_member = get_member
+        self.prefetch_members = prefetch_members
+        self.guild_interval = guild_interval
+        self.max_sleep = max_sleep
+        self.wake_event = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.guild_ready_at = {}
+        self.stats = collections.Counter()
+        self.task = None
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def enqueue(self, changes):
+        if not changes:
+            return
+        # Постановки выполняются по очереди, чтобы две одновременные не создали дубликат
+        async with self.lock:
+            await run_db(upsert_role_changes, changes)
+        self.wake_event.set()
+
+    async def run(self):
+        while True:
+            try:
+                delay = await self.drain()
+            except Exception as e:
+                print(f"Ошибка при обработке очереди ролей: {e}")
+                delay = self.max_sleep
+
+            try:
+                await asyncio.wait_for(self.wake_event.wait(), timeout=max(delay, 0))
+            except asyncio.TimeoutError:
+                pass
+            self.wake_event.clear()
+
+    async def drain(self):
+        """Применяет все созревшие изменения; возвращает паузу до следующего"""
+        while True:
+            due = await run_db(due_role_changes, datetime.datetime.utcnow(), BATCH_SIZE)
+            if not due:
+                break
+
+            # Изменения делятся по шардам: сервера шарда, который переподключается,
+            # откладываются и не задерживают остальные. Серверы обрабатываются
+            # параллельно, участники одного сервера - по очереди
+            by_shard = collections.defaultdict(
+                lambda: collections.defaultdict(lambda: collections.defaultdict(list))
+            )
+            for item in due:
+                shard_id = shard_for_guild(item["guild_id"], self.client.shard_count)
+                by_shard[shard_id][item["guild_id"]][item["discord_id"]].append(item)
+
+            tasks = []
+            for shard_id, guilds in by_shard.items():
+                if not is_shard_ready(self.client, shard_id):
+                    waiting = [item for members in guilds.values() for items in members.values() for item in items]
+                    next_attempt_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=SHARD_WAIT)
+                    await run_db(postpone_role_changes, waiting, next_attempt_at)
+                    self.stats["postponed"] += len(waiting)
+                    continue
+                tasks.extend(self.apply_guild(guild_id, members) for guild_id, members in guilds.items())
+            await asyncio.gather(*tasks)
+
+        next_at = await run_db(next_role_change_at)
+        if next_at is None:
+            return self.max_sleep
+        return min(self.max_sleep, (next_at - datetime.datetime.utcnow()).total_seconds())
+
+    async def apply_guild(self, guild_id, members):
+        guild = self.client.get_guild(int(guild_id))
+        if guild is not None and self.prefetch_members:
+            try:
+                await self.prefetch_members(guild, [int(discord_id) for discord_id in members])
+            except Exception as e:
+                # Участники будут запрошены по одному в apply_member
+                print(f"Ошибка при загрузке участников сервера {guild_id}: {e!r}")
+        for discord_id, items in members.items():
+            if guild is None:
+                # Сервер ещё не доступен (бот подключается) - попробуем позже
+                await self.retry(items, "Сервер недоступен")
+                continue
+            await self.apply_member(guild, discord_id, items)
+
+    async def apply_member(self, guild, discord_id, items):
+        try:
+            member = await self.get_member(guild, int(discord_id))
+            if member is None:
+                # Участник покинул сервер - менять нечего
+                await self.finish(items, "skipped")
+                return
+
+            to_add, to_remove = [], []
+            for item in items:
+                role = guild.get_role(int(item["role_id"]))
+                if role is None:
+                    continue
+                if item["action"] == "add" and role not in member.roles:
+                    to_add.append(role)
+                elif item["action"] == "remove" and role in member.roles:
+                    to_remove.append(role)
+
+            if to_add or to_remove:
+                await self.pace(guild.id)
+                if len(to_add) + len(to_remove) == 1:
+                    if to_add:
+                        await member.add_roles(*to_add, reason="Подписка")
+                    else:
+                        await member.remove_roles(*to_remove, reason="Подписка")
+                else:
+                    # Несколько изменений одного участника - одним запросом
+                    roles = [role for role in member.roles[1:] if role not in to_remove] + to_add
+                    await member.edit(roles=roles, reason="Подписка")
+                for role in to_add:
+                    print(f"Пользователю {member.name} выдана роль {role.name}")
+                for role in to_remove:
+                    print(f"У пользователя {member.name} удалена роль {role.name}")
+                await self.finish(items, "applied")
+            else:
+                await self.finish(items, "skipped")
+        except (discord.Forbidden, discord.NotFound) as e:
+            # Повтор не поможет: у бота нет прав или участник/роль удалены
+            print(f"Не удалось изменить роли пользователя {discord_id}: {e}")
+            await self.finish(items, "dropped")
+        except asyncio.TimeoutError:
+            await self.retry(items, "Таймаут запроса участника")
+        except discord.RateLimited as e:
+            await self.retry(items, str(e), e.retry_after)
+        except discord.HTTPException as e:
+            retry_after = None
+            if e.status == 429 and e.response is not None:
+                retry_after = float(e.response.headers.get("Retry-After", 0) or 0)
+            await self.retry(items, str(e), retry_after)
+
+    async def pace(self, guild_id):
+        """Не чаще одного запроса к серверу в guild_interval секунд"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        ready_at = max(self.guild_ready_at.get(guild_id, now), now)
+        self.guild_ready_at[guild_id] = ready_at + self.guild_interval
+        if ready_at > now:
+            await asyncio.sleep(ready_at - now)
+
+    async def finish(self, items, outcome):
+        await run_db(finish_role_changes, items)
+        self.stats[outcome] += len(items)
+
+    async def retry(self, items, error, retry_after=None):
+        retry, dropped = [], []
+        for item in items:
+            (retry if item["attempts"] + 1 < MAX_ATTEMPTS else dropped).append(item)
+        if dropped:
+            print(f"Изменение ролей пользователя {dropped[0]['discord_id']} отброшено после {MAX_ATTEMPTS} попыток: {error}")
+            await self.finish(dropped, "dropped")
+        if retry:
+            attempts = max(item["attempts"] for item in retry)
+            delay = max(min(RETRY_MAX, RETRY_BASE * 2 ** attempts), retry_after or 0)
+            next_attempt_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=delay)
+            await run_db(retry_role_changes, retry, next_attempt_at, error)
+            self.stats["retried"] += len(retry)
@@ -0,0 +1,93 @@
+import time
+import asyncio
+
+
+def shard_for_guild(guild_id, shard_count):
+    """Шард сервера по формуле Discord: (guild_id >> 22) % shard_count"""
+    if not shard_count:
+        return 0
+    return (int(guild_id) >> 22) % shard_count
+
+
+def client_shard_ids(client):
+    """ID шардов клиента; у бота без шардирования один шард 0"""
+    shards = getattr(client, "shards", None)
+    if shards:
+        return sorted(shards)
+    return [0]
+
+
+def is_shard_ready(client, shard_id):
+    """Подключён ли шард к шлюзу; пока он переподключается, изменения его серверов откладываются"""
+    if getattr(client, "shards", None):
+        shard = client.get_shard(shard_id)
+        return shard is not None and not shard.is_closed()
+    return client.is_ready() and not client.is_closed()
+
+
+def shard_websocket(client, shard_id):
+    if getattr(client, "shards", None):
+        shard = client.get_shard(shard_id)
+        parent = getattr(shard, "_parent", None)
+        return getattr(parent, "ws", None)
+    return getattr(client, "ws", None)
+
+
+def shard_latencies(client):
+    """[(shard_id, задержка в секундах)]"""
+    if getattr(client, "shards", None):
+        return list(client.latencies)
+    return [(0, client.latency)]
+
+
+class ShardMonitor:
+    """
+    Метрики по шардам: задержка шлюза, число серверов и частота событий.
+    Частота считается по номеру последовательности событий шлюза (sequence),
+    который шлюз увеличивает на каждое событие шарда; новая сессия сбрасывает его
+    """
+
+    def __init__(self, client, interval=10):
+        self.client = client
+        self.interval = interval
+        self.last = {}
+        self.rates = {}
+        self.task = None
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    def sample(self, now=None):
+        now = time.monotonic() if now is None else now
+        for shard_id in client_shard_ids(self.client):
+            ws = shard_websocket(self.client, shard_id)
+            sequence = getattr(ws, "sequence", None)
+            if sequence is None:
+                continue
+            previous = self.last.get(shard_id)
+            if previous and sequence >= previous[1] and now > previous[0]:
+                self.rates[shard_id] = (sequence - previous[1]) / (now - previous[0])
+            self.last[shard_id] = (now, sequence)
+
+    async def run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def snapshot(self):
+        guilds = {}
+        count = self.client.shard_count
+        for guild in self.client.guilds:
+            shard_id = shard_for_guild(guild.id, count)
+            guilds[shard_id] = guilds.get(shard_id, 0) + 1
+
+        result = {}
+        for shard_id, latency in shard_latencies(self.client):
+            result[shard_id] = {
+                "ready": is_shard_ready(self.client, shard_id),
+                "latency_ms": round(latency * 1000, 1) if latency == latency and latency != float("inf") else None,
+                "events_per_sec": round(self.rates.get(shard_id, 0.0), 2),
+                "guilds": guilds.get(shard_id, 0)
+            }
+        return result
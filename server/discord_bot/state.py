@@ -0,0 +1,42 @@
+from sqlalchemy import inspect, text
+
+from database.models import BotState, RoleChange, DomainEvent, SentReminder, engine
+
+# Таблицы, которые создаёт сам бот
+BOT_TABLES = (BotState, RoleChange, DomainEvent, SentReminder)
+
+# Индексы, на которые опираются выборки бота (в новой базе их создаёт create_all)
+BOT_INDEXES = {
+    "ix_keys_expires_at": "keys (expires_at)",
+    "ix_keys_user_id": "keys (user_id)"
+}
+
+
+def ensure_bot_schema():
+    """Создаёт таблицы бота и индексы, если база создана до их появления"""
+    inspector = inspect(engine)
+    for model in BOT_TABLES:
+        if not inspector.has_table(model.__tablename__):
+            print(f"Таблица {model.__tablename__} не существует, создаем...")
+            model.__table__.create(bind=engine)
+
+    if not inspector.has_table("keys"):
+        return
+    with engine.begin() as connection:
+        for name, definition in BOT_INDEXES.items():
+            connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}"))
+
+
+def load_state(db, name):
+    """Значение из bot_state или None (вызывается через run_db)"""
+    state = db.query(BotState).filter(BotState.name == name).first()
+    return state.value if state else None
+
+
+def save_state(db, name, value):
+    state = db.query(BotState).filter(BotState.name == name).first()
+    if state:
+        state.value = value
+    else:
+        db.add(BotState(name=name, value=value))
+    db.commit()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""
+Минимальный фронт-сервер для локальной проверки режима MOD_TRANSFER_MODE=accel.
+
+Проксирует запросы на Flask, а ответы с X-Accel-Redirect обслуживает сам:
+читает файл из директории модов и отдаёт его через sendfile (с поддержкой Range),
+как это делает nginx. Для продакшена используйте nginx (см. docs/SETUP.md).
+
+Запуск: python accel_server.py [порт] [адрес_flask]
+"""
+import os
+import sys
+import re
+import http.client
+import logging
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, unquote
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "mods")
+MOD_ACCEL_PREFIX = os.getenv("MOD_ACCEL_PREFIX", "/internal/mods/")
+
+# Заголовки, которые не передаются между соединениями
+HOP_BY_HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "upgrade", "content-length"}
+
+# Заголовки ответа Flask, которые nginx сохраняет при X-Accel-Redirect (остальные,
+# в том числе ETag и Content-Encoding, отбрасываются)
+ACCEL_KEPT_HEADERS = {"content-type", "content-disposition", "accept-ranges", "set-cookie", "cache-control", "expires"}
+
+
+class AccelHandler(BaseHTTPRequestHandler):
+    upstream = "127.0.0.1:5000"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.proxy()
+
+    def do_HEAD(self):
+        self.proxy()
+
+    def do_POST(self):
+        self.proxy()
+
+    def proxy(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else None
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+
+        connection = http.client.HTTPConnection(self.upstream, timeout=30)
+        try:
+            connection.request(self.command, self.path, body=body, headers=headers)
+            upstream_response = connection.getresponse()
+            upstream_body = upstream_response.read()
+        finally:
+            connection.close()
+
+        redirect = upstream_response.getheader("X-Accel-Redirect")
+        if redirect and redirect.startswith(MOD_ACCEL_PREFIX):
+            self.send_internal_file(upstream_response, unquote(urlsplit(redirect).path[len(MOD_ACCEL_PREFIX):]))
+            return
+
+        self.send_response(upstream_response.status)
+        for name, value in upstream_response.getheaders():
+            if name.lower() not in HOP_BY_HOP_HEADERS:
+                self.send_header(name, value)
+        self.send_header("Content-Length", str(len(upstream_body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(upstream_body)
+
+    def send_internal_file(self, upstream_response, file_name):
+        """
+        Отдаёт файл из MODS_DIR через sendfile, как internal location nginx
+        из docs/SETUP.md: etag off и add_header ETag $upstream_http_etag
+        """
+        path = os.path.join(MODS_DIR, os.path.basename(file_name))
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        etag = upstream_response.getheader("ETag")
+
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        status = 200
+
+        # Поддерживается один диапазон вида bytes=N- или bytes=N-M
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        if match and (not if_range or if_range == etag):
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            if start >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+
+        self.send_response(status)
+        for name, value in upstream_response.getheaders():
+            if name.lower() in ACCEL_KEPT_HEADERS and name.lower() != "accept-ranges":
+                self.send_header(name, value)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+
+        if self.command != "HEAD":
+            self.wfile.flush()
+            with open(path, "rb") as f:
+                self.connection.sendfile(f, offset=start, count=end - start + 1)
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
+    AccelHandler.upstream = sys.argv[2] if len(sys.argv) > 2 else "127.0.0.1:5000"
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), AccelHandler)
+    logger.info(f"Фронт-сервер запущен на порту {port}, Flask: {AccelHandler.upstream}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from flask import Flask, request, jsonify, send_from_directory
 from flask_restful import Api, Resource
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, verify_jwt_in_request
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
@@ -9,9 +9,15 @@ import datetime
 import secrets
 import string
 from passlib.context import CryptContext
-from sqlalchemy import inspect
+from sqlalchemy import inspect, or_, and_, insert, literal, text, func, case, DateTime
+from sqlalchemy.orm import joinedload, contains_eager
+from sqlalchemy.exc import IntegrityError
+import re
 import time
+import hashlib
 import logging
+import mimetypes
+from urllib.parse import quote
 from dotenv import load_dotenv
 
 # Настройка логирования
@@ -37,7 +43,14 @@ DB_PATH = os.path.abspath(os.path.join(parent_dir, 'database.db'))
 os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
 # print(f"Установлен DATABASE_URL: {os.environ['DATABASE_URL']}")
 
-from database.models import SessionLocal, User, Key, Invite, DiscordCode, RoleLimits, Base, engine
+from database.models import SessionLocal, User, Key, Invite, DiscordCode, RoleLimits, DeletedRow, DomainEvent, Base, engine
+from mod_index import ModIndex, ENCODING_SUFFIXES
+from download_scheduler import DownloadScheduler
+from entitlements import EntitlementCache
+from static_assets import StaticAssets, BUILD_DIR, ENCODING_SUFFIXES as STATIC_ENCODING_SUFFIXES
+from json_encoding import FastJSONProvider, ResponseCompressor, get_encoder
+from serializers import serialize_admin_user, serialize_admin_key, serialize_invite
+from events import BotNotifier, publish_event
 
 # Настройка шифрования паролей
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -47,6 +60,61 @@ app = Flask(__name__, static_folder="static")
 CORS(app)
 api = Api(app)
 
+# Кодировщик JSON-ответов (JSON_ENCODER=orjson|json, по умолчанию orjson, если установлен)
+JSON_ENCODER, encode_json = get_encoder(os.getenv("JSON_ENCODER"))
+app.json = FastJSONProvider(app, encode_json)
+
+# Сжатие JSON-ответов больше указанного размера в байтах (0 - без сжатия)
+response_compressor = ResponseCompressor(min_size=int(os.getenv("JSON_COMPRESS_MIN_SIZE", "1024")))
+
+@api.representation("application/json")
+def output_json(data, code, headers=None):
+    response = app.response_class(encode_json(data), status=code, mimetype="application/json")
+    response.headers.extend(headers or {})
+    return response
+
+@app.after_request
+def compress_json_response(response):
+    return response_compressor.compress(response, request.accept_encodings)
+
+# Директория с модами и индекс их хешей
+MODS_DIR = os.path.join(app.static_folder, "mods")
+mod_index = ModIndex(MODS_DIR, rescan_interval=int(os.getenv("MOD_RESCAN_INTERVAL", "30")))
+
+# Способ передачи файлов модов:
+#   flask    - файл отдаёт сам воркер Flask (по умолчанию)
+#   accel    - только проверки, передачу выполняет nginx по заголовку X-Accel-Redirect
+#   sendfile - заголовок X-Sendfile для Apache/lighttpd
+MOD_TRANSFER_MODE = os.getenv("MOD_TRANSFER_MODE", "flask").lower()
+# Внутренний location nginx, указывающий на MODS_DIR
+MOD_ACCEL_PREFIX = os.getenv("MOD_ACCEL_PREFIX", "/internal/mods/")
+app.use_x_sendfile = MOD_TRANSFER_MODE == "sendfile"
+
+# Статика SPA с отпечатками хешей в именах (STATIC_FINGERPRINT=0 - отдавать исходные файлы)
+static_assets = None
+if os.getenv("STATIC_FINGERPRINT", "1") != "0":
+    static_assets = StaticAssets(app.static_folder)
+    static_assets.build()
+
+# Кэш права на скачивание модов (секунд, 0 - без кэша; не больше maxsize записей)
+entitlement_cache = EntitlementCache(
+    ttl=int(os.getenv("ENTITLEMENT_CACHE_TTL", "60")),
+    maxsize=int(os.getenv("ENTITLEMENT_CACHE_SIZE", "10000"))
+)
+
+# События для Discord бота: после фиксации транзакции с событиями бот будится датаграммой
+# на BOT_EVENTS_ADDR (пустое значение - бот только периодически проверяет таблицу событий)
+bot_notifier = BotNotifier(os.getenv("BOT_EVENTS_ADDR", "127.0.0.1:5055"))
+bot_notifier.install(SessionLocal)
+
+# Планировщик загрузок: лимиты одновременных передач и полосы (КБ/с, 0 - без ограничения)
+download_scheduler = DownloadScheduler(
+    max_active=int(os.getenv("DOWNLOAD_MAX_ACTIVE", "20")),
+    max_per_user=int(os.getenv("DOWNLOAD_MAX_PER_USER", "2")),
+    global_rate=int(os.getenv("DOWNLOAD_GLOBAL_RATE_KB", "0")) * 1024,
+    user_rate=int(os.getenv("DOWNLOAD_USER_RATE_KB", "0")) * 1024
+)
+
 # Базовая диагностическая информация без лишних деталей
 logger.info(f"Используется база данных: {DB_PATH}")
 
@@ -86,9 +154,35 @@ def init_database():
                 db.close()
         else:
             print("Таблица role_limits уже существует")
+        
+        migrate_sync_columns()
+        
+        if not inspect(engine).has_table('domain_events'):
+            print("Таблица domain_events не существует, создаем...")
+            DomainEvent.__table__.create(bind=engine)
     except Exception as e:
         print(f"Ошибка при инициализации базы данных: {str(e)}")
 
+# Таблицы, изменения которых админ-панель получает через синхронизацию
+SYNC_COLUMN_TABLES = ("users", "keys", "invites")
+
+# Добавление колонок updated_at и таблицы удалённых строк в существующую базу
+def migrate_sync_columns():
+    inspector = inspect(engine)
+    if not inspector.has_table('deleted_rows'):
+        print("Таблица deleted_rows не существует, создаем...")
+        DeletedRow.__table__.create(bind=engine)
+    
+    with engine.begin() as connection:
+        for table in SYNC_COLUMN_TABLES:
+            columns = [column["name"] for column in inspector.get_columns(table)]
+            if "updated_at" not in columns:
+                print(f"Добавление поля updated_at в таблицу {table}")
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN updated_at TIMESTAMP"))
+                # Существующие записи считаются изменёнными в момент создания
+                connection.execute(text(f"UPDATE {table} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)"))
+            connection.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_updated_at ON {table} (updated_at)"))
+
 # Вызываем инициализацию при запуске
 init_database()
 
@@ -122,7 +216,7 @@ def get_client_ip():
             # В режиме разработки запрашиваем внешний IP через сервис
             # Это нужно только для тестирования
             import urllib.request
-            external_ip = urllib.request.urlopen('https://api.ipify.org').read().decode('utf8')
+            external_ip = urllib.request.urlopen('https://api.ipify.org', timeout=3).read().decode('utf8')
             if external_ip and external_ip != '127.0.0.1':
                 ip = external_ip
         except:
@@ -139,11 +233,274 @@ def hash_password(password):
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
+# Определение колонки, нарушившей уникальное ограничение
+UNIQUE_USER_COLUMNS = ("email", "username", "discord_id")
+
+def unique_violation_column(error):
+    """
+    Возвращает имя колонки users, на которой сработал UNIQUE (username, email или discord_id).
+    Колонка берётся из имени ограничения, а не из всего текста ошибки:
+    в DETAIL Postgres есть и введённое значение
+    """
+    orig = getattr(error, "orig", error)
+    constraint = getattr(getattr(orig, "diag", None), "constraint_name", None)
+    if constraint:
+        # Postgres: имя ограничения по умолчанию users_<колонка>_key
+        match = re.fullmatch(r"users_(\w+)_key", constraint)
+    else:
+        # SQLite: "UNIQUE constraint failed: users.<колонка>"
+        match = re.search(r"UNIQUE constraint failed: users\.(\w+)", str(orig))
+    if match and match.group(1) in UNIQUE_USER_COLUMNS:
+        return match.group(1)
+    return None
+
+# Получение пользователя для запросов лоадера
+def get_loader_user(db):
+    """
+    Определяет пользователя по JWT (сайт) или по ключу из заголовка X-Loader-Key (лоадер).
+    Для ключа требуется, чтобы он был привязан, активен и не истёк
+    """
+    verify_jwt_in_request(optional=True)
+    user_id = get_jwt_identity()
+    if user_id is not None:
+        return db.query(User).filter(User.id == user_id).first()
+    
+    key_string = request.headers.get("X-Loader-Key")
+    if not key_string:
+        return None
+    
+    key = db.query(Key).filter(
+        Key.key == key_string,
+        Key.is_active == True,
+        Key.expires_at > datetime.datetime.utcnow()
+    ).first()
+    if not key or key.user_id is None:
+        return None
+    
+    return db.query(User).filter(User.id == key.user_id).first()
+
+# Проверка права на скачивание модов с кэшированием
+def get_download_entitlement(db):
+    """
+    Проверяет авторизацию лоадера, бан и наличие действующего ключа.
+    Результат кэшируется на пользователя, поэтому синхронизация набора модов
+    обращается к базе один раз. Возвращает запись кэша (user_id, username, error)
+    или None, если запрос не авторизован
+    """
+    verify_jwt_in_request(optional=True)
+    user_id = get_jwt_identity()
+    key_string = request.headers.get("X-Loader-Key") if user_id is None else None
+    if user_id is None and not key_string:
+        return None
+    
+    credential = ("user", user_id) if user_id is not None else ("key", key_string)
+    entry = entitlement_cache.get(credential)
+    if entry:
+        return entry
+    
+    now = datetime.datetime.utcnow()
+    if user_id is not None:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            return None
+        key = db.query(Key).filter(
+            Key.user_id == user.id,
+            Key.is_active == True,
+            Key.expires_at > now
+        ).order_by(Key.expires_at.desc()).first()
+    else:
+        key = db.query(Key).filter(
+            Key.key == key_string,
+            Key.is_active == True,
+            Key.expires_at > now
+        ).first()
+        # Неизвестные ключи не кэшируются
+        if not key or key.user_id is None:
+            return None
+        user = db.query(User).filter(User.id == key.user_id).first()
+        if not user:
+            return None
+    
+    if user.is_banned:
+        return entitlement_cache.put(credential, user.id, user.username, error=("Ваш аккаунт заблокирован", 403))
+    if not key:
+        return entitlement_cache.put(credential, user.id, user.username, error=("Нет активного ключа", 403))
+    
+    return entitlement_cache.put(
+        credential,
+        user.id,
+        user.username,
+        expires_in=(key.expires_at - now).total_seconds()
+    )
+
+# Ответ с внутренним перенаправлением передачи файла на nginx
+def accel_redirect_response(file_name, download_name, etag):
+    """
+    Возвращает пустой ответ с X-Accel-Redirect: воркер освобождается сразу,
+    а файл (включая Range) отдаёт nginx через sendfile. Из заголовков ответа nginx
+    сохраняет только Content-Type, Content-Disposition, Accept-Ranges, Set-Cookie,
+    Cache-Control и Expires; ETag возвращается в internal location через add_header.
+    Без etag (хеш файла не подтверждён) nginx не выполняет докачку по If-Range
+    """
+    if etag and request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    
+    response = app.response_class(status=200)
+    response.headers["X-Accel-Redirect"] = MOD_ACCEL_PREFIX + quote(file_name)
+    response.headers["Content-Disposition"] = f'attachment; filename="{download_name}"'
+    response.mimetype = mimetypes.guess_type(download_name)[0] or "application/octet-stream"
+    if etag:
+        response.set_etag(etag)
+    return response
+
+# Передача файла через планировщик загрузок
+def scheduled_transfer(entitlement, name, size, make_response):
+    """
+    Занимает слот планировщика и оборачивает тело ответа ограничителем скорости.
+    Если слотов нет, возвращает 503 с Retry-After - клиент повторит запрос
+    и сохранит место в очереди
+    """
+    transfer, retry_after = download_scheduler.acquire(entitlement["user_id"], entitlement["username"], name, size)
+    if not transfer:
+        return {"message": "Сервер загрузок занят, повторите позже", "retry_after": retry_after}, 503, {"Retry-After": str(retry_after)}
+    
+    try:
+        response = make_response()
+    except Exception:
+        download_scheduler.release(transfer)
+        raise
+    
+    # 304 и ответы с X-Sendfile не несут тела - слот освобождается сразу
+    if response.status_code in (200, 206) and not app.use_x_sendfile:
+        response.direct_passthrough = False
+        response.response = download_scheduler.wrap(transfer, response.response)
+    else:
+        download_scheduler.release(transfer)
+    return response
+
 # Генерация случайного кода для привязки Discord аккаунта
 def generate_discord_code():
     chars = string.ascii_uppercase + string.digits
     return ''.join(secrets.choice(chars) for _ in range(6))
 
+# Максимальный размер страницы в списках админ-панели
+ADMIN_PAGE_LIMIT = 500
+
+# Постраничная выборка для списков админ-панели
+def paginate_admin_query(query, model, search_columns):
+    """
+    Поддерживает параметры limit, cursor и search. Без limit (или при limit <= 0)
+    возвращает весь список; limit больше ADMIN_PAGE_LIMIT уменьшается до него.
+    Страницы идут от новых записей к старым; cursor - id последней полученной записи.
+    Возвращает (записи, следующий cursor или None, общее число записей с учётом поиска)
+    """
+    search = request.args.get("search", "").strip()
+    if search:
+        query = query.filter(or_(*[column.ilike(f"%{search}%") for column in search_columns]))
+    
+    total = query.count()
+    query = query.order_by(model.id.desc())
+    
+    limit = request.args.get("limit", type=int)
+    if not limit or limit <= 0:
+        return query.all(), None, total
+    limit = min(limit, ADMIN_PAGE_LIMIT)
+    
+    cursor = request.args.get("cursor", type=int)
+    if cursor:
+        query = query.filter(model.id < cursor)
+    
+    items = query.limit(limit + 1).all()
+    if len(items) > limit:
+        items = items[:limit]
+        return items, items[-1].id, total
+    return items, None, total
+
+# Запас при выборке изменений: запись получает updated_at до commit,
+# и транзакция, завершившаяся позже чтения курсора, не должна потеряться
+SYNC_CURSOR_OVERLAP = datetime.timedelta(seconds=5)
+
+# Сколько хранятся записи об удалённых строках; более старый курсор требует полной перезагрузки
+DELETED_ROWS_RETENTION = datetime.timedelta(days=7)
+
+# Больше изменений за раз не отдаётся - дешевле перезагрузить список целиком
+SYNC_CHANGES_LIMIT = 1000
+
+# Курсор синхронизации - момент на сервере, до которого изменения уже получены
+def make_sync_cursor(moment=None):
+    return (moment or datetime.datetime.utcnow()).isoformat()
+
+def parse_sync_cursor(value):
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+# Запись id удаляемых строк в той же транзакции, что и удаление
+def record_deleted_rows(db, model, query):
+    """Сохраняет id строк, выбранных query, до их удаления; заодно удаляет устаревшие записи"""
+    now = datetime.datetime.utcnow()
+    db.execute(insert(DeletedRow).from_select(
+        ["table_name", "row_id", "deleted_at"],
+        query.with_entities(literal(model.__tablename__), model.id, literal(now, DateTime())).statement
+    ))
+    db.query(DeletedRow).filter(DeletedRow.deleted_at < now - DELETED_ROWS_RETENTION).delete(synchronize_session=False)
+
+# Оставшееся время ключей в ответах меняется само по себе: ETag списков ключей
+# обновляется раз в столько секунд (точность отображения в SPA - минуты)
+KEY_ETAG_INTERVAL = 60
+
+# 304 для JSON-ответов. Сжатый ответ получает слабую версию ETag (см. ResponseCompressor),
+# поэтому If-None-Match сравнивается слабо, а в 304 ETag возвращается в том виде,
+# в каком его прислал клиент
+def not_modified_response(etag):
+    """Пустой 304, если клиент прислал этот ETag, иначе None"""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = app.response_class(status=304)
+    response.set_etag(etag, weak=not request.if_none_match.contains(etag))
+    return response
+
+# Условный GET для JSON-ответов: ETag строится по версии данных, а не по телу
+def conditional_response(version, build):
+    """
+    version - значения, которые меняются вместе с содержимым ответа
+    (id и updated_at записи, число строк и последнее изменение таблицы).
+    Если клиент прислал тот же ETag, build() не вызывается и возвращается пустой 304
+    """
+    etag = hashlib.sha256(repr((request.full_path, version)).encode('utf-8')).hexdigest()[:20]
+    response = not_modified_response(etag)
+    if response is None:
+        response = jsonify(build())
+        response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+# Версия выборки: число строк и время последнего изменения одним агрегатным запросом
+def query_version(query, model):
+    count, last_update = query.with_entities(func.count(model.id), func.max(model.updated_at)).one()
+    return count, last_update.isoformat() if last_update else None
+
+# Версия выборки ключей: статус и оставшееся время зависят ещё и от текущего момента
+def keys_version(query):
+    now = datetime.datetime.utcnow()
+    count, last_update, expired = query.with_entities(
+        func.count(Key.id),
+        func.max(Key.updated_at),
+        func.sum(case((Key.expires_at <= now, 1), else_=0))
+    ).one()
+    return count, last_update.isoformat() if last_update else None, expired or 0, int(time.time() // KEY_ETAG_INTERVAL)
+
+# Ответы на ошибки активации ключа (коды из Key.redeem)
+REDEEM_ERRORS = {
+    "not_found": ("Ключ не найден", 404),
+    "expired": ("Ключ истёк", 400),
+    "inactive": ("Ключ неактивен", 400),
+    "taken": ("Ключ уже занят другим пользователем", 400)
+}
+
 # API ресурсы
 class Login(Resource):
     def post(self):
@@ -206,56 +563,72 @@ class Register(Resource):
         invite_code = data.get("invite_code")
         
         db = get_db()
+        now = datetime.datetime.utcnow()
         
-        # Проверка инвайт-кода
-        invite = db.query(Invite).filter(Invite.code == invite_code, Invite.used == False).first()
-        if not invite or invite.is_expired():
-            return {"message": "Недействительный инвайт-код"}, 400
-        
-        # Проверка, что имя пользователя и email не заняты
-        if db.query(User).filter(User.username == username).first():
-            return {"message": "Имя пользователя уже занято"}, 400
-            
-        if db.query(User).filter(User.email == email).first():
-            return {"message": "Email уже используется"}, 400
+        # Хеш пароля и IP-адрес (может потребовать запроса к внешнему сервису)
+        # вычисляются до UPDATE инвайта, чтобы не держать блокировку записи во время них
+        password_hash = hash_password(password)
+        ip_address = get_client_ip()
         
-        # Создание нового пользователя
+        # Пользователь, тестовый ключ на 24 часа и инвайт сохраняются в одной транзакции
         new_user = User(
             username=username,
             email=email,
-            password_hash=hash_password(password)
+            password_hash=password_hash,
+            created_at=now
         )
-        
         # Сохранение IP-адреса регистрации
-        ip_address = get_client_ip()
         new_user.update_login_info(ip_address)
         
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
-        
-        # Пометить инвайт как использованный
-        invite.used = True
-        invite.used_by_id = new_user.id
-        db.commit()
-        
-        # Создание тестового ключа на 24 часа
-        test_key_expiry = datetime.datetime.utcnow() + datetime.timedelta(days=1)
         test_key = Key(
-            user_id=new_user.id,
-            expires_at=test_key_expiry,
-            activated_at=datetime.datetime.utcnow()  # Сразу активируем тестовый ключ
+            user=new_user,
+            expires_at=now + datetime.timedelta(days=1),
+            activated_at=now  # Сразу активируем тестовый ключ
         )
         
-        db.add(test_key)
-        db.commit()
+        try:
+            # Сначала инвайт: без действующего кода до вставки пользователя не доходит,
+            # поэтому по ответу нельзя узнать, заняты ли имя и email.
+            # Инвайт занимается условным UPDATE: из двух параллельных регистраций
+            # с одним кодом строку получит только одна
+            claimed = db.query(Invite).filter(
+                Invite.code == invite_code,
+                Invite.used == False,
+                Invite.expires_at > now
+            ).update({"used": True}, synchronize_session=False)
+            if claimed != 1:
+                db.rollback()
+                return {"message": "Недействительный инвайт-код"}, 400
+            
+            # Занятость имени и email проверяется уникальными ограничениями при вставке;
+            # при ошибке откат освобождает и инвайт
+            db.add(new_user)
+            db.add(test_key)
+            db.flush()
+            # Значения читаем до commit, чтобы не перечитывать объекты после него
+            user_id = new_user.id
+            key_value = test_key.key
+            
+            db.query(Invite).filter(Invite.code == invite_code).update(
+                {"used_by_id": user_id}, synchronize_session=False
+            )
+            db.commit()
+        except IntegrityError as e:
+            db.rollback()
+            if unique_violation_column(e) == "email":
+                return {"message": "Email уже используется"}, 400
+            return {"message": "Имя пользователя уже занято"}, 400
+        except Exception:
+            # Любая другая ошибка не должна оставлять инвайт занятым в открытой транзакции
+            db.rollback()
+            raise
         
         return {
             "message": "Регистрация успешна",
-            "id": new_user.id,
-            "username": new_user.username,
-            "created_at": new_user.created_at.isoformat(),
-            "test_key": test_key.key
+            "id": user_id,
+            "username": username,
+            "created_at": now.isoformat(),
+            "test_key": key_value
         }
 
 class KeyResource(Resource):
@@ -268,9 +641,9 @@ class KeyResource(Resource):
         if user.is_banned:
             return {"message": "Ваш аккаунт заблокирован"}, 403
         
-        keys = db.query(Key).filter(Key.user_id == user_id).all()
+        keys_query = db.query(Key).filter(Key.user_id == user_id)
         
-        return {
+        return conditional_response(keys_version(keys_query), lambda: {
             "keys": [
                 {
                     "id": key.id,
@@ -282,9 +655,9 @@ class KeyResource(Resource):
                     "time_left": key.time_left(),
                     "duration_hours": key.duration_hours(),
                     "status": "Активирован" if key.activated_at else "Не активирован"
-                } for key in keys
+                } for key in keys_query.all()
             ]
-        }
+        })
 
 class GenerateKey(Resource):
     @jwt_required()
@@ -320,6 +693,12 @@ class GenerateKey(Resource):
                     user_id=target_user_id,
                     custom_key=custom_key
                 )
+                if target_user_id:
+                    publish_event(db, "key_redeemed", target_user_id, key_id=new_key.id)
+                # Ключ и событие для бота фиксируются одной транзакцией
+                db.commit()
+                if target_user_id:
+                    entitlement_cache.invalidate(target_user_id)
                 
                 return {
                     "key": new_key.key,
@@ -336,44 +715,26 @@ class GenerateKey(Resource):
 class RedeemKey(Resource):
     @jwt_required()
     def post(self):
+        db = get_db()
         try:
             user_id = get_jwt_identity()
             data = request.get_json()
             key_string = data.get("key")
             
-            db = get_db()
-            
             user = db.query(User).filter(User.id == user_id).first()
+            if not user:
+                return {"message": "Пользователь не найден"}, 404
             if user.is_banned:
                 return {"message": "Ваш аккаунт заблокирован"}, 403
             
-            # Поиск ключа
-            key = db.query(Key).filter(Key.key == key_string).first()
-            if not key:
-                return {"message": "Ключ не найден"}, 404
-            
-            # Проверка, что ключ не истёк и активен
-            if key.is_expired():
-                return {"message": "Ключ истёк"}, 400
-            
-            if not key.is_active:
-                return {"message": "Ключ неактивен"}, 400
-            
-            # Проверка, что ключ свободен или уже принадлежит пользователю
-            if key.user_id is not None and key.user_id != user_id:
-                return {"message": "Ключ уже занят другим пользователем"}, 400
-            
-            # Привязка ключа к пользователю, если он ещё не привязан
-            if key.user_id is None:
-                key.user_id = user_id
-                key.activated_at = datetime.datetime.utcnow()
-                
-                # Вычисляем новую дату истечения (текущее время + оставшаяся продолжительность)
-                time_left = key.time_left()
-                key.expires_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=time_left)
-                
-                db.commit()
-                db.refresh(key)
+            key, error = Key.redeem(db, key_string, user_id)
+            if error:
+                message, status = REDEEM_ERRORS[error]
+                return {"message": message}, status
+            # Привязка ключа и событие для бота фиксируются одной транзакцией
+            publish_event(db, "key_redeemed", key.user_id, key_id=key.id)
+            db.commit()
+            entitlement_cache.invalidate(key.user_id)
             
             return {
                 "success": True,
@@ -387,6 +748,8 @@ class RedeemKey(Resource):
                 }
             }
         except Exception as e:
+            # Не оставляем открытой транзакцию с UPDATE ключа
+            db.rollback()
             print(f"Ошибка при активации ключа: {str(e)}")
             return {"message": f"Ошибка при активации ключа: {str(e)}"}, 500
 
@@ -438,7 +801,7 @@ class UserInfo(Resource):
         if user.is_banned:
             return {"message": "Ваш аккаунт заблокирован"}, 403
         
-        return {
+        return conditional_response((user.id, user.updated_at.isoformat() if user.updated_at else None), lambda: {
             "id": user.id,
             "username": user.username,
             "email": user.email,
@@ -447,7 +810,7 @@ class UserInfo(Resource):
             "is_support": user.is_support,
             "discord_linked": user.discord_id is not None,
             "discord_username": user.discord_username
-        }
+        })
 
 class GenerateInvite(Resource):
     @jwt_required()
@@ -555,41 +918,34 @@ class InviteList(Resource):
             
             # Для администраторов показываем все инвайты, для остальных - только свои
             if user.is_admin:
-                invites = db.query(Invite).all()
+                invites_query = db.query(Invite)
                 logger.info(f"Администратор {user.username} запрашивает все приглашения")
-                print(f"ОТЛАДКА: Запрошены все приглашения из БД, количество: {len(invites) if invites else 0}")
-                print(f"ОТЛАДКА: Используемая БД: {db}")
             else:
-                invites = db.query(Invite).filter(Invite.created_by_id == user_id).all()
+                invites_query = db.query(Invite).filter(Invite.created_by_id == user_id)
                 logger.info(f"Пользователь {user.username} запрашивает свои приглашения")
             
-            invite_count = len(invites) if invites else 0
-            logger.info(f"Количество найденных приглашений: {invite_count}")
-            print(f"ОТЛАДКА: Количество найденных приглашений: {invite_count}")
-            
-            if invite_count > 0:
-                print(f"ОТЛАДКА: Пример первого приглашения: ID={invites[0].id}, Код={invites[0].code}")
-            
-            result = {
-                "invites": [
-                    {
-                        "id": invite.id,
-                        "code": invite.code,
-                        "created_at": invite.created_at.isoformat(),
-                        "expires_at": invite.expires_at.isoformat(),
-                        "used": invite.used,
-                        "used_by": invite.used_by.username if invite.used_by else None,
-                        "created_by": {
-                            "id": invite.created_by.id,
-                            "username": invite.created_by.username
-                        }
-                    } for invite in invites
-                ]
-            }
+            def build():
+                sync_cursor = make_sync_cursor()
+                invites = invites_query.all()
+                invite_count = len(invites) if invites else 0
+                logger.info(f"Количество найденных приглашений: {invite_count}")
+                print(f"ОТЛАДКА: Количество найденных приглашений: {invite_count}")
+                
+                if invite_count > 0:
+                    print(f"ОТЛАДКА: Пример первого приглашения: ID={invites[0].id}, Код={invites[0].code}")
+                
+                result = {
+                    "invites": [serialize_invite(invite) for invite in invites]
+                }
+                # Администратор получает дальнейшие изменения через /api/admin/invites/changes
+                if user.is_admin:
+                    result["sync_cursor"] = sync_cursor
+                
+                logger.info(f"Возвращаем список из {invite_count} приглашений")
+                return result
             
-            print(f"ОТЛАДКА: Результат API: {result}")
-            logger.info(f"Возвращаем список из {invite_count} приглашений")
-            return result
+            # Набор полей зависит от роли, поэтому она входит в версию
+            return conditional_response((user.id, user.is_admin) + query_version(invites_query, Invite), build)
         except Exception as e:
             # Логирование ошибки
             print(f"Ошибка при получении списка приглашений: {str(e)}")
@@ -679,6 +1035,7 @@ class VerifyDiscordCode(Resource):
         # Пометить код как использованный
         discord_code.used = True
         
+        publish_event(db, "discord_linked", user.id, discord_id)
         db.commit()
         
         return {
@@ -702,35 +1059,19 @@ class DiscordRedeemKey(Resource):
         if user.is_banned:
             return {"success": False, "message": "Аккаунт заблокирован"}, 403
         
-        # Поиск ключа
-        key = db.query(Key).filter(Key.key == key_string).first()
-        if not key:
-            return {"success": False, "message": "Ключ не найден"}, 404
-        
-        # Проверка, что ключ не истёк и активен
-        if key.is_expired():
-            return {"success": False, "message": "Ключ истёк"}, 400
-        
-        if not key.is_active:
-            return {"success": False, "message": "Ключ неактивен"}, 400
-        
-        # Проверка, что ключ свободен или уже принадлежит пользователю
-        if key.user_id is not None and key.user_id != user.id:
-            return {"success": False, "message": "Ключ уже занят другим пользователем"}, 400
-        
-        # Привязка ключа к пользователю, если он ещё не привязан
-        if key.user_id is None:
-            key.user_id = user.id
-            key.activated_at = datetime.datetime.utcnow()
-        
-            # Вычисляем разницу между созданием и истечением ключа (в секундах)
-            original_duration = (key.expires_at - key.created_at).total_seconds()
-            
-            # Устанавливаем новую дату истечения от текущего момента
-            key.expires_at = key.activated_at + datetime.timedelta(seconds=original_duration)
-        
-        db.commit()
-        db.refresh(key)
+        try:
+            key, error = Key.redeem(db, key_string, user.id)
+            if error:
+                message, status = REDEEM_ERRORS[error]
+                return {"success": False, "message": message}, status
+            # Привязка ключа и событие для бота фиксируются одной транзакцией
+            publish_event(db, "key_redeemed", user.id, user.discord_id, key_id=key.id)
+            db.commit()
+        except Exception:
+            # Не оставляем открытой транзакцию с UPDATE ключа
+            db.rollback()
+            raise
+        entitlement_cache.invalidate(user.id)
         
         # Обновление информации о входе
         ip_address = get_client_ip()
@@ -815,9 +1156,11 @@ class AdminBanUser(Resource):
         
         # Бан пользователя
         target_user.is_banned = True
+        publish_event(db, "user_banned", target_user.id, target_user.discord_id)
         db.commit()
+        entitlement_cache.invalidate(target_user.id)
         
-        return {"message": f"Пользователь {target_user.username} заблокирован"}
+        return {"message": f"Пользователь {target_user.username} заблокирован", "user": serialize_admin_user(target_user)}
 
 class AdminUnbanUser(Resource):
     @jwt_required()
@@ -843,9 +1186,11 @@ class AdminUnbanUser(Resource):
         
         # Разбан пользователя
         target_user.is_banned = False
+        publish_event(db, "user_unbanned", target_user.id, target_user.discord_id)
         db.commit()
+        entitlement_cache.invalidate(target_user.id)
         
-        return {"message": f"Пользователь {target_user.username} разблокирован"}
+        return {"message": f"Пользователь {target_user.username} разблокирован", "user": serialize_admin_user(target_user)}
 
 class AdminGetAllUsers(Resource):
     @jwt_required()
@@ -861,26 +1206,23 @@ class AdminGetAllUsers(Resource):
         if current_user.is_banned:
             return {"message": "Ваш аккаунт заблокирован"}, 403
         
-        # Получение списка пользователей
-        users = db.query(User).all()
+        # Получение списка пользователей (постранично при указании limit)
+        def build():
+            sync_cursor = make_sync_cursor()
+            users, next_cursor, total = paginate_admin_query(
+                db.query(User),
+                User,
+                [User.username, User.email, User.discord_username]
+            )
+            return {
+                "users": [serialize_admin_user(user) for user in users],
+                "next_cursor": next_cursor,
+                "total": total,
+                "sync_cursor": sync_cursor
+            }
         
-        return {
-            "users": [
-                {
-                    "id": user.id,
-                    "username": user.username,
-                    "email": user.email,
-                    "created_at": user.created_at.isoformat(),
-                    "last_login": user.last_login.isoformat() if user.last_login else None,
-                    "last_ip": user.last_ip,
-                    "is_admin": user.is_admin,
-                    "is_support": user.is_support,
-                    "is_banned": user.is_banned,
-                    "discord_linked": user.discord_id is not None,
-                    "discord_username": user.discord_username
-                } for user in users
-            ]
-        }
+        # Любое изменение таблицы меняет число строк или последний updated_at
+        return conditional_response(query_version(db.query(User), User), build)
 
 # Добавление класса для управления модераторами
 class AdminSetRole(Resource):
@@ -926,39 +1268,158 @@ class AdminSetRole(Resource):
             "id": target_user.id,
             "username": target_user.username,
             "is_admin": target_user.is_admin,
-            "is_support": target_user.is_support
+            "is_support": target_user.is_support,
+            "user": serialize_admin_user(target_user)
         }
 
 # Загрузка Minecraft модов
 class DownloadMod(Resource):
-    @jwt_required()
     def get(self, mod_name):
-        user_id = get_jwt_identity()
         db = get_db()
         
-        # Проверка, что пользователь существует и не заблокирован
-        user = db.query(User).filter(User.id == user_id).first()
+        # Проверка бана и активного ключа (результат кэшируется на пользователя)
+        entitlement = get_download_entitlement(db)
+        if not entitlement:
+            return {"message": "Требуется авторизация"}, 401
+        
+        if entitlement["error"]:
+            message, code = entitlement["error"]
+            return {"message": message}, code
+        
+        # Проверка существования мода по индексу в памяти
+        entry = mod_index.lookup(mod_name)
+        if not entry:
+            return {"message": "Мод не найден"}, 404
+        
+        # Запись индекса могла устареть (файл заменён, пересканирование ещё идёт).
+        # Тогда у байтов на диске нет достоверного хеша: файл отдаётся целиком,
+        # без ETag и без докачки, иначе If-Range склеил бы две версии файла
+        verified = mod_index.current(mod_name) is not None
+        
+        # Сжатая копия отдаётся по Accept-Encoding; запросы докачки (Range)
+        # всегда обслуживаются несжатым файлом. В режиме accel тоже только несжатым:
+        # при внутреннем перенаправлении nginx не передаёт клиенту Content-Encoding от Flask
+        encoding = None
+        if verified and "Range" not in request.headers and MOD_TRANSFER_MODE != "accel":
+            accepted = [e for e in ENCODING_SUFFIXES if request.accept_encodings.quality(e) > 0]
+            encoding = mod_index.choose_encoding(mod_name, accepted)
+        
+        if encoding:
+            file_name = mod_name + ENCODING_SUFFIXES[encoding]
+            etag = f"{entry['sha256']}-{encoding}"
+        else:
+            file_name = mod_name
+            etag = entry["sha256"] if verified else None
+        
+        if MOD_TRANSFER_MODE == "accel":
+            response = accel_redirect_response(file_name, mod_name, etag)
+            # Число соединений ограничивает nginx (limit_conn), скорость - этот заголовок
+            if download_scheduler.user_rate:
+                response.headers["X-Accel-Limit-Rate"] = str(download_scheduler.user_rate)
+        else:
+            # Сильный ETag по SHA-256 содержимого; conditional=True включает
+            # обработку Range/If-Range и ответ 304 на If-None-Match
+            response = scheduled_transfer(entitlement, mod_name, entry["size"], lambda: send_from_directory(
+                MODS_DIR,
+                file_name,
+                as_attachment=True,
+                download_name=mod_name,
+                conditional=verified,
+                etag=etag or False
+            ))
+            if isinstance(response, tuple):
+                return response
+        
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.headers["Accept-Ranges"] = "bytes" if verified else "none"
+        response.headers["Cache-Control"] = "private, no-cache"
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+# Манифест модов для инкрементальной синхронизации лоадера
+class ModManifest(Resource):
+    def get(self):
+        db = get_db()
+        
+        user = get_loader_user(db)
         if not user:
-            return {"message": "Пользователь не найден"}, 404
+            return {"message": "Требуется авторизация"}, 401
         
         if user.is_banned:
             return {"message": "Ваш аккаунт заблокирован"}, 403
         
-        # Проверка, что у пользователя есть активный ключ
-        active_key = db.query(Key).filter(
-            Key.user_id == user_id,
-            Key.is_active == True
-        ).first()
+        # Пересчитываются хеши только изменившихся файлов
+        mod_index.refresh()
+        
+        # С параметром chunks=1 каждый файл описывается списком чанков
+        with_chunks = request.args.get("chunks") == "1"
+        manifest = mod_index.manifest(with_chunks=with_chunks)
+        
+        # Версия набора служит ETag: если моды не менялись, лоадер получит пустой 304
+        etag = manifest["version"] + ("-chunks" if with_chunks else "")
+        response = not_modified_response(etag)
+        if response is None:
+            response = jsonify(manifest)
+            response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+
+# Получение чанков модов по их адресам (для сборки обновлённых файлов из локального кэша)
+class ModChunks(Resource):
+    # Максимальное количество чанков в одном запросе
+    MAX_CHUNKS = 256
+    
+    def post(self):
+        db = get_db()
         
-        if not active_key or active_key.is_expired():
-            return {"message": "Нет активного ключа"}, 403
+        entitlement = get_download_entitlement(db)
+        if not entitlement:
+            return {"message": "Требуется авторизация"}, 401
         
-        # Проверка существования мода
-        mod_path = os.path.join("static", "mods", mod_name)
-        if not os.path.exists(mod_path):
-            return {"message": "Мод не найден"}, 404
+        if entitlement["error"]:
+            message, code = entitlement["error"]
+            return {"message": message}, code
+        
+        data = request.get_json()
+        chunk_hashes = data.get("chunks", []) if data else []
+        if not chunk_hashes or len(chunk_hashes) > self.MAX_CHUNKS:
+            return {"message": f"Нужно указать от 1 до {self.MAX_CHUNKS} чанков"}, 400
+        
+        located = mod_index.locate_chunks(chunk_hashes)
+        if located is None:
+            return {"message": "Чанк не найден"}, 404
+        
+        # Чанки отдаются подряд в порядке запроса; размеры клиент знает из манифеста
+        total_size = sum(size for _, _, size in located)
         
-        return send_from_directory("static/mods", mod_name, as_attachment=True)
+        def make_response():
+            response = app.response_class(
+                mod_index.iter_chunks(located),
+                mimetype="application/octet-stream"
+            )
+            response.headers["Content-Length"] = str(total_size)
+            return response
+        
+        return scheduled_transfer(entitlement, f"{len(located)} чанков", total_size, make_response)
+
+# Активные загрузки модов и очередь планировщика
+class AdminDownloads(Resource):
+    @jwt_required()
+    def get(self):
+        user_id = get_jwt_identity()
+        db = get_db()
+        
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user or not user.is_admin:
+            return {"message": "Недостаточно прав для просмотра загрузок"}, 403
+        
+        if user.is_banned:
+            return {"message": "Ваш аккаунт заблокирован"}, 403
+        
+        snapshot = download_scheduler.snapshot()
+        snapshot["transfer_mode"] = MOD_TRANSFER_MODE
+        return snapshot
 
 # Добавление нового класса AdminUserActivity для просмотра последних входов и IP-адресов пользователей
 class AdminUserActivity(Resource):
@@ -976,25 +1437,12 @@ class AdminUserActivity(Resource):
             return {"message": "Ваш аккаунт заблокирован"}, 403
         
         # Получение всех пользователей с данными о последнем входе
-        users = db.query(User).order_by(User.last_login.desc().nullslast()).all()
-        
-        return {
+        return conditional_response(query_version(db.query(User), User), lambda: {
             "users": [
-                {
-                    "id": user.id,
-                    "username": user.username,
-                    "email": user.email,
-                    "created_at": user.created_at.isoformat(),
-                    "last_login": user.last_login.isoformat() if user.last_login else None,
-                    "last_ip": user.last_ip,
-                    "is_admin": user.is_admin,
-                    "is_support": user.is_support,
-                    "is_banned": user.is_banned,
-                    "discord_linked": user.discord_id is not None,
-                    "discord_username": user.discord_username
-                } for user in users
+                serialize_admin_user(user)
+                for user in db.query(User).order_by(User.last_login.desc().nullslast()).all()
             ]
-        }
+        })
 
 class AdminDeleteInvite(Resource):
     @jwt_required()
@@ -1017,6 +1465,7 @@ class AdminDeleteInvite(Resource):
                 return {"message": "Инвайт не найден"}, 404
                 
             # Удаление инвайта
+            record_deleted_rows(db, Invite, db.query(Invite).filter(Invite.id == invite.id))
             db.delete(invite)
             db.commit()
             
@@ -1125,7 +1574,9 @@ class GetInviteLimits(Resource):
             else:
                 user_limit = user_monthly_invites
                 
-            return {
+            # Ответ целиком определяется лимитами и счётчиком - они и служат версией
+            version = (user_limit, used_invites, admin_monthly_invites, support_monthly_invites, user_monthly_invites)
+            return conditional_response(version, lambda: {
                 "monthly_limit": user_limit,
                 "used_invites": used_invites,
                 "remaining_invites": max(0, user_limit - used_invites),
@@ -1134,7 +1585,7 @@ class GetInviteLimits(Resource):
                     "support": support_monthly_invites,
                     "user": user_monthly_invites
                 }
-            }
+            })
         except Exception as e:
             # Логирование ошибки
             print(f"Ошибка при получении лимитов приглашений: {str(e)}")
@@ -1164,6 +1615,7 @@ class AdminDeleteMultipleInvites(Resource):
                 return {"message": "Не указаны ID инвайтов для удаления"}, 400
             
             # Удаление инвайтов
+            record_deleted_rows(db, Invite, db.query(Invite).filter(Invite.id.in_(invite_ids)))
             deleted_count = 0
             for invite_id in invite_ids:
                 invite = db.query(Invite).filter(Invite.id == invite_id).first()
@@ -1198,34 +1650,94 @@ class AdminGetAllKeys(Resource):
             if current_user.is_banned:
                 return {"message": "Ваш аккаунт заблокирован"}, 403
             
-            # Получение всех ключей с данными о пользователях
-            keys = db.query(Key).all()
+            # Получение ключей с данными о пользователях (постранично при указании limit)
+            def build():
+                sync_cursor = make_sync_cursor()
+                # Владелец читается из того же соединения, что нужно для поиска по имени
+                keys, next_cursor, total = paginate_admin_query(
+                    db.query(Key).outerjoin(User, Key.user_id == User.id).options(contains_eager(Key.user)),
+                    Key,
+                    [Key.key, User.username]
+                )
+                now = datetime.datetime.utcnow()
+                return {
+                    "keys": [serialize_admin_key(key, now) for key in keys],
+                    "next_cursor": next_cursor,
+                    "total": total,
+                    "sync_cursor": sync_cursor
+                }
             
-            return {
-                "keys": [
-                    {
-                        "id": key.id,
-                        "key": key.key,
-                        "created_at": key.created_at.isoformat(),
-                        "activated_at": key.activated_at.isoformat() if key.activated_at else None,
-                        "expires_at": key.expires_at.isoformat(),
-                        "is_active": key.is_active and not key.is_expired(),
-                        "time_left": key.time_left(),
-                        "duration_hours": key.duration_hours(),
-                        "status": "Активирован" if key.activated_at else "Не активирован",
-                        "user": {
-                            "id": key.user.id,
-                            "username": key.user.username
-                        } if key.user else None
-                    } for key in keys
-                ]
-            }
+            return conditional_response(keys_version(db.query(Key)), build)
         except Exception as e:
             # Логирование ошибки
             print(f"Ошибка при получении списка ключей: {str(e)}")
             # Возвращаем ошибку в формате JSON
             return {"message": f"Ошибка при получении списка ключей: {str(e)}"}, 500
 
+# Таблицы с синхронизацией изменений: модель, представление записи, связи для загрузки
+# и доступ саппорта (список пользователей саппорт видит, ключи и все инвайты - нет)
+SYNC_TABLES = {
+    "users": (User, serialize_admin_user, [], True),
+    "keys": (Key, serialize_admin_key, [joinedload(Key.user)], False),
+    "invites": (Invite, serialize_invite, [joinedload(Invite.created_by), joinedload(Invite.used_by)], False)
+}
+
+class AdminChanges(Resource):
+    """
+    Изменения таблицы админ-панели после курсора since: созданные и изменённые
+    записи и id удалённых. Курсор берётся из sync_cursor полного списка или
+    из cursor предыдущего ответа. reset=true - список нужно загрузить заново
+    """
+    def __init__(self, table):
+        self.table = table
+    
+    @jwt_required()
+    def get(self):
+        user_id = get_jwt_identity()
+        db = get_db()
+        model, serialize, options, support_allowed = SYNC_TABLES[self.table]
+        
+        current_user = db.query(User).filter(User.id == user_id).first()
+        if not current_user or not (current_user.is_admin or (support_allowed and current_user.is_support)):
+            return {"message": "Недостаточно прав"}, 403
+        
+        if current_user.is_banned:
+            return {"message": "Ваш аккаунт заблокирован"}, 403
+        
+        since = parse_sync_cursor(request.args.get("since"))
+        if since is None:
+            return {"message": "Неверный курсор синхронизации"}, 400
+        
+        now = datetime.datetime.utcnow()
+        reset = {"changed": [], "deleted": [], "cursor": None, "reset": True}
+        # Записи об удалениях старше срока хранения уже стёрты
+        if now - since > DELETED_ROWS_RETENTION:
+            return reset
+        
+        threshold = since - SYNC_CURSOR_OVERLAP
+        changed_filter = model.updated_at > threshold
+        if model is Key:
+            # Истечение срока не меняет строку, но меняет статус ключа в таблице
+            changed_filter = or_(changed_filter, and_(Key.expires_at > threshold, Key.expires_at <= now))
+        
+        changed = db.query(model).options(*options).filter(changed_filter).order_by(model.id.desc()).limit(SYNC_CHANGES_LIMIT + 1).all()
+        if len(changed) > SYNC_CHANGES_LIMIT:
+            return reset
+        
+        deleted = [
+            row_id for (row_id,) in db.query(DeletedRow.row_id).filter(
+                DeletedRow.table_name == model.__tablename__,
+                DeletedRow.deleted_at > threshold
+            )
+        ]
+        
+        return {
+            "changed": [serialize(item) for item in changed],
+            "deleted": deleted,
+            "cursor": make_sync_cursor(now),
+            "reset": False
+        }
+
 class AdminRevokeKey(Resource):
     @jwt_required()
     def post(self, key_id):
@@ -1248,9 +1760,12 @@ class AdminRevokeKey(Resource):
                 
             # Отзыв ключа (деактивация)
             key.is_active = False
+            if key.user_id:
+                publish_event(db, "key_revoked", key.user_id, key_id=key.id)
             db.commit()
+            entitlement_cache.invalidate(key.user_id)
             
-            return {"message": "Ключ успешно отозван"}
+            return {"message": "Ключ успешно отозван", "key": serialize_admin_key(key)}
         except Exception as e:
             # Логирование ошибки
             print(f"Ошибка при отзыве ключа: {str(e)}")
@@ -1279,9 +1794,12 @@ class AdminRestoreKey(Resource):
                 
             # Восстановление ключа (активация)
             key.is_active = True
+            if key.user_id:
+                publish_event(db, "key_restored", key.user_id, key_id=key.id)
             db.commit()
+            entitlement_cache.invalidate(key.user_id)
             
-            return {"message": "Ключ успешно восстановлен"}
+            return {"message": "Ключ успешно восстановлен", "key": serialize_admin_key(key)}
         except Exception as e:
             # Логирование ошибки
             print(f"Ошибка при восстановлении ключа: {str(e)}")
@@ -1314,6 +1832,9 @@ class AdminBulkKeyAction(Resource):
             if action not in ["revoke", "restore", "delete"]:
                 return {"message": "Неверное действие. Допустимые значения: revoke, restore, delete"}, 400
             
+            # Владельцы ключей, чьё право на скачивание нужно перепроверить
+            owner_ids = [owner_id for (owner_id,) in db.query(Key.user_id).filter(Key.id.in_(key_ids), Key.user_id != None).distinct()]
+            
             # Выполнение массового действия
             affected_count = 0
             
@@ -1327,9 +1848,14 @@ class AdminBulkKeyAction(Resource):
             
             elif action == "delete":
                 # Удаление ключей
+                record_deleted_rows(db, Key, db.query(Key).filter(Key.id.in_(key_ids)))
                 affected_count = db.query(Key).filter(Key.id.in_(key_ids)).delete(synchronize_session=False)
             
+            event_type = {"revoke": "key_revoked", "restore": "key_restored", "delete": "key_deleted"}[action]
+            for owner_id in owner_ids:
+                publish_event(db, event_type, owner_id)
             db.commit()
+            entitlement_cache.invalidate(*owner_ids)
             
             action_text = {
                 "revoke": "отозвано",
@@ -1337,9 +1863,18 @@ class AdminBulkKeyAction(Resource):
                 "delete": "удалено"
             }
             
+            # Изменённые ключи возвращаются, чтобы админ-панель обновила строки на месте
+            updated_keys = []
+            if action != "delete":
+                updated_keys = [
+                    serialize_admin_key(key)
+                    for key in db.query(Key).options(joinedload(Key.user)).filter(Key.id.in_(key_ids)).all()
+                ]
+            
             return {
                 "message": f"Успешно {action_text[action]} ключей: {affected_count}",
-                "affected_count": affected_count
+                "affected_count": affected_count,
+                "keys": updated_keys
             }
         except Exception as e:
             # Логирование ошибки
@@ -1392,6 +1927,7 @@ class AdminCleanupKeys(Resource):
             keys_count = query.count()
             
             # Выполняем удаление
+            record_deleted_rows(db, Key, query)
             query.delete(synchronize_session=False)
             db.commit()
             
@@ -1500,16 +2036,18 @@ class AdminUnlinkDiscord(Resource):
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
             return {"message": "Пользователь не найден"}, 404
-        # Отвязываем Discord
+        # Отвязываем Discord (бот снимет роль по прежнему Discord ID)
+        if user.discord_id:
+            publish_event(db, "discord_unlinked", user.id, user.discord_id)
         user.discord_id = None
         user.discord_username = None
         db.commit()
-        return {"message": "Discord-аккаунт успешно отвязан"}
+        return {"message": "Discord-аккаунт успешно отвязан", "user": serialize_admin_user(user)}
 
 class DiscordInviteLink(Resource):
     def get(self):
         link = os.getenv("DISCORD_INVITE_LINK", "https://discord.com/")
-        return {"invite_link": link}
+        return conditional_response(link, lambda: {"invite_link": link})
 
 class AdminChangeUserPassword(Resource):
     @jwt_required()
@@ -1555,8 +2093,14 @@ api.add_resource(AdminDeleteInvite, "/api/admin/invites/<int:invite_id>/delete")
 api.add_resource(AdminSetInviteLimits, "/api/admin/invites/limits")
 api.add_resource(GetInviteLimits, "/api/invites/limits")
 api.add_resource(DownloadMod, "/api/download/<string:mod_name>")
+api.add_resource(ModManifest, "/api/mods/manifest")
+api.add_resource(ModChunks, "/api/mods/chunks")
+api.add_resource(AdminDownloads, "/api/admin/downloads")
 api.add_resource(AdminDeleteMultipleInvites, "/api/admin/invites/delete")
 api.add_resource(AdminGetAllKeys, "/api/admin/keys")
+api.add_resource(AdminChanges, "/api/admin/users/changes", endpoint="admin_users_changes", resource_class_kwargs={"table": "users"})
+api.add_resource(AdminChanges, "/api/admin/keys/changes", endpoint="admin_keys_changes", resource_class_kwargs={"table": "keys"})
+api.add_resource(AdminChanges, "/api/admin/invites/changes", endpoint="admin_invites_changes", resource_class_kwargs={"table": "invites"})
 api.add_resource(AdminRevokeKey, "/api/admin/keys/<int:key_id>/revoke")
 api.add_resource(AdminRestoreKey, "/api/admin/keys/<int:key_id>/restore")
 api.add_resource(AdminBulkKeyAction, "/api/admin/keys/bulk-action")
@@ -1571,14 +2115,52 @@ api.add_resource(AdminChangeUserPassword, "/api/admin/users/<int:user_id>/change
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-    if path != "" and os.path.exists(os.path.join(app.static_folder, path)):
+    accepted = [e for e in STATIC_ENCODING_SUFFIXES if request.accept_encodings.quality(e) > 0]
+    
+    # Файлы с отпечатком в имени никогда не меняются - браузер кэширует их навсегда
+    if static_assets and static_assets.is_fingerprinted(path):
+        encoding = static_assets.choose_encoding(path, accepted)
+        response = send_from_directory(
+            app.static_folder,
+            path + STATIC_ENCODING_SUFFIXES[encoding] if encoding else path,
+            mimetype=mimetypes.guess_type(path)[0],
+            conditional=True,
+            max_age=31536000
+        )
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        response.headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        return response
+    
+    # Моды отдаются только через /api/download с проверкой ключа, служебные файлы - никогда
+    parts = path.split("/")
+    hidden = parts[0] in ("mods", BUILD_DIR) or any(part.startswith(".") for part in parts)
+    if path not in ("", "index.html") and not hidden and os.path.isfile(os.path.join(app.static_folder, path)):
         return send_from_directory(app.static_folder, path)
-    else:
+    
+    if not static_assets:
         return send_from_directory(app.static_folder, 'index.html')
+    
+    # index.html всегда проверяется по ETag, поэтому новая сборка подхватывается сразу.
+    # У каждой кодировки свой ETag (как у сжатых копий модов): байты у них разные
+    index = static_assets.index
+    encoding = static_assets.choose_encoding(None, accepted)
+    etag = f"{index['etag']}-{encoding}" if encoding else index["etag"]
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(index["encodings"][encoding] if encoding else index["body"], mimetype="text/html")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
 
 if __name__ == "__main__":
     # Создание директории для модов, если она не существует
-    os.makedirs(os.path.join("static", "mods"), exist_ok=True)
+    os.makedirs(MODS_DIR, exist_ok=True)
     
     # Запуск сервера
     app.run(host="0.0.0.0", port=5000, debug=True) 
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+Замер сериализации ответа AdminGetAllKeys: время и размер тела до и после
+перехода на кодировщик JSON с поддержкой дат и сжатие ответов.
+
+    python benchmark_json.py [количество_ключей]
+
+Ключи создаются в памяти (без базы данных), поэтому замер не включает выборку.
+"""
+import os
+import sys
+import json
+import time
+import datetime
+
+# Модели только создают объекты в памяти - подключение к базе не нужно
+os.environ["USE_POSTGRES"] = "false"
+os.environ["DATABASE_URL"] = "sqlite://"
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from database.models import User, Key
+from serializers import serialize_admin_key
+from json_encoding import ENCODERS, ResponseCompressor, compress_data
+
+
+# Представление ключа в том виде, в каком оно было до перехода: isoformat()
+# на каждую дату и utcnow() внутри is_expired()/time_left() для каждого ключа
+def legacy_serialize_admin_key(key):
+    return {
+        "id": key.id,
+        "key": key.key,
+        "created_at": key.created_at.isoformat(),
+        "activated_at": key.activated_at.isoformat() if key.activated_at else None,
+        "expires_at": key.expires_at.isoformat(),
+        "is_active": key.is_active and not key.is_expired(),
+        "time_left": key.time_left(),
+        "duration_hours": key.duration_hours(),
+        "status": "Активирован" if key.activated_at else "Не активирован",
+        "user": {
+            "id": key.user.id,
+            "username": key.user.username
+        } if key.user else None
+    }
+
+
+def make_keys(count):
+    """Ключи, похожие на реальные: половина привязана, часть истекла, часть отозвана"""
+    now = datetime.datetime.utcnow()
+    users = [User(id=i, username=f"user{i}", email=f"user{i}@example.com") for i in range(1, count // 10 + 2)]
+    keys = []
+    for i in range(1, count + 1):
+        created_at = now - datetime.timedelta(minutes=i)
+        owner = users[i % len(users)] if i % 2 else None
+        keys.append(Key(
+            id=i,
+            key=f"{i:032d}",
+            created_at=created_at,
+            activated_at=created_at if owner else None,
+            duration=86400 * (1 + i % 30),
+            expires_at=created_at + datetime.timedelta(days=1 + i % 30),
+            is_active=i % 17 != 0,
+            user=owner
+        ))
+    return keys
+
+
+def measure(function, repeat=3):
+    """Лучшее время из нескольких запусков и результат последнего"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"Создание {count} ключей...")
+    keys = make_keys(count)
+
+    def wrap(items):
+        return {"keys": items, "next_cursor": None, "total": len(items)}
+
+    print(f"\n{'Вариант':<44}{'сериализация':>14}{'сжатие':>10}{'байт':>14}")
+
+    # До: словари с isoformat() и стандартный json, как в flask_restful (ensure_ascii, без сжатия)
+    legacy_time, legacy_body = measure(
+        lambda: (json.dumps(wrap([legacy_serialize_admin_key(key) for key in keys])) + "\n").encode("utf-8")
+    )
+    print(f"{'до: isoformat + json (flask_restful)':<44}{legacy_time * 1000:>12.0f}мс{'-':>10}{len(legacy_body):>14}")
+
+    for name, encode in ENCODERS.items():
+        def build():
+            now = datetime.datetime.utcnow()
+            return encode(wrap([serialize_admin_key(key, now) for key in keys]))
+
+        serialize_time, body = measure(build)
+        print(f"{'после: ' + name:<44}{serialize_time * 1000:>12.0f}мс{'-':>10}{len(body):>14}")
+
+        for encoding in ResponseCompressor().encodings:
+            compress_time, compressed = measure(lambda: compress_data(body, encoding))
+            print(f"{'после: ' + name + ' + ' + encoding:<44}{serialize_time * 1000:>12.0f}мс"
+                  f"{compress_time * 1000:>8.0f}мс{len(compressed):>14}")
+
+
+if __name__ == "__main__":
+    main()
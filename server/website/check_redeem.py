@@ -0,0 +1,83 @@
+"""
+Офлайн-проверка активации ключей:
+
+    python check_redeem.py
+
+Чужой ключ активируется дважды подряд через /api/keys/redeem и через
+/api/discord/redeem-key: каждый раз ожидается ответ 4xx, а не 500
+("database is locked" из-за транзакции, оставшейся открытой после неудачного UPDATE).
+Затем свободный ключ активируется успешно.
+
+База создаётся во временном файле, реальная не используется.
+"""
+import os
+import sys
+import datetime
+import tempfile
+
+db_file = os.path.join(tempfile.mkdtemp(), "check_redeem.db")
+os.environ["USE_POSTGRES"] = "false"
+os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+os.environ["BOT_EVENTS_ADDR"] = ""
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Движок создаётся при первом импорте моделей, поэтому app.py,
+# подставляющий путь к основной базе, на временную базу уже не влияет
+from database.models import Base, SessionLocal, User, Key, engine
+
+Base.metadata.create_all(bind=engine)
+
+from flask_jwt_extended import create_access_token
+
+import app as website
+
+
+def seed():
+    now = datetime.datetime.utcnow()
+    db = SessionLocal()
+    owner = User(username="owner", email="owner@example.com", password_hash="-")
+    user = User(username="user", email="user@example.com", password_hash="-", discord_id="1001")
+    db.add_all([owner, user])
+    db.flush()
+    db.add_all([
+        Key(key="TAKEN", user_id=owner.id, activated_at=now, expires_at=now + datetime.timedelta(days=1)),
+        Key(key="FREE-WEB", expires_at=now + datetime.timedelta(days=30)),
+        Key(key="FREE-DISCORD", expires_at=now + datetime.timedelta(days=30))
+    ])
+    db.commit()
+    user_id = user.id
+    db.close()
+    return user_id
+
+
+def main():
+    user_id = seed()
+    client = website.app.test_client()
+    with website.app.app_context():
+        token = create_access_token(identity=user_id)
+
+    def redeem_web(key):
+        return client.post("/api/keys/redeem", json={"key": key}, headers={"Authorization": f"Bearer {token}"})
+
+    def redeem_discord(key):
+        return client.post("/api/discord/redeem-key", json={"key": key, "discord_id": "1001"})
+
+    failures = 0
+    for name, redeem, free_key in (("web", redeem_web, "FREE-WEB"), ("discord", redeem_discord, "FREE-DISCORD")):
+        for attempt in (1, 2):
+            response = redeem("TAKEN")
+            ok = 400 <= response.status_code < 500
+            failures += not ok
+            print(f"{name}: занятый ключ, попытка {attempt}: {response.status_code} {'OK' if ok else 'ОШИБКА'}")
+        response = redeem(free_key)
+        ok = response.status_code == 200
+        failures += not ok
+        print(f"{name}: свободный ключ: {response.status_code} {'OK' if ok else 'ОШИБКА'}")
+
+    print("Все проверки пройдены" if not failures else f"Ошибок: {failures}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import time
+import threading
+import logging
+import itertools
+
+logger = logging.getLogger(__name__)
+
+# Размер блока, которым отдаётся файл при ограничении скорости
+TRANSFER_BLOCK_SIZE = 64 * 1024
+
+
+class TokenBucket:
+    """
+    Ведро токенов для ограничения скорости (токен = байт).
+    Потребитель резервирует токены заранее и ждёт, пока долг не погасится,
+    поэтому конкурирующие потоки обслуживаются по очереди обращения
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = rate
+        self.tokens = rate
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount):
+        """Резервирует amount токенов и возвращает, сколько секунд нужно подождать"""
+        if not self.rate:
+            return 0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+
+class Transfer:
+    """Активная передача файла"""
+
+    def __init__(self, transfer_id, user_id, username, mod_name, size):
+        self.id = transfer_id
+        self.user_id = user_id
+        self.username = username
+        self.mod_name = mod_name
+        self.size = size
+        self.sent = 0
+        self.started_at = time.time()
+
+    def to_dict(self):
+        elapsed = max(time.time() - self.started_at, 0.001)
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "username": self.username,
+            "mod_name": self.mod_name,
+            "size": self.size,
+            "sent": self.sent,
+            "started_at": self.started_at,
+            "rate": int(self.sent / elapsed)
+        }
+
+
+class ThrottledBody:
+    """
+    Обёртка над телом ответа: отдаёт данные блоками с учётом общего и
+    пользовательского ведра токенов и освобождает слот при закрытии ответа
+    """
+
+    def __init__(self, scheduler, transfer, body):
+        self.scheduler = scheduler
+        self.transfer = transfer
+        self.body = body
+        self.user_bucket = scheduler.user_bucket(transfer.user_id)
+
+    def __iter__(self):
+        for data in self.body:
+            for start in range(0, len(data), TRANSFER_BLOCK_SIZE):
+                block = data[start:start + TRANSFER_BLOCK_SIZE]
+                wait = max(self.scheduler.global_bucket.reserve(len(block)), self.user_bucket.reserve(len(block)))
+                if wait:
+                    time.sleep(wait)
+                self.transfer.sent += len(block)
+                yield block
+
+    def close(self):
+        try:
+            if hasattr(self.body, "close"):
+                self.body.close()
+        finally:
+            self.scheduler.release(self.transfer)
+
+
+class DownloadScheduler:
+    """
+    Планировщик загрузок модов: ограничивает число одновременных передач
+    (всего и на пользователя), делит полосу через ведра токенов и ведёт очередь
+    ожидающих. Клиент, не получивший слот, получает 503 с Retry-After и при
+    повторе обслуживается в порядке очереди.
+
+    Состояние хранится в памяти процесса: при нескольких воркерах лимиты действуют на каждый.
+    """
+
+    # Сколько секунд место в очереди хранится сверх подсказанного Retry-After
+    QUEUE_GRACE = 30
+
+    def __init__(self, max_active=20, max_per_user=2, global_rate=0, user_rate=0):
+        self.max_active = max_active
+        self.max_per_user = max_per_user
+        self.user_rate = user_rate
+        self.global_bucket = TokenBucket(global_rate)
+        self.user_buckets = {}
+        self.active = {}
+        # Очередь: (user_id, mod_name) -> {"position_key", "username", "expires_at"}
+        self.queue = {}
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.average_duration = 10.0
+
+    def user_bucket(self, user_id):
+        with self.lock:
+            bucket = self.user_buckets.get(user_id)
+            if bucket is None:
+                bucket = self.user_buckets[user_id] = TokenBucket(self.user_rate)
+            return bucket
+
+    def expire_queue(self, now):
+        for ticket, entry in list(self.queue.items()):
+            if entry["expires_at"] < now:
+                del self.queue[ticket]
+
+    def retry_after(self, position):
+        """Оценка времени ожидания по средней длительности передачи"""
+        slots = max(self.max_active, 1)
+        return max(1, int(self.average_duration * (position // slots + 1)))
+
+    def acquire(self, user_id, username, mod_name, size):
+        """
+        Пытается занять слот для передачи.
+        Возвращает (Transfer, None) или (None, retry_after_секунд)
+        """
+        ticket = (user_id, mod_name)
+        now = time.time()
+        with self.lock:
+            self.expire_queue(now)
+
+            user_active = sum(1 for t in self.active.values() if t.user_id == user_id)
+            ahead = sorted(self.queue, key=lambda t: self.queue[t]["position_key"])
+            position = ahead.index(ticket) if ticket in self.queue else len(ahead)
+            free_slots = self.max_active - len(self.active)
+
+            # Слот выдаётся, если он свободен для этого места в очереди
+            # и пользователь не превысил свой лимит одновременных загрузок
+            if position < free_slots and user_active < self.max_per_user:
+                self.queue.pop(ticket, None)
+                transfer = Transfer(next(self.ids), user_id, username, mod_name, size)
+                self.active[transfer.id] = transfer
+                return transfer, None
+
+            retry_after = self.retry_after(position)
+            entry = self.queue.setdefault(ticket, {"position_key": (now, next(self.ids)), "username": username})
+            entry["expires_at"] = now + retry_after + self.QUEUE_GRACE
+            return None, retry_after
+
+    def release(self, transfer):
+        with self.lock:
+            if self.active.pop(transfer.id, None) is None:
+                return
+            duration = time.time() - transfer.started_at
+            # Скользящее среднее длительности для оценки Retry-After
+            self.average_duration = self.average_duration * 0.9 + duration * 0.1
+
+    def wrap(self, transfer, body):
+        return ThrottledBody(self, transfer, body)
+
+    def snapshot(self):
+        """Состояние планировщика для админ-панели"""
+        with self.lock:
+            self.expire_queue(time.time())
+            queue = sorted(self.queue.items(), key=lambda item: item[1]["position_key"])
+            return {
+                "active": [transfer.to_dict() for transfer in self.active.values()],
+                "queue": [
+                    {
+                        "user_id": user_id,
+                        "username": entry["username"],
+                        "mod_name": mod_name,
+                        "queued_at": entry["position_key"][0]
+                    } for (user_id, mod_name), entry in queue
+                ],
+                "queue_depth": len(queue),
+                "limits": {
+                    "max_active": self.max_active,
+                    "max_per_user": self.max_per_user,
+                    "global_rate": self.global_bucket.rate,
+                    "user_rate": self.user_rate
+                },
+                "average_duration": round(self.average_duration, 1)
+            }
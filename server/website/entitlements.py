@@ -0,0 +1,72 @@
+import time
+import threading
+import collections
+
+
+class EntitlementCache:
+    """
+    Кэш права на скачивание модов: для каждого способа авторизации
+    (JWT пользователя или ключ лоадера) хранится результат проверки бана и ключа.
+
+    Запись живёт не дольше ttl секунд и не дольше срока действия ключа.
+    Бан, отзыв и активация ключа сбрасывают записи пользователя сразу;
+    изменения из других процессов (Discord бот, другие воркеры) видны через ttl.
+
+    Записи хранятся в порядке сохранения: при каждом put истёкшие записи
+    удаляются из начала, а при превышении maxsize удаляются самые старые
+    """
+
+    def __init__(self, ttl=60, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, credential):
+        """Возвращает актуальную запись или None"""
+        entry = self.entries.get(credential)
+        if entry and entry["valid_until"] > time.monotonic():
+            return entry
+        return None
+
+    def put(self, credential, user_id, username, error=None, expires_in=None):
+        """
+        Сохраняет результат проверки. error - (сообщение, код) при отказе,
+        expires_in - сколько секунд ещё действует ключ
+        """
+        lifetime = self.ttl if expires_in is None else min(self.ttl, expires_in)
+        entry = {
+            "user_id": user_id,
+            "username": username,
+            "error": error,
+            "valid_until": time.monotonic() + lifetime
+        }
+        if self.ttl > 0:
+            with self.lock:
+                self.entries.pop(credential, None)
+                self.entries[credential] = entry
+                self.evict()
+        return entry
+
+    def evict(self):
+        """Удаляет истёкшие записи из начала и самые старые сверх maxsize (под блокировкой)"""
+        now = time.monotonic()
+        while self.entries:
+            credential, entry = next(iter(self.entries.items()))
+            if entry["valid_until"] > now and len(self.entries) <= self.maxsize:
+                break
+            del self.entries[credential]
+
+    def invalidate(self, *user_ids):
+        """Сбрасывает все записи указанных пользователей"""
+        user_ids = set(user_ids)
+        with self.lock:
+            now = time.monotonic()
+            self.entries = collections.OrderedDict(
+                (credential, entry) for credential, entry in self.entries.items()
+                if entry["user_id"] not in user_ids and entry["valid_until"] > now
+            )
+
+    def clear(self):
+        with self.lock:
+            self.entries = collections.OrderedDict()
@@ -0,0 +1,76 @@
+"""
+События сайта для Discord бота. Событие записывается в таблицу domain_events
+в той же транзакции, что и само изменение, поэтому не теряется при падении
+бота или сайта. После фиксации транзакции бот будится UDP-датаграммой на
+локальный адрес; если датаграмма не дошла, бот заберёт событие при
+следующей плановой проверке таблицы.
+"""
+import json
+import socket
+
+from sqlalchemy import event
+
+from database.models import DomainEvent
+
+EVENT_TYPES = {
+    "key_redeemed",      # ключ привязан к пользователю (активация или выдача админом)
+    "key_revoked",
+    "key_restored",
+    "key_deleted",
+    "user_banned",
+    "user_unbanned",
+    "discord_linked",
+    "discord_unlinked"
+}
+
+
+def publish_event(db, event_type, user_id, discord_id=None, **payload):
+    """Добавляет событие в сессию; оно будет записано вместе с остальными изменениями"""
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Неизвестный тип события: {event_type}")
+    db.add(DomainEvent(
+        event_type=event_type,
+        user_id=user_id,
+        discord_id=discord_id,
+        payload=json.dumps(payload) if payload else None
+    ))
+    db.info["notify_bot"] = True
+
+
+def parse_address(address):
+    """'127.0.0.1:5055' -> ('127.0.0.1', 5055); пустая строка - уведомления отключены"""
+    if not address:
+        return None
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class BotNotifier:
+    """Будит бота после фиксации транзакций, в которых были опубликованы события"""
+
+    def __init__(self, address):
+        self.address = parse_address(address)
+        self.socket = None
+
+    def install(self, session_factory):
+        event.listen(session_factory, "after_commit", self.after_commit)
+        event.listen(session_factory, "after_rollback", self.after_rollback)
+
+    def after_commit(self, session):
+        if session.info.pop("notify_bot", False):
+            self.notify()
+
+    def after_rollback(self, session):
+        session.info.pop("notify_bot", None)
+
+    def notify(self):
+        if not self.address:
+            return
+        try:
+            if self.socket is None:
+                self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                self.socket.setblocking(False)
+            self.socket.sendto(b"events", self.address)
+        except OSError:
+            # Бот не запущен или очередь сокета заполнена - событие останется в таблице
+            pass
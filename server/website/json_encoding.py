@@ -0,0 +1,120 @@
+import json
+import gzip
+import datetime
+import logging
+
+from flask.json.provider import JSONProvider
+
+# orjson - необязательная зависимость: без неё используется стандартный json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# brotli - необязательная зависимость: без неё ответы сжимаются только gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Порядок - приоритет выбора сжатия ответа
+RESPONSE_ENCODINGS = ("br", "gzip")
+
+
+def default_json(value):
+    """Типы, которые стандартный json не сериализует сам"""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"Объект типа {type(value).__name__} не сериализуется в JSON")
+
+
+def dumps_json(data):
+    return json.dumps(data, default=default_json, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+
+
+def dumps_orjson(data):
+    # Даты без часового пояса orjson записывает так же, как isoformat()
+    return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+
+# Доступные кодировщики: имя -> функция, возвращающая bytes
+ENCODERS = {"json": dumps_json}
+if orjson:
+    ENCODERS["orjson"] = dumps_orjson
+
+
+def get_encoder(name):
+    """Кодировщик по имени; orjson по умолчанию, стандартный json, если orjson не установлен"""
+    name = (name or ("orjson" if orjson else "json")).lower()
+    if name not in ENCODERS:
+        logger.warning(f"Кодировщик JSON {name} недоступен, используется json")
+        name = "json"
+    return name, ENCODERS[name]
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    JSON-провайдер Flask (jsonify) на выбранном кодировщике: тело ответа
+    сразу собирается в bytes, даты сериализуются без ручного isoformat()
+    """
+
+    def __init__(self, app, encoder):
+        super().__init__(app)
+        self.encode = encoder
+
+    def dumps(self, obj, **kwargs):
+        return self.encode(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        data = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encode(data), mimetype="application/json")
+
+
+def compress_data(data, encoding):
+    # Ответы сжимаются на каждый запрос - уровень ниже, чем у статики, ради скорости
+    if encoding == "br":
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+class ResponseCompressor:
+    """Сжатие JSON-ответов больше min_size байт по Accept-Encoding клиента"""
+
+    def __init__(self, min_size=1024):
+        self.min_size = min_size
+        self.encodings = [e for e in RESPONSE_ENCODINGS if e != "br" or brotli]
+
+    def choose_encoding(self, accept_encodings):
+        for encoding in self.encodings:
+            if accept_encodings.quality(encoding) > 0:
+                return encoding
+        return None
+
+    def compress(self, response, accept_encodings):
+        # Потоковые ответы (файлы модов), 304 и уже сжатые ответы не трогаем
+        if (self.min_size <= 0 or response.direct_passthrough or response.is_streamed
+                or response.status_code != 200 or "Content-Encoding" in response.headers
+                or response.mimetype != "application/json"):
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = self.choose_encoding(accept_encodings)
+        if encoding:
+            response.set_data(compress_data(data, encoding))
+            response.headers["Content-Encoding"] = encoding
+            # Сильный ETag относится к несжатому телу: у сжатого другие байты,
+            # поэтому ETag становится слабым (совпадает только при слабом сравнении
+            # в If-None-Match и не используется для Range/If-Range)
+            etag, weak = response.get_etag()
+            if etag and not weak:
+                response.set_etag(etag, weak=True)
+        return response
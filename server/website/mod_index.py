@@ -0,0 +1,534 @@
+import os
+import sys
+import json
+import gzip
+import time
+import shutil
+import hashlib
+import threading
+import logging
+
+# zstd - необязательная зависимость: без неё моды сжимаются только gzip
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# numpy - необязательная зависимость: ускоряет поиск границ чанков примерно в 20 раз
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+# Имя файла, в котором индекс хешей сохраняется между перезапусками сервера
+INDEX_FILE = ".index.json"
+
+# Размер блока при чтении файла для хеширования
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Параметры разбиения файлов на чанки по содержимому (gear-хеш):
+# граница ставится там, где старшие 16 бит хеша равны нулю (в среднем ~64 КБ),
+# но не раньше CHUNK_MIN_SIZE и не позже CHUNK_MAX_SIZE
+CHUNK_MIN_SIZE = 16 * 1024
+CHUNK_MAX_SIZE = 256 * 1024
+CHUNK_MASK = 0xFFFF << 48
+GEAR = [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:8], 'big') for i in range(256)]
+GEAR_ARRAY = numpy.array(GEAR, dtype=numpy.uint64) if numpy else None
+# По сколько байт gear-хеш считается векторно: граница обычно находится
+# в первых десятках КБ, поэтому весь максимальный чанк сразу не обрабатывается
+GEAR_SEGMENT = 8 * 1024
+
+# Предварительно сжатые копии лежат рядом с файлом: mod.jar.zst, mod.jar.gz
+# (тот же формат, что ожидает gzip_static в nginx). Порядок - приоритет выбора
+ENCODING_SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}
+
+# Сжатая копия хранится, только если она меньше оригинала хотя бы на 5%
+MIN_COMPRESSION_RATIO = 0.95
+
+
+def file_sha256(path):
+    """Считает SHA-256 файла блоками, не загружая его целиком в память"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_digest(data):
+    """Адрес чанка - первые 128 бит SHA-256 его содержимого"""
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def find_chunk_boundary(data, start, end):
+    """Ищет границу чанка в data[start:end] скользящим gear-хешем"""
+    if numpy is not None:
+        return find_chunk_boundary_vectorized(data, start, end)
+    gear = GEAR
+    h = 0
+    i = start + CHUNK_MIN_SIZE
+    if i >= end:
+        return end
+    while i < end:
+        h = ((h << 1) + gear[data[i]]) & 0xFFFFFFFFFFFFFFFF
+        i += 1
+        if not h & CHUNK_MASK:
+            return i
+    return i
+
+
+def find_chunk_boundary_vectorized(data, start, end):
+    """
+    То же, что цикл в find_chunk_boundary, но на numpy: значение хеша после байта i
+    равно сумме gear[data[i - k]] << k по k < 64 (старшие сдвиги выходят за 64 бита),
+    и такие суммы для всех позиций сегмента считаются за 6 сдвигов с удвоением.
+    Хеш начинается с нуля в start + CHUNK_MIN_SIZE, поэтому байты до этой позиции не учитываются
+    """
+    first = start + CHUNK_MIN_SIZE
+    if first >= end:
+        return end
+    pos = first
+    while pos < end:
+        # 63 предыдущих байта нужны, чтобы хеш в начале сегмента был полным
+        lo = max(first, pos - 63)
+        hi = min(end, pos + GEAR_SEGMENT)
+        h = GEAR_ARRAY[numpy.frombuffer(data, dtype=numpy.uint8, count=hi - lo, offset=lo)]
+        shift = 1
+        while shift < 64:
+            h[shift:] = h[shift:] + (h[:-shift] << numpy.uint64(shift))
+            shift <<= 1
+        hits = numpy.flatnonzero((h[pos - lo:] >> numpy.uint64(48)) == 0)
+        if len(hits):
+            return pos + int(hits[0]) + 1
+        pos = hi
+    return end
+
+
+def hash_and_chunk(path):
+    """
+    За один проход считает SHA-256 файла и делит его на чанки по содержимому.
+    Возвращает (sha256, [[адрес_чанка, размер], ...])
+    """
+    digest = hashlib.sha256()
+    chunks = []
+    buffer = b''
+    pos = 0
+    eof = False
+    with open(path, 'rb') as f:
+        while True:
+            if not eof and len(buffer) - pos < CHUNK_MAX_SIZE:
+                block = f.read(HASH_BLOCK_SIZE)
+                if block:
+                    digest.update(block)
+                    buffer = buffer[pos:] + block
+                    pos = 0
+                    continue
+                eof = True
+
+            if pos >= len(buffer):
+                break
+
+            # Граница ищется только когда в буфере есть полный максимальный чанк
+            # (или файл закончился), чтобы разбиение не зависело от размера блока чтения
+            end = find_chunk_boundary(buffer, pos, min(len(buffer), pos + CHUNK_MAX_SIZE))
+            chunks.append([chunk_digest(buffer[pos:end]), end - pos])
+            pos = end
+
+    return digest.hexdigest(), chunks
+
+
+def available_encodings():
+    """Кодировки, которые можно создать в текущем окружении"""
+    return [encoding for encoding in ENCODING_SUFFIXES if encoding != "zstd" or zstandard]
+
+
+def is_compressed_variant(name):
+    """Является ли файл сжатой копией другого файла"""
+    return any(name.endswith(suffix) for suffix in ENCODING_SUFFIXES.values())
+
+
+def compress_file(source, destination, encoding):
+    """Сжимает файл потоково, результат появляется атомарно"""
+    # Временный файл скрытый, чтобы индекс не принял его за мод
+    tmp_path = os.path.join(os.path.dirname(destination), "." + os.path.basename(destination) + ".tmp")
+    with open(source, 'rb') as fin:
+        if encoding == "zstd":
+            with open(tmp_path, 'wb') as fout:
+                zstandard.ZstdCompressor(level=19).copy_stream(fin, fout)
+        else:
+            with gzip.open(tmp_path, 'wb', compresslevel=9) as fout:
+                shutil.copyfileobj(fin, fout, HASH_BLOCK_SIZE)
+    os.replace(tmp_path, destination)
+
+
+class ModIndex:
+    """
+    Индекс файлов модов: размер, mtime и SHA-256 каждого файла.
+    Хеш пересчитывается только если у файла изменился размер или mtime,
+    сам индекс сохраняется в INDEX_FILE рядом с модами.
+    """
+
+    def __init__(self, directory, rescan_interval=30):
+        self.directory = directory
+        self.entries = {}
+        self.lock = threading.Lock()
+        # Как часто lookup пересканирует директорию (секунд)
+        self.rescan_interval = rescan_interval
+        self.scanned_at = 0
+        # Файлы, сжатие которых выполняется в фоне
+        self.compressing = set()
+        # Файлы, которые сейчас хешируются (вне блокировки)
+        self.hashing = set()
+        # Идёт ли фоновое пересканирование, запущенное из lookup
+        self.refreshing = False
+        # Адрес чанка -> (файл, смещение, размер); строится при первом запросе чанков
+        self.chunk_map = None
+        self.load()
+
+    def index_path(self):
+        return os.path.join(self.directory, INDEX_FILE)
+
+    def load(self):
+        """Загружает сохранённый индекс, если он есть"""
+        try:
+            with open(self.index_path(), 'r') as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            self.entries = {}
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать индекс модов: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Атомарно сохраняет индекс на диск"""
+        tmp_path = self.index_path() + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.index_path())
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить индекс модов: {e}")
+
+    def refresh(self):
+        """
+        Сверяет индекс с содержимым директории и перехеширует изменённые файлы.
+        Хеширование идёт вне блокировки: пока большой мод перехешируется,
+        запросы получают его прежнюю запись, а не ждут
+        """
+        with self.lock:
+            self.scanned_at = time.monotonic()
+            if not os.path.isdir(self.directory):
+                changed = bool(self.entries)
+                self.entries = {}
+                return changed
+
+            seen = set()
+            stale = []
+            changed = False
+            for item in os.scandir(self.directory):
+                if item.name.startswith('.') or not item.is_file() or is_compressed_variant(item.name):
+                    continue
+
+                seen.add(item.name)
+                stat = item.stat()
+                # Файл, который уже хеширует другой поток, пропускается
+                if not self.is_current(item.name, stat) and item.name not in self.hashing:
+                    self.hashing.add(item.name)
+                    stale.append((item.name, item.path, stat))
+
+            for name in list(self.entries):
+                if name not in seen:
+                    del self.entries[name]
+                    self.chunk_map = None
+                    changed = True
+                    # Сжатые копии удалённого мода больше не нужны
+                    for encoding in ENCODING_SUFFIXES:
+                        if os.path.exists(self.compressed_path(name, encoding)):
+                            os.remove(self.compressed_path(name, encoding))
+
+            if changed:
+                self.save()
+
+        for name, path, stat in stale:
+            if self.rehash(name, path, stat, claimed=True):
+                changed = True
+        return changed
+
+    def refresh_async(self):
+        """Пересканирует директорию в фоновом потоке, если это ещё не делается"""
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+            # Следующие lookup не запускают сканирование повторно
+            self.scanned_at = time.monotonic()
+
+        def worker():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Ошибка при обновлении индекса модов: {e}")
+            finally:
+                with self.lock:
+                    self.refreshing = False
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def is_current(self, name, stat):
+        """Совпадают ли размер и mtime файла с записью индекса"""
+        entry = self.entries.get(name)
+        return bool(entry) and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns and "chunks" in entry
+
+    def rehash(self, name, path, stat, claimed=False):
+        """
+        Хеширует файл вне блокировки и подменяет запись под блокировкой.
+        claimed - файл уже отмечен в self.hashing вызывающим кодом.
+        Возвращает новую запись или None, если файл не удалось прочитать
+        """
+        try:
+            sha256, chunks = hash_and_chunk(path)
+        except OSError as e:
+            logger.warning(f"Не удалось проиндексировать мод {name}: {e}")
+            sha256 = None
+        finally:
+            if claimed:
+                with self.lock:
+                    self.hashing.discard(name)
+        if sha256 is None:
+            return None
+
+        entry = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+            # Версия файла - префикс хеша: меняется только при изменении содержимого
+            "version": sha256[:12],
+            # Размеры сжатых копий для текущего содержимого (None - сжатие не выгодно)
+            "encodings": {},
+            # Разбиение по содержимому для дедупликации при обновлениях
+            "chunks": chunks
+        }
+        with self.lock:
+            current = self.entries.get(name)
+            # Другой поток мог уже записать более новую версию файла
+            if current and current["mtime_ns"] > stat.st_mtime_ns:
+                return current
+            self.entries[name] = entry
+            self.chunk_map = None
+            self.save()
+        logger.info(f"Мод {name} проиндексирован ({stat.st_size} байт)")
+        return entry
+
+    def get(self, name):
+        """Возвращает запись индекса для файла или None"""
+        return self.entries.get(name)
+
+    def lookup(self, name):
+        """
+        Возвращает запись файла из индекса в памяти. Директория пересканируется
+        в фоне не чаще раза в rescan_interval секунд (и при каждом запросе манифеста),
+        поэтому для отдельного файла это просто поиск в словаре
+        """
+        if time.monotonic() - self.scanned_at > self.rescan_interval:
+            self.refresh_async()
+        return self.entries.get(name)
+
+    def check(self, name):
+        """
+        Сверяет запись одного файла с диском: проверяет только его stat,
+        не сканируя всю директорию. Скрытые и отсутствующие файлы - None.
+        Изменённый файл перехешируется вне блокировки
+        """
+        if name.startswith('.') or os.path.basename(name) != name or is_compressed_variant(name):
+            return None
+
+        path = os.path.join(self.directory, name)
+        with self.lock:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stat = None
+
+            if stat is None or not os.path.isfile(path):
+                if self.entries.pop(name, None):
+                    self.chunk_map = None
+                return None
+
+            if self.is_current(name, stat):
+                return self.entries[name]
+
+        return self.rehash(name, path, stat)
+
+    def current(self, name):
+        """
+        Запись файла, если она совпадает с файлом на диске (размер и mtime), иначе None.
+        В отличие от check() не хеширует: для изменённого файла запускается фоновое
+        пересканирование, а до его окончания у файла нет достоверного хеша
+        """
+        try:
+            stat = os.stat(os.path.join(self.directory, name))
+        except OSError:
+            return None
+
+        with self.lock:
+            if self.is_current(name, stat):
+                return self.entries[name]
+        self.refresh_async()
+        return None
+
+    def compressed_path(self, name, encoding):
+        return os.path.join(self.directory, name + ENCODING_SUFFIXES[encoding])
+
+    def compress(self, name):
+        """Создаёт недостающие сжатые копии файла для его текущей версии"""
+        with self.lock:
+            entry = self.entries.get(name)
+            if not entry:
+                return
+            sha256 = entry["sha256"]
+            missing = [e for e in available_encodings() if e not in entry.setdefault("encodings", {})]
+
+        source = os.path.join(self.directory, name)
+        results = {}
+        for encoding in missing:
+            destination = self.compressed_path(name, encoding)
+            try:
+                compress_file(source, destination, encoding)
+            except Exception as e:
+                logger.error(f"Ошибка при сжатии {name} ({encoding}): {e}")
+                continue
+
+            size = os.path.getsize(destination)
+            if size >= entry["size"] * MIN_COMPRESSION_RATIO:
+                os.remove(destination)
+                size = None
+                logger.info(f"Мод {name} плохо сжимается {encoding}, копия не сохранена")
+            else:
+                logger.info(f"Мод {name} сжат {encoding}: {entry['size']} -> {size} байт")
+            results[encoding] = size
+
+        with self.lock:
+            entry = self.entries.get(name)
+            # Файл мог измениться, пока шло сжатие - тогда результат устарел
+            if entry and entry["sha256"] == sha256:
+                entry.setdefault("encodings", {}).update(results)
+                self.save()
+
+    def compress_async(self, name):
+        """Запускает сжатие в фоновом потоке, если оно ещё не идёт"""
+        with self.lock:
+            if name in self.compressing:
+                return
+            self.compressing.add(name)
+
+        def worker():
+            try:
+                self.compress(name)
+            finally:
+                with self.lock:
+                    self.compressing.discard(name)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def compress_all(self):
+        """Сжимает все моды (шаг сборки перед выкладкой)"""
+        self.refresh()
+        for name in list(self.entries):
+            self.compress(name)
+
+    def choose_encoding(self, name, accepted):
+        """
+        Выбирает готовую сжатую копию по списку принимаемых клиентом кодировок.
+        Если копий ещё нет, ставит их создание в фон и возвращает None (без сжатия)
+        """
+        entry = self.entries.get(name)
+        if not entry:
+            return None
+
+        encodings = entry.get("encodings", {})
+        if any(e not in encodings for e in available_encodings()):
+            self.compress_async(name)
+
+        for encoding in ENCODING_SUFFIXES:
+            if encoding in accepted and encodings.get(encoding):
+                if os.path.exists(self.compressed_path(name, encoding)):
+                    return encoding
+        return None
+
+    def find_chunk(self, chunk_hash):
+        """Находит чанк по адресу: (имя файла, смещение, размер) или None"""
+        with self.lock:
+            if self.chunk_map is None:
+                chunk_map = {}
+                for name, entry in self.entries.items():
+                    offset = 0
+                    for digest, size in entry.get("chunks", []):
+                        chunk_map.setdefault(digest, (name, offset, size))
+                        offset += size
+                self.chunk_map = chunk_map
+            return self.chunk_map.get(chunk_hash)
+
+    def locate_chunks(self, chunk_hashes):
+        """
+        Находит расположение чанков в текущих версиях файлов.
+        Файлы, в которых лежат чанки, сверяются с диском; если какого-то чанка нет - None
+        """
+        located = [self.find_chunk(chunk_hash) for chunk_hash in chunk_hashes]
+        if None in located:
+            return None
+
+        # Если файл изменился после индексации, смещения пересчитываются
+        if any([self.check(name) is None for name in {name for name, _, _ in located}]) or self.chunk_map is None:
+            located = [self.find_chunk(chunk_hash) for chunk_hash in chunk_hashes]
+            if None in located:
+                return None
+        return located
+
+    def iter_chunks(self, located):
+        """Читает содержимое найденных чанков по порядку"""
+        handles = {}
+        try:
+            for name, offset, size in located:
+                if name not in handles:
+                    handles[name] = open(os.path.join(self.directory, name), 'rb')
+                handles[name].seek(offset)
+                yield handles[name].read(size)
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+    def manifest(self, with_chunks=False):
+        """Манифест модов: версия набора и список файлов с размером, хешем и версией"""
+        mods = []
+        # Снимок под блокировкой: записи подменяются из других потоков после хеширования
+        with self.lock:
+            entries = sorted(self.entries.items())
+        for name, entry in entries:
+            mod = {
+                "name": name,
+                "size": entry["size"],
+                "sha256": entry["sha256"],
+                "version": entry["version"]
+            }
+            if with_chunks:
+                mod["chunks"] = entry.get("chunks", [])
+            mods.append(mod)
+
+        # Версия всего набора меняется при изменении любого файла
+        digest = hashlib.sha256()
+        for mod in mods:
+            digest.update(f"{mod['name']}:{mod['sha256']}\n".encode('utf-8'))
+
+        return {
+            "version": digest.hexdigest()[:16],
+            "mods": mods
+        }
+
+
+if __name__ == "__main__":
+    # Предварительное сжатие модов: python mod_index.py [директория]
+    logging.basicConfig(level=logging.INFO)
+    directory = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "mods")
+    ModIndex(directory).compress_all()
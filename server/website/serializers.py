@@ -0,0 +1,60 @@
+import datetime
+
+# Представления записей для списков API.
+# Даты передаются как есть - их сериализует кодировщик JSON (см. json_encoding.py)
+
+
+# Представление пользователя для таблиц админ-панели
+def serialize_admin_user(user):
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "created_at": user.created_at,
+        "last_login": user.last_login,
+        "last_ip": user.last_ip,
+        "is_admin": user.is_admin,
+        "is_support": user.is_support,
+        "is_banned": user.is_banned,
+        "discord_linked": user.discord_id is not None,
+        "discord_username": user.discord_username
+    }
+
+
+# Представление ключа для таблиц админ-панели
+def serialize_admin_key(key, now=None):
+    """now - текущий момент, общий для всего списка (вместо utcnow() на каждый ключ)"""
+    now = now or datetime.datetime.utcnow()
+    active = bool(key.is_active) and key.expires_at > now
+    user = key.user
+    return {
+        "id": key.id,
+        "key": key.key,
+        "created_at": key.created_at,
+        "activated_at": key.activated_at,
+        "expires_at": key.expires_at,
+        "is_active": active,
+        "time_left": max(0, int((key.expires_at - now).total_seconds())) if active else 0,
+        "duration_hours": key.duration // 3600,
+        "status": "Активирован" if key.activated_at else "Не активирован",
+        "user": {
+            "id": user.id,
+            "username": user.username
+        } if user else None
+    }
+
+
+# Представление инвайта для списков приглашений
+def serialize_invite(invite):
+    return {
+        "id": invite.id,
+        "code": invite.code,
+        "created_at": invite.created_at,
+        "expires_at": invite.expires_at,
+        "used": invite.used,
+        "used_by": invite.used_by.username if invite.used_by else None,
+        "created_by": {
+            "id": invite.created_by.id,
+            "username": invite.created_by.username
+        }
+    }
@@ -0,0 +1,1124 @@
+// Модули админ-панели: загружаются только когда администратор или саппорт
+// открывает админ-панель (см. adminModule в app.js)
+
+// Таблица с виртуальной прокруткой: в DOM находятся только видимые строки,
+// следующие страницы запрашиваются у сервера по мере прокрутки,
+// а изменённые записи обновляются на месте без перезагрузки списка.
+// Повторное открытие таблицы запрашивает только изменения после курсора синхронизации
+function createVirtualTable(options) {
+    const table = {
+        items: [],
+        // id записи -> позиция в items
+        positions: {},
+        // id записи -> отрисованная строка
+        rows: {},
+        nextCursor: null,
+        // Курсор синхронизации и поисковый запрос, с которым загружен список
+        syncCursor: null,
+        search: '',
+        total: 0,
+        done: false,
+        loading: null,
+        // Номер загрузки: ответы устаревших запросов (после смены поиска) отбрасываются
+        generation: 0,
+        rowHeight: options.rowHeight || 40,
+        overscan: 10,
+        start: 0,
+        end: 0,
+        
+        // Сброс списка и загрузка первой страницы
+        reset: function() {
+            this.generation++;
+            this.items = [];
+            this.positions = {};
+            this.rows = {};
+            this.nextCursor = null;
+            this.syncCursor = null;
+            this.search = options.search();
+            this.total = 0;
+            this.done = false;
+            this.loading = null;
+            options.container.scrollTop = 0;
+            if (options.onReset) options.onReset(this);
+            return this.loadMore();
+        },
+        
+        // Обновление списка: изменения после курсора или полная загрузка,
+        // если списка ещё нет, поменялся поиск или сервер не может отдать изменения
+        sync: async function() {
+            if (!this.syncCursor || this.search !== options.search()) {
+                return this.reset();
+            }
+            
+            const generation = this.generation;
+            const changes = await options.fetchChanges(this.syncCursor);
+            if (generation !== this.generation) return;
+            if (changes.reset) {
+                return this.reset();
+            }
+            this.applyChanges(changes);
+        },
+        
+        // Применение изменений: обновление строк на месте, удаление
+        // и добавление новых записей в начало списка (только без поиска -
+        // неизвестно, подходят ли они под запрос)
+        applyChanges: function(changes) {
+            const changedIds = new Set(changes.changed.map(item => item.id));
+            const removed = changes.deleted.filter(id => this.positions[id] !== undefined && !changedIds.has(id));
+            const newestId = this.items.length ? this.items[0].id : 0;
+            const created = this.search ? [] : changes.changed.filter(item => this.positions[item.id] === undefined && item.id > newestId);
+            
+            changes.changed.forEach(item => this.patch(item));
+            this.syncCursor = changes.cursor;
+            if (removed.length === 0 && created.length === 0) return;
+            
+            const removedIds = new Set(removed);
+            this.items = created.sort((a, b) => b.id - a.id).concat(this.items.filter(item => !removedIds.has(item.id)));
+            this.positions = {};
+            this.items.forEach((item, index) => { this.positions[item.id] = index; });
+            removed.forEach(id => delete this.rows[id]);
+            this.total = Math.max(0, this.total + created.length - removed.length);
+            
+            // Новые строки сверху не сдвигают просматриваемую часть списка
+            if (created.length && options.container.scrollTop > 0) {
+                options.container.scrollTop += created.length * this.rowHeight;
+            }
+            this.render(true);
+        },
+        
+        // Загрузка следующей страницы с сервера
+        loadMore: function() {
+            if (this.loading) return this.loading;
+            if (this.done) return Promise.resolve();
+            
+            const generation = this.generation;
+            this.loading = options.fetchPage(this.nextCursor, this.search).then(page => {
+                if (generation !== this.generation) return;
+                // Изменения отсчитываются от момента загрузки первой страницы
+                if (!this.syncCursor) this.syncCursor = page.sync_cursor;
+                page.items.forEach(item => {
+                    this.positions[item.id] = this.items.length;
+                    this.items.push(item);
+                });
+                this.nextCursor = page.next_cursor;
+                this.done = !page.next_cursor;
+                this.total = page.total;
+                this.render(true);
+            }).finally(() => {
+                if (generation === this.generation) this.loading = null;
+            });
+            return this.loading;
+        },
+        
+        // Строка-распорка, заменяющая невидимые строки
+        spacer: function(height) {
+            const row = document.createElement('tr');
+            row.className = 'virtual-spacer';
+            row.innerHTML = `<td colspan="${options.columns}" style="height: ${height}px"></td>`;
+            return row;
+        },
+        
+        // Отрисовка видимого окна строк; строки, оставшиеся в окне, переиспользуются
+        render: function(force) {
+            const container = options.container;
+            const start = Math.max(0, Math.floor(container.scrollTop / this.rowHeight) - this.overscan);
+            const count = Math.ceil((container.clientHeight || 600) / this.rowHeight) + 2 * this.overscan;
+            const end = Math.min(this.items.length, start + count);
+            
+            if (force || start !== this.start || end !== this.end) {
+                this.start = start;
+                this.end = end;
+                
+                const rows = {};
+                const fragment = document.createDocumentFragment();
+                fragment.appendChild(this.spacer(start * this.rowHeight));
+                for (let i = start; i < end; i++) {
+                    const item = this.items[i];
+                    rows[item.id] = this.rows[item.id] || this.renderRow(item);
+                    fragment.appendChild(rows[item.id]);
+                }
+                fragment.appendChild(this.spacer((this.items.length - end) * this.rowHeight));
+                this.rows = rows;
+                options.tbody.replaceChildren(fragment);
+                
+                // Высота строки уточняется по первой отрисованной строке
+                const firstRow = this.rows[this.items[start]?.id];
+                const measured = firstRow ? firstRow.getBoundingClientRect().height : 0;
+                if (measured && Math.abs(measured - this.rowHeight) > 1) {
+                    this.rowHeight = measured;
+                    return this.render(true);
+                }
+                
+                if (options.onRender) options.onRender(this);
+            }
+            
+            // Подгрузка следующей страницы при приближении к концу списка
+            if (!this.done && this.end + this.overscan >= this.items.length) {
+                this.loadMore().catch(error => console.error('Ошибка при загрузке страницы:', error));
+            }
+        },
+        
+        // Создание строки с учётом скрытых колонок
+        renderRow: function(item) {
+            const row = options.renderRow(item);
+            row.dataset.id = item.id;
+            const visibility = tableUtils.columnVisibility[options.columnsKey] || {};
+            row.querySelectorAll('td').forEach((cell, index) => {
+                if (visibility[index] === false) cell.style.display = 'none';
+            });
+            return row;
+        },
+        
+        // Обновление одной записи на месте
+        patch: function(item) {
+            const position = this.positions[item.id];
+            if (position === undefined) return;
+            this.items[position] = item;
+            
+            const oldRow = this.rows[item.id];
+            if (oldRow) {
+                const row = this.renderRow(item);
+                oldRow.replaceWith(row);
+                this.rows[item.id] = row;
+            }
+        },
+        
+        // Удаление записей из списка
+        remove: function(ids) {
+            const removed = new Set(ids.map(Number));
+            this.items = this.items.filter(item => !removed.has(item.id));
+            this.positions = {};
+            this.items.forEach((item, index) => { this.positions[item.id] = index; });
+            this.total = Math.max(0, this.total - removed.size);
+            removed.forEach(id => delete this.rows[id]);
+            this.render(true);
+        }
+    };
+    
+    let scheduled = false;
+    options.container.addEventListener('scroll', () => {
+        if (scheduled) return;
+        scheduled = true;
+        requestAnimationFrame(() => {
+            scheduled = false;
+            table.render(false);
+        });
+    });
+    
+    return table;
+}
+
+// Размер страницы, запрашиваемой у сервера для таблиц админ-панели
+const ADMIN_PAGE_SIZE = 100;
+
+// Таблицы админ-панели создаются при первой загрузке
+const adminTables = {
+    users: null,
+    keys: null
+};
+
+// Выбранные ключи (сохраняются при прокрутке, когда строки удаляются из DOM)
+const selectedKeyIds = new Set();
+
+// Подпись с количеством загруженных записей
+function updateTableSummary(elementId, table) {
+    const element = document.getElementById(elementId);
+    if (element) {
+        element.textContent = table.total ? `Показано ${table.items.length} из ${table.total}` : '';
+    }
+}
+
+// Строка таблицы пользователей
+function renderUserRow(user) {
+    const row = document.createElement('tr');
+    row.innerHTML = `
+        <td>${user.id}</td>
+        <td>${user.username}</td>
+        <td>${user.email}</td>
+        <td>${utils.getUserRole(user)}</td>
+        <td>${user.discord_linked ? user.discord_username : 'Не привязан'}</td>
+        <td>${user.is_banned ? 'Заблокирован' : 'Активен'}</td>
+        <td>${user.last_login ? new Date(user.last_login).toLocaleString() : 'Никогда'}</td>
+        <td>${utils.formatIpAddress(user.last_ip)}</td>
+        <td><div class="action-buttons"></div></td>
+    `;
+    const actionsDiv = row.querySelector('.action-buttons');
+    
+    // Кнопка бан/разбан
+    if (userData && (userData.is_admin || userData.is_support)) {
+        if (user.is_banned) {
+            const unbanUserBtn = document.createElement('button');
+            unbanUserBtn.className = 'btn btn-success btn-sm ml-1';
+            unbanUserBtn.textContent = 'Разбл';
+            unbanUserBtn.title = 'Разблокировать пользователя';
+            unbanUserBtn.addEventListener('click', async () => {
+                try {
+                    const result = await api.unbanUser(user.id);
+                    adminTables.users.patch(result.user);
+                } catch (error) {
+                    alert(`Ошибка разблокировки пользователя: ${error.message}`);
+                }
+            });
+            actionsDiv.appendChild(unbanUserBtn);
+        } else {
+            const banUserBtn = document.createElement('button');
+            banUserBtn.className = 'btn btn-danger btn-sm ml-1';
+            banUserBtn.textContent = 'Блок';
+            banUserBtn.title = 'Заблокировать пользователя';
+            banUserBtn.addEventListener('click', async () => {
+                try {
+                    const result = await api.banUser(user.id);
+                    adminTables.users.patch(result.user);
+                } catch (error) {
+                    alert(`Ошибка блокировки пользователя: ${error.message}`);
+                }
+            });
+            actionsDiv.appendChild(banUserBtn);
+        }
+    }
+    
+    // Добавляем кнопку смены пароля для админов
+    if (userData && userData.is_admin) {
+        const changePasswordBtn = document.createElement('button');
+        changePasswordBtn.className = 'btn btn-info btn-sm ml-1';
+        changePasswordBtn.textContent = 'Пароль';
+        changePasswordBtn.title = 'Сменить пароль пользователя';
+        changePasswordBtn.addEventListener('click', (e) => {
+            e.stopPropagation();
+            showChangePasswordModal(user.id, user.username);
+        });
+        actionsDiv.appendChild(changePasswordBtn);
+    }
+    
+    if (user.discord_linked && userData && userData.is_admin) {
+        const unlinkBtn = document.createElement('button');
+        unlinkBtn.className = 'btn btn-warning btn-sm ml-1';
+        unlinkBtn.textContent = 'Отвязать Discord';
+        unlinkBtn.title = 'Отвязать Discord-аккаунт';
+        unlinkBtn.addEventListener('click', async (e) => {
+            e.stopPropagation();
+            if (confirm('Вы уверены, что хотите отвязать Discord у этого пользователя?')) {
+                unlinkBtn.disabled = true;
+                unlinkBtn.textContent = 'Отключение...';
+                try {
+                    const result = await api.unlinkDiscord(user.id);
+                    adminTables.users.patch(result.user);
+                } catch (error) {
+                    alert('Ошибка при отвязке Discord: ' + error.message);
+                    unlinkBtn.disabled = false;
+                    unlinkBtn.textContent = 'Отвязать Discord';
+                }
+            }
+        });
+        actionsDiv.appendChild(unlinkBtn);
+    }
+    if (userData && userData.is_admin) {
+        // Кнопки смены ролей
+        const makeAdminBtn = document.createElement('button');
+        makeAdminBtn.className = 'btn btn-primary btn-sm ml-1';
+        makeAdminBtn.textContent = 'A';
+        makeAdminBtn.title = 'Сделать администратором';
+        makeAdminBtn.addEventListener('click', async () => {
+            try {
+                const result = await api.setUserRole(user.id, 'admin');
+                adminTables.users.patch(result.user);
+            } catch (error) {
+                alert(`Ошибка при назначении администратора: ${error.message}`);
+            }
+        });
+        actionsDiv.appendChild(makeAdminBtn);
+
+        const makeSupportBtn = document.createElement('button');
+        makeSupportBtn.className = 'btn btn-info btn-sm ml-1';
+        makeSupportBtn.textContent = 'C';
+        makeSupportBtn.title = 'Сделать саппортом';
+        makeSupportBtn.addEventListener('click', async () => {
+            try {
+                const result = await api.setUserRole(user.id, 'support');
+                adminTables.users.patch(result.user);
+            } catch (error) {
+                alert(`Ошибка при назначении саппорта: ${error.message}`);
+            }
+        });
+        actionsDiv.appendChild(makeSupportBtn);
+
+        const makeUserBtn = document.createElement('button');
+        makeUserBtn.className = 'btn btn-secondary btn-sm ml-1';
+        makeUserBtn.textContent = 'Ю';
+        makeUserBtn.title = 'Сделать обычным пользователем';
+        makeUserBtn.addEventListener('click', async () => {
+            try {
+                const result = await api.setUserRole(user.id, 'user');
+                adminTables.users.patch(result.user);
+            } catch (error) {
+                alert(`Ошибка при сбросе роли: ${error.message}`);
+            }
+        });
+        actionsDiv.appendChild(makeUserBtn);
+        
+        // Кнопка удаления пользователя
+        const deleteUserBtn = document.createElement('button');
+        deleteUserBtn.className = 'btn btn-danger btn-sm ml-1';
+        deleteUserBtn.textContent = 'X';
+        deleteUserBtn.title = 'Удалить пользователя';
+        deleteUserBtn.addEventListener('click', async (e) => {
+            e.stopPropagation();
+            if (confirm(`Вы уверены, что хотите удалить пользователя ${user.username}?`)) {
+                try {
+                    // Добавим API-метод для удаления пользователя если он будет создан
+                    alert('Функция удаления пользователя пока не реализована');
+                    // await api.deleteUser(user.id);
+                    // dataCache.clearCache('users');
+                    // loadAdminData();
+                } catch (error) {
+                    alert(`Ошибка при удалении пользователя: ${error.message}`);
+                }
+            }
+        });
+        actionsDiv.appendChild(deleteUserBtn);
+    }
+    row.addEventListener('click', function(e) {
+        if (e.target.tagName === 'BUTTON' || e.target.closest('.action-buttons')) return;
+        document.querySelectorAll('#users-table tbody tr').forEach(r => r.classList.remove('active-row'));
+        row.classList.toggle('active-row');
+    });
+    return row;
+}
+
+// Загрузка админ-данных
+async function loadAdminData() {
+    // Загрузка списка пользователей
+    document.getElementById('users-loading').style.display = 'block';
+    document.getElementById('users-list').style.display = 'none';
+    
+    try {
+        if (!adminTables.users) {
+            adminTables.users = createVirtualTable({
+                container: document.querySelector('#users-list .table-responsive'),
+                tbody: document.getElementById('users-table-body'),
+                columns: 9,
+                columnsKey: 'users',
+                renderRow: renderUserRow,
+                search: () => document.getElementById('users-search')?.value || '',
+                fetchPage: async (cursor, search) => {
+                    const data = await api.getUsers({
+                        limit: ADMIN_PAGE_SIZE,
+                        cursor: cursor,
+                        search: search
+                    });
+                    return { items: data.users, next_cursor: data.next_cursor, total: data.total, sync_cursor: data.sync_cursor };
+                },
+                fetchChanges: (since) => api.getChanges('users', since),
+                onRender: (table) => updateTableSummary('users-pagination', table)
+            });
+        }
+        
+        // Список должен быть видим до отрисовки, чтобы измерить высоту строк
+        document.getElementById('users-list').style.display = 'block';
+        await adminTables.users.sync();
+        document.getElementById('users-loading').style.display = 'none';
+        
+        // Загрузка приглашений в админке
+        loadAdminInvites();
+        
+        // Загрузка всех ключей
+        loadAllKeys();
+    } catch (error) {
+        console.error('Ошибка при загрузке списка пользователей:', error);
+        document.getElementById('users-loading').style.display = 'none';
+    }
+}
+
+
+// Функция для загрузки приглашений в админке
+async function loadAdminInvites() {    
+    const adminInvitesList = document.getElementById('admin-invites-list');
+    const adminInvitesLoading = document.getElementById('admin-invites-loading');
+    try {
+        window.appLogger.logInfo("Начинаем загрузку приглашений в админке");
+        let invitesData = { invites: [] };
+        let limitsData = { global_limits: { admin: 0, support: 0, user: 0 } };
+        
+        // Лимиты запрашиваются заново, приглашения - только изменения после прошлой загрузки
+        dataCache.clearCache('inviteLimits');
+        
+        window.appLogger.logInfo("Запрашиваем новые данные для приглашений");
+        console.log("ОТЛАДКА: Запрашиваем данные приглашений из API");
+        
+        // Запрашиваем данные по очереди для более точной обработки ошибок
+        try {
+            limitsData = await api.getInviteLimits();
+            window.appLogger.logInfo("Получены данные лимитов", limitsData);
+        } catch (limitsError) {
+            window.appLogger.logError("Ошибка при загрузке лимитов", limitsError);
+            utils.showNotification('warning', 'Не удалось загрузить информацию о лимитах');
+        }
+        
+        try {
+            if (await dataCache.syncCache('invites', 'invites')) {
+                invitesData = { invites: dataCache.invites, sync_cursor: dataCache.syncCursors.invites };
+            } else {
+                invitesData = await api.getInvites();
+            }
+            window.appLogger.logInfo("Получены данные приглашений", invitesData);
+            console.log("ОТЛАДКА: Полученный ответ API приглашений:", JSON.stringify(invitesData, null, 2));
+            console.log("ОТЛАДКА: Тип данных invites:", Array.isArray(invitesData.invites) ? "Массив" : typeof invitesData.invites);
+            console.log("ОТЛАДКА: Количество записей:", invitesData.invites ? invitesData.invites.length : 0);
+            if (invitesData.invites && invitesData.invites.length > 0) {
+                console.log("ОТЛАДКА: Структура первого приглашения:", JSON.stringify(invitesData.invites[0], null, 2));
+            }
+        } catch (invitesError) {
+            window.appLogger.logError("Ошибка при загрузке приглашений", invitesError);
+            console.error("ОТЛАДКА: Ошибка при загрузке приглашений:", invitesError);
+            utils.showNotification('warning', 'Не удалось загрузить список приглашений');
+        }
+        
+        window.appLogger.logInfo("Проверка данных приглашений и лимитов");
+        
+        // Проверяем, что данные лимитов получены в правильном формате
+        if (!limitsData || !limitsData.global_limits) {
+            window.appLogger.logError("Неверный формат данных лимитов:", limitsData);
+            // Создаем безопасную структуру данных по умолчанию
+            limitsData = { 
+                global_limits: { admin: 0, support: 0, user: 0 },
+                monthly_limit: 0,
+                used_invites: 0,
+                remaining_invites: 0
+            };
+        }
+        
+        // Проверяем, что данные приглашений получены в правильном формате
+        if (!invitesData || !invitesData.invites) {
+            window.appLogger.logError("Неверный формат данных приглашений:", invitesData);
+            invitesData = { invites: [] };
+            if (adminInvitesList) {
+                adminInvitesList.innerHTML = '<div class="alert alert-warning">Не удалось загрузить список приглашений. <button id="reload-admin-invites" class="btn btn-sm btn-primary ml-2">Попробовать снова</button></div>';
+                adminInvitesLoading.style.display = 'none';
+                adminInvitesList.style.display = 'block';
+                
+                // Добавляем обработчик для кнопки "Попробовать снова"
+                document.getElementById('reload-admin-invites')?.addEventListener('click', function() {
+                    // Очищаем кэш и запускаем повторную загрузку
+                    dataCache.clearCache('invites');
+                    loadAdminInvites();
+                    utils.showNotification('info', 'Обновление списка приглашений...');
+                });
+            }
+        } else if (!Array.isArray(invitesData.invites)) {
+            window.appLogger.logError("Неверный формат массива приглашений:", invitesData);
+            invitesData.invites = [];
+        }
+        
+        dataCache.updateCache('invites', invitesData.invites, invitesData.sync_cursor);
+        dataCache.updateCache('inviteLimits', limitsData);
+        
+        const invites = invitesData.invites;
+        window.appLogger.logInfo(`Количество загруженных приглашений: ${invites ? invites.length : 0}`);
+        
+        // Копируем значения лимитов в форму в админской вкладке ПриглОчки
+        const adminLimitValueAdmin = document.getElementById('admin-limit-value-admin');
+        const supportLimitValueAdmin = document.getElementById('support-limit-value-admin');
+        const userLimitValueAdmin = document.getElementById('user-limit-value-admin');
+        
+        if (adminLimitValueAdmin) adminLimitValueAdmin.value = limitsData.global_limits.admin;
+        if (supportLimitValueAdmin) supportLimitValueAdmin.value = limitsData.global_limits.support;
+        if (userLimitValueAdmin) userLimitValueAdmin.value = limitsData.global_limits.user;
+        
+        // Отображение приглашений
+        console.log("ОТЛАДКА: Перед отображением приглашений. Массив invites:", invites);
+        
+        if (!invites || invites.length === 0) {
+            window.appLogger.logInfo("Список приглашений пуст");
+            console.log("ОТЛАДКА: Приглашения отсутствуют или их длина равна 0");
+            
+            if (adminInvitesList) {
+                adminInvitesList.innerHTML = '<div class="alert alert-info">Нет приглашений для отображения. <button id="admin-create-invite" class="btn btn-primary btn-sm ml-2">Создать приглашение</button></div>';
+                adminInvitesList.style.display = 'block';
+                
+                // Добавляем обработчик для создания приглашения
+                document.getElementById('admin-create-invite')?.addEventListener('click', function() {
+                    generateInvite();
+                });
+            }
+            
+            // Отображаем пустую таблицу
+            if (adminInvitesLoading) adminInvitesLoading.style.display = 'none';
+            const tableBody = document.getElementById('admin-invites-table-body');
+            if (tableBody) tableBody.innerHTML = '<tr><td colspan="8" class="text-center">Нет приглашений для отображения</td></tr>';
+        } else {
+            console.log("ОТЛАДКА: Найдены приглашения, количество: " + invites.length);
+            // Фильтрация по поисковому запросу
+            const searchQuery = document.getElementById('admin-invites-search')?.value?.toLowerCase() || '';
+            let filteredInvites = invites;
+            
+            if (searchQuery) {
+                filteredInvites = invites.filter(invite => 
+                    invite.code.toLowerCase().includes(searchQuery) || 
+                    (invite.created_by && invite.created_by.username && invite.created_by.username.toLowerCase().includes(searchQuery)) ||
+                    (invite.used_by && invite.used_by.toLowerCase().includes(searchQuery))
+                );
+            }
+            
+            window.appLogger.logInfo("Отфильтрованные приглашения:", { total: filteredInvites.length });
+            
+            // Получаем данные только для текущей страницы
+            const pageInvites = pagination.getPageData('admin-invites', filteredInvites);
+            window.appLogger.logInfo("Приглашения для текущей страницы:", { count: pageInvites.length });
+            
+            const tableBody = document.getElementById('admin-invites-table-body');
+            
+            if (tableBody) {
+                tableBody.innerHTML = '';
+                
+                pageInvites.forEach(invite => {
+                    window.appLogger.logInfo("Добавление приглашения в таблицу", { id: invite.id, code: invite.code });
+                    const row = document.createElement('tr');
+                    const status = invite.used ? 'Использован' : 'Активен';
+                    
+                    // Добавляем чекбокс для выбора
+                    const checkboxCell = document.createElement('td');
+                    const checkbox = document.createElement('input');
+                    checkbox.type = 'checkbox';
+                    checkbox.className = 'admin-invite-checkbox';
+                    checkbox.dataset.inviteId = invite.id;
+                    checkbox.disabled = invite.used; // Нельзя выбрать использованные инвайты
+                    checkboxCell.appendChild(checkbox);
+                    row.appendChild(checkboxCell);
+                    
+                    // Создаем ячейки данных
+                    const codeCell = document.createElement('td');
+                    codeCell.textContent = invite.code;
+                    row.appendChild(codeCell);
+                    
+                    const createdCell = document.createElement('td');
+                    createdCell.textContent = utils.formatDate(invite.created_at);
+                    row.appendChild(createdCell);
+                    
+                    const expiresCell = document.createElement('td');
+                    expiresCell.textContent = utils.formatDate(invite.expires_at);
+                    row.appendChild(expiresCell);
+                    
+                    const statusCell = document.createElement('td');
+                    statusCell.textContent = status;
+                    row.appendChild(statusCell);
+                    
+                    const creatorCell = document.createElement('td');
+                    // Проверяем формат поля created_by (может быть объектом или строкой)
+                    if (invite.created_by && typeof invite.created_by === 'object' && invite.created_by.username) {
+                        creatorCell.textContent = invite.created_by.username;
+                    } else if (invite.created_by && typeof invite.created_by === 'string') {
+                        creatorCell.textContent = invite.created_by;
+                    } else {
+                        creatorCell.textContent = 'Неизвестно';
+                    }
+                    row.appendChild(creatorCell);
+                    
+                    const usedByCell = document.createElement('td');
+                    usedByCell.textContent = invite.used_by ? invite.used_by : 'Не использован';
+                    row.appendChild(usedByCell);
+                    
+                    // Добавляем ячейку действий
+                    const actionsCell = document.createElement('td');
+                    const actionsDiv = document.createElement('div');
+                    actionsDiv.className = 'action-buttons';
+                    actionsCell.appendChild(actionsDiv);
+                    
+                    // Добавляем кнопку удаления
+                    if (!invite.used) {
+                        const deleteBtn = document.createElement('button');
+                        deleteBtn.className = 'btn btn-danger btn-sm';
+                        deleteBtn.innerHTML = '<i class="fas fa-trash"></i>';
+                        deleteBtn.title = 'Удалить приглашение';
+                        deleteBtn.addEventListener('click', async (e) => {
+                            e.stopPropagation();
+                            if (confirm('Вы уверены, что хотите удалить это приглашение?')) {
+                                try {
+                                    await api.deleteInvite(invite.id);
+                                    loadAdminInvites();
+                } catch (error) {
+                                    alert(`Ошибка при удалении приглашения: ${error.message}`);
+                                }
+                            }
+                        });
+                        actionsDiv.appendChild(deleteBtn);
+                    }
+                    
+                    row.appendChild(actionsCell);
+                    tableBody.appendChild(row);
+                });
+            }
+            
+            // Добавляем пагинацию
+            const paginationContainer = document.getElementById('admin-invites-pagination');
+            if (paginationContainer) {
+                paginationContainer.innerHTML = pagination.generatePaginationHTML('admin-invites', filteredInvites.length);
+                
+                // Добавляем обработчики для кнопок пагинации
+                document.querySelectorAll('.pagination-link[data-type="admin-invites"]').forEach(link => {
+                    link.addEventListener('click', function(e) {
+                        e.preventDefault();
+                        const type = this.getAttribute('data-type');
+                        const page = parseInt(this.getAttribute('data-page'));
+                        pagination.goToPage(type, page);
+                        loadAdminInvites(); // Перезагружаем с новой страницей
+                    });
+                });
+            }
+        }
+    } catch (error) {
+        window.appLogger.logError('Ошибка при загрузке приглашений в админке:', error);
+        if (adminInvitesList) {
+            adminInvitesList.innerHTML = `
+                <div class="alert alert-danger">
+                    <h5>Ошибка при загрузке приглашений</h5>
+                    <p>${error.message}</p>
+                    <button id="retry-admin-invites-btn" class="btn btn-primary btn-sm">Попробовать снова</button>
+                </div>`;
+            adminInvitesList.style.display = 'block';
+            
+            // Добавляем обработчик для кнопки повторной загрузки
+            document.getElementById('retry-admin-invites-btn')?.addEventListener('click', function() {
+                dataCache.clearCache('invites');
+                loadAdminInvites();
+            });
+        }
+        
+        utils.showNotification('danger', `Ошибка при загрузке приглашений: ${error.message}`);
+    } finally {
+        if (adminInvitesLoading) adminInvitesLoading.style.display = 'none';
+    }
+}
+
+// Добавляем функции для управления ролями пользователей
+function updateUsersList() {
+    loadAdminData();
+}
+
+function addRoleManagementButtons() {
+    document.querySelectorAll('.user-role-buttons').forEach(container => {
+        const userId = container.getAttribute('data-user-id');
+        
+        // Очищаем контейнер сначала
+        container.innerHTML = '';
+        
+        // Добавляем кнопки управления ролями
+        const makeAdminBtn = document.createElement('button');
+        makeAdminBtn.className = 'btn btn-primary btn-sm ml-1';
+        makeAdminBtn.style.padding = '0.2rem 0.4rem';
+        makeAdminBtn.style.fontSize = '0.75rem';
+        makeAdminBtn.textContent = 'A';
+        makeAdminBtn.title = 'Сделать администратором';
+        makeAdminBtn.addEventListener('click', async () => {
+            try {
+                await api.setUserRole(userId, 'admin');
+                updateUsersList();
+            } catch (error) {
+                alert(`Ошибка при назначении администратора: ${error.message}`);
+            }
+        });
+        
+        const makeSupportBtn = document.createElement('button');
+        makeSupportBtn.className = 'btn btn-info btn-sm ml-1';
+        makeSupportBtn.style.padding = '0.2rem 0.4rem';
+        makeSupportBtn.style.fontSize = '0.75rem';
+        makeSupportBtn.textContent = 'С';
+        makeSupportBtn.title = 'Сделать саппортом';
+        makeSupportBtn.addEventListener('click', async () => {
+            try {
+                await api.setUserRole(userId, 'support');
+                updateUsersList();
+            } catch (error) {
+                alert(`Ошибка при назначении саппорта: ${error.message}`);
+            }
+        });
+        
+        const makeUserBtn = document.createElement('button');
+        makeUserBtn.className = 'btn btn-secondary btn-sm ml-1';
+        makeUserBtn.style.padding = '0.2rem 0.4rem';
+        makeUserBtn.style.fontSize = '0.75rem';
+        makeUserBtn.textContent = 'Ю';
+        makeUserBtn.title = 'Сделать обычным пользователем';
+        makeUserBtn.addEventListener('click', async () => {
+            try {
+                await api.setUserRole(userId, 'user');
+                updateUsersList();
+            } catch (error) {
+                alert(`Ошибка при сбросе роли: ${error.message}`);
+            }
+        });
+        
+        container.appendChild(makeAdminBtn);
+        container.appendChild(makeSupportBtn);
+        container.appendChild(makeUserBtn);
+    });
+}
+
+// Строка таблицы всех ключей
+function renderKeyRow(key) {
+    const row = document.createElement('tr');
+    const status = key.is_active ? (key.time_left > 0 ? 'Активен' : 'Истёк') : 'Отозван';
+    
+    row.innerHTML = `
+        <td><input type="checkbox" class="key-checkbox" data-id="${key.id}" ${selectedKeyIds.has(key.id) ? 'checked' : ''}></td>
+        <td>${key.id}</td>
+        <td>${key.key}</td>
+        <td>${utils.formatDate(key.created_at)}</td>
+        <td>${utils.formatDate(key.expires_at)}</td>
+        <td>${utils.formatTimeLeft(key.time_left)}</td>
+        <td>${key.user ? key.user.username : 'Не привязан'}</td>
+        <td>${status}</td>
+        <td>
+            ${key.is_active ? 
+                `<button class="btn btn-danger btn-sm revoke-key-btn" data-id="${key.id}">Отозвать</button>` : 
+                `<button class="btn btn-success btn-sm restore-key-btn" data-id="${key.id}">Восстановить</button>`
+            }
+        </td>
+    `;
+    return row;
+}
+
+// Отзыв или восстановление одного ключа с обновлением строки на месте
+async function toggleKey(button, action) {
+    const keyId = button.getAttribute('data-id');
+    const revoke = action === 'revoke';
+    if (!confirm(revoke ? 'Вы уверены, что хотите отозвать этот ключ?' : 'Вы уверены, что хотите восстановить этот ключ?')) {
+        return;
+    }
+    
+    try {
+        button.disabled = true;
+        button.textContent = revoke ? 'Отзыв...' : 'Восстановление...';
+        
+        const result = revoke ? await api.revokeKey(keyId) : await api.restoreKey(keyId);
+        adminTables.keys.patch(result.key);
+    } catch (error) {
+        alert(`Ошибка при ${revoke ? 'отзыве' : 'восстановлении'} ключа: ${error.message}`);
+        button.disabled = false;
+        button.textContent = revoke ? 'Отозвать' : 'Восстановить';
+    }
+}
+
+// Массовое действие над выбранными ключами
+async function bulkKeyAction(action) {
+    const keyIds = getSelectedKeyIds();
+    if (keyIds.length === 0) {
+        alert('Не выбрано ни одного ключа');
+        return;
+    }
+    
+    const actionText = { revoke: 'отозвать', restore: 'восстановить', delete: 'удалить' };
+    if (!confirm(`Вы уверены, что хотите ${actionText[action]} выбранные ключи (${keyIds.length})?`)) {
+        return;
+    }
+    
+    try {
+        const result = await api.bulkKeyAction(keyIds, action);
+        if (action === 'delete') {
+            adminTables.keys.remove(keyIds);
+        } else {
+            result.keys.forEach(key => adminTables.keys.patch(key));
+        }
+        selectedKeyIds.clear();
+        document.querySelectorAll('.key-checkbox:checked').forEach(checkbox => { checkbox.checked = false; });
+        const selectAllCheckbox = document.getElementById('select-all-keys');
+        if (selectAllCheckbox) selectAllCheckbox.checked = false;
+        notifications.show(result.message, 'success');
+    } catch (error) {
+        alert(`Ошибка при выполнении массового действия: ${error.message}`);
+    }
+}
+
+// Загрузка всех ключей
+async function loadAllKeys() {
+    const allKeysLoading = document.getElementById('all-keys-loading');
+    const allKeysList = document.getElementById('all-keys-list');
+    
+    if (allKeysLoading) allKeysLoading.style.display = 'block';
+    
+    try {
+        if (!adminTables.keys) {
+            const tableBody = document.getElementById('all-keys-table-body');
+            if (!tableBody) {
+                console.error("Не найден элемент таблицы all-keys-table-body");
+                throw new Error("Элемент таблицы не найден");
+            }
+            
+            adminTables.keys = createVirtualTable({
+                container: document.querySelector('#all-keys-list .table-responsive'),
+                tbody: tableBody,
+                columns: 9,
+                columnsKey: 'all-keys',
+                renderRow: renderKeyRow,
+                search: () => document.getElementById('all-keys-search')?.value || '',
+                fetchPage: async (cursor, search) => {
+                    const data = await api.getAllKeys({
+                        limit: ADMIN_PAGE_SIZE,
+                        cursor: cursor,
+                        search: search
+                    });
+                    return { items: data.keys, next_cursor: data.next_cursor, total: data.total, sync_cursor: data.sync_cursor };
+                },
+                fetchChanges: (since) => api.getChanges('keys', since),
+                // Выбор сбрасывается только при перезагрузке списка
+                onReset: () => {
+                    selectedKeyIds.clear();
+                    const selectAllCheckbox = document.getElementById('select-all-keys');
+                    if (selectAllCheckbox) selectAllCheckbox.checked = false;
+                },
+                onRender: (table) => updateTableSummary('all-keys-pagination', table)
+            });
+            
+            // Обработчики кнопок и чекбоксов назначаются один раз на всю таблицу
+            tableBody.addEventListener('click', (e) => {
+                const revokeButton = e.target.closest('.revoke-key-btn');
+                const restoreButton = e.target.closest('.restore-key-btn');
+                if (revokeButton) toggleKey(revokeButton, 'revoke');
+                if (restoreButton) toggleKey(restoreButton, 'restore');
+            });
+            tableBody.addEventListener('change', (e) => {
+                if (!e.target.classList.contains('key-checkbox')) return;
+                const keyId = parseInt(e.target.getAttribute('data-id'));
+                if (e.target.checked) {
+                    selectedKeyIds.add(keyId);
+                } else {
+                    selectedKeyIds.delete(keyId);
+                }
+            });
+            
+            // Выбор всех загруженных ключей
+            document.getElementById('select-all-keys')?.addEventListener('change', (e) => {
+                adminTables.keys.items.forEach(key => {
+                    if (e.target.checked) {
+                        selectedKeyIds.add(key.id);
+                    } else {
+                        selectedKeyIds.delete(key.id);
+                    }
+                });
+                document.querySelectorAll('.key-checkbox').forEach(checkbox => {
+                    checkbox.checked = e.target.checked;
+                });
+            });
+            
+            document.getElementById('revoke-selected-keys-button')?.addEventListener('click', () => bulkKeyAction('revoke'));
+            document.getElementById('restore-selected-keys-button')?.addEventListener('click', () => bulkKeyAction('restore'));
+            document.getElementById('delete-selected-keys-button')?.addEventListener('click', () => bulkKeyAction('delete'));
+        }
+        
+        // Список должен быть видим до отрисовки, чтобы измерить высоту строк
+        if (allKeysList) allKeysList.style.display = 'block';
+        await adminTables.keys.sync();
+    } catch (error) {
+        console.error('Ошибка при загрузке ключей:', error);
+        notifications.show(`Ошибка при загрузке ключей: ${error.message}`, 'error');
+    } finally {
+        if (allKeysLoading) allKeysLoading.style.display = 'none';
+    }
+}
+
+// Вспомогательная функция для получения ID выбранных ключей
+function getSelectedKeyIds() {
+    return Array.from(selectedKeyIds);
+}
+
+// Добавляем обработчики для системы логов
+function setupLogHandlers() {
+    // Очистка логов
+    document.getElementById('clear-logs-btn')?.addEventListener('click', () => {
+        if (confirm('Вы уверены, что хотите очистить все логи?')) {
+            window.appLogger.clearLogs();
+        }
+    });
+    
+    // Переключение автоскролла
+    const autoScrollBtn = document.getElementById('toggle-auto-scroll-logs');
+    let autoScroll = true;
+    
+    autoScrollBtn?.addEventListener('click', () => {
+        autoScroll = !autoScroll;
+        autoScrollBtn.innerHTML = autoScroll ? 
+            '<i class="fas fa-scroll"></i> Авто-прокрутка: ВКЛ' : 
+            '<i class="fas fa-scroll"></i> Авто-прокрутка: ВЫКЛ';
+        
+        if (autoScroll) {
+            const logContainer = document.getElementById('admin-log-container');
+            if (logContainer) {
+                logContainer.scrollTop = 0; // Скролл в начало, так как логи отображаются в обратном порядке
+            }
+        }
+    });
+    
+    // Фильтрация логов
+    document.getElementById('filter-all-logs')?.addEventListener('click', function() {
+        filterLogs('all');
+        setActiveFilterButton(this);
+    });
+    
+    document.getElementById('filter-info-logs')?.addEventListener('click', function() {
+        filterLogs('info');
+        setActiveFilterButton(this);
+    });
+    
+    document.getElementById('filter-warning-logs')?.addEventListener('click', function() {
+        filterLogs('warning');
+        setActiveFilterButton(this);
+    });
+    
+    document.getElementById('filter-error-logs')?.addEventListener('click', function() {
+        filterLogs('danger');
+        setActiveFilterButton(this);
+    });
+    
+    // Поиск в логах
+    document.getElementById('log-search')?.addEventListener('input', debounce(function() {
+        filterLogs(currentLogFilter, this.value);
+    }, 300));
+    
+    // Обработчик загрузки логов при открытии вкладки
+    document.getElementById('logs-tab')?.addEventListener('click', () => {
+        window.appLogger.updateLogDisplay();
+    });
+}
+
+// Глобальная переменная для текущего фильтра логов
+let currentLogFilter = 'all';
+
+// Функция для установки активной кнопки фильтра
+function setActiveFilterButton(buttonElement) {
+    document.querySelectorAll('.btn-group button').forEach(btn => {
+        btn.classList.remove('active');
+    });
+    buttonElement.classList.add('active');
+}
+
+// Функция для фильтрации логов
+function filterLogs(type = 'all', searchText = '') {
+    currentLogFilter = type;
+    
+    const logEntries = document.querySelectorAll('.log-entry');
+    const searchLower = searchText.toLowerCase();
+    
+    logEntries.forEach(entry => {
+        let showByType = type === 'all' || entry.classList.contains(`alert-${type}`);
+        let showBySearch = !searchText || entry.textContent.toLowerCase().includes(searchLower);
+        
+        entry.style.display = showByType && showBySearch ? 'block' : 'none';
+    });
+}
+
+// Добавим функцию showChangePasswordModal
+function showChangePasswordModal(userId, username) {
+    // Удаляем старое модальное окно если есть
+    document.getElementById('admin-change-password-modal')?.remove();
+    const modal = document.createElement('div');
+    modal.id = 'admin-change-password-modal';
+    modal.innerHTML = `
+    <div class="modal fade show" tabindex="-1" style="display:block; background:rgba(0,0,0,0.5);">
+      <div class="modal-dialog">
+        <div class="modal-content">
+          <div class="modal-header">
+            <h5 class="modal-title">Смена пароля для пользователя: ${username}</h5>
+            <button type="button" class="close" id="close-admin-change-password-modal">&times;</button>
+          </div>
+          <div class="modal-body">
+            <input type="password" class="form-control mb-2" id="admin-new-password" placeholder="Новый пароль">
+            <input type="password" class="form-control mb-2" id="admin-confirm-password" placeholder="Подтвердите пароль">
+            <div class="alert alert-danger" id="admin-change-password-error" style="display:none"></div>
+          </div>
+          <div class="modal-footer">
+            <button class="btn btn-secondary" id="close-admin-change-password-modal2">Отмена</button>
+            <button class="btn btn-primary" id="admin-change-password-submit">Сменить</button>
+          </div>
+        </div>
+      </div>
+    </div>`;
+    document.body.appendChild(modal);
+    // Закрытие
+    const closeModal = () => modal.remove();
+    document.getElementById('close-admin-change-password-modal').onclick = closeModal;
+    document.getElementById('close-admin-change-password-modal2').onclick = closeModal;
+    // Сабмит
+    document.getElementById('admin-change-password-submit').onclick = async () => {
+        const newPassword = document.getElementById('admin-new-password').value;
+        const confirmPassword = document.getElementById('admin-confirm-password').value;
+        const errorDiv = document.getElementById('admin-change-password-error');
+        errorDiv.style.display = 'none';
+        if (newPassword !== confirmPassword) {
+            errorDiv.textContent = 'Пароли не совпадают';
+            errorDiv.style.display = 'block';
+            return;
+        }
+        if (newPassword.length < 8) {
+            errorDiv.textContent = 'Пароль слишком короткий';
+            errorDiv.style.display = 'block';
+            return;
+        }
+        try {
+            await api.adminChangeUserPassword(userId, newPassword);
+            notifications.show('Пароль успешно изменён', 'success');
+            closeModal();
+        } catch (e) {
+            errorDiv.textContent = e.message;
+            errorDiv.style.display = 'block';
+        }
+    };
+}
+
+// Интервал автообновления вкладки загрузок
+let downloadsRefreshTimer = null;
+
+// Загрузка состояния планировщика загрузок модов
+async function loadDownloads() {
+    // Обновление останавливается, когда вкладка скрыта
+    if (!document.getElementById('downloads')?.classList.contains('active')) {
+        clearInterval(downloadsRefreshTimer);
+        downloadsRefreshTimer = null;
+        return;
+    }
+    
+    try {
+        const data = await api.getDownloads();
+        
+        document.getElementById('downloads-summary').textContent =
+            `Активно: ${data.active.length} / ${data.limits.max_active}, в очереди: ${data.queue_depth}, режим: ${data.transfer_mode}`;
+        
+        document.getElementById('downloads-table-body').innerHTML = data.active.length ? data.active.map(transfer => `
+            <tr>
+                <td>${transfer.username}</td>
+                <td>${transfer.mod_name}</td>
+                <td>${utils.formatBytes(transfer.sent)} / ${utils.formatBytes(transfer.size)}</td>
+                <td>${utils.formatBytes(transfer.rate)}/с</td>
+                <td>${new Date(transfer.started_at * 1000).toLocaleTimeString('ru-RU')}</td>
+            </tr>
+        `).join('') : '<tr><td colspan="5" class="text-center">Нет активных загрузок</td></tr>';
+        
+        document.getElementById('downloads-queue-table-body').innerHTML = data.queue.length ? data.queue.map((entry, index) => `
+            <tr>
+                <td>${index + 1}</td>
+                <td>${entry.username}</td>
+                <td>${entry.mod_name}</td>
+                <td>${new Date(entry.queued_at * 1000).toLocaleTimeString('ru-RU')}</td>
+            </tr>
+        `).join('') : '<tr><td colspan="4" class="text-center">Очередь пуста</td></tr>';
+    } catch (error) {
+        console.error('Ошибка при загрузке данных о загрузках:', error);
+        clearInterval(downloadsRefreshTimer);
+        downloadsRefreshTimer = null;
+    }
+}
+
+// Настройка обработчиков админ-панели
+function setupAdminEventHandlers() {
+    // Обработчики для админ-панели (если они требуются)
+    document.querySelector('#all-keys-tab')?.addEventListener('click', loadAllKeys);
+    document.querySelector('#users-tab')?.addEventListener('click', () => {
+        updateUsersList();
+    });
+    document.querySelector('#invites-admin-tab')?.addEventListener('click', loadAdminInvites);
+    document.querySelector('#downloads-tab')?.addEventListener('click', () => {
+        // Вкладка становится активной после обработки клика
+        setTimeout(loadDownloads, 0);
+        if (!downloadsRefreshTimer) {
+            downloadsRefreshTimer = setInterval(loadDownloads, 3000);
+        }
+    });
+}
@@ -145,6 +145,51 @@ window.appLogger = {
     }
 };
 
+// Загрузка ресурсов по требованию
+const assets = {
+    // Путь с хешем содержимого из карты сборки (см. static_assets.py) или исходный путь
+    url: (path) => (window.ASSET_MAP && window.ASSET_MAP[path]) || path,
+    
+    // Загруженные и загружаемые скрипты
+    scripts: {},
+    
+    // Подключение скрипта; повторный вызов возвращает тот же промис
+    loadScript: function(path) {
+        if (!this.scripts[path]) {
+            this.scripts[path] = new Promise((resolve, reject) => {
+                const script = document.createElement('script');
+                script.src = this.url(path);
+                script.onload = resolve;
+                script.onerror = () => {
+                    delete this.scripts[path];
+                    reject(new Error(`Не удалось загрузить ${path}`));
+                };
+                document.body.appendChild(script);
+            });
+        }
+        return this.scripts[path];
+    }
+};
+
+// Модули админ-панели (js/admin.js) загружаются при первом открытии админ-панели
+const adminModule = {
+    loaded: null,
+    
+    load: function() {
+        if (!this.loaded) {
+            this.loaded = assets.loadScript('js/admin.js').then(() => {
+                // Настройка обработчиков для логов и админ-панели
+                setupLogHandlers();
+                setupAdminEventHandlers();
+            }).catch(error => {
+                this.loaded = null;
+                throw error;
+            });
+        }
+        return this.loaded;
+    }
+};
+
 // Кэш для хранения данных
 const dataCache = {
     users: null,
@@ -158,6 +203,8 @@ const dataCache = {
         allKeys: 0,
         invites: 0
     },
+    // Курсоры синхронизации: с какого момента запрашивать изменения вместо полного списка
+    syncCursors: {},
     cacheLifetime: 60000, // 60 секунд
 
     // Проверяет актуальность кэша
@@ -165,10 +212,43 @@ const dataCache = {
         return this[type] && (Date.now() - this.lastFetch[type] < this.cacheLifetime);
     },
 
-    // Обновляет кэш
-    updateCache: function(type, data) {
+    // Обновляет кэш (cursor - sync_cursor из ответа сервера, если список поддерживает синхронизацию)
+    updateCache: function(type, data, cursor = null) {
         this[type] = data;
         this.lastFetch[type] = Date.now();
+        this.syncCursors[type] = cursor;
+    },
+
+    // Применяет изменения с сервера к закэшированному списку записей с id.
+    // Новые записи добавляются в начало, как в выдаче сервера (от новых к старым)
+    mergeChanges: function(type, changes) {
+        const deleted = new Set(changes.deleted);
+        const changed = {};
+        changes.changed.forEach(item => { changed[item.id] = item; });
+        
+        const merged = [];
+        (this[type] || []).forEach(item => {
+            if (deleted.has(item.id) && !changed[item.id]) return;
+            if (changed[item.id]) {
+                merged.push(changed[item.id]);
+                delete changed[item.id];
+            } else {
+                merged.push(item);
+            }
+        });
+        const created = Object.values(changed).sort((a, b) => b.id - a.id);
+        
+        this.updateCache(type, created.concat(merged), changes.cursor);
+        return this[type];
+    },
+
+    // Обновляет закэшированный список запросом изменений; false - нужна полная загрузка
+    syncCache: async function(type, table) {
+        if (!this[type] || !this.syncCursors[type]) return false;
+        const changes = await api.getChanges(table, this.syncCursors[type]);
+        if (changes.reset) return false;
+        this.mergeChanges(type, changes);
+        return true;
     },
 
     // Очищает кэш
@@ -176,7 +256,9 @@ const dataCache = {
         if (type) {
             this[type] = null;
             this.lastFetch[type] = 0;
+            this.syncCursors[type] = null;
         } else {
+            this.syncCursors = {};
             this.users = null;
             this.keys = null;
             this.allKeys = null;
@@ -273,6 +355,22 @@ const pagination = {
 
 // Утилиты для работы с API
 const api = {
+    // Ответы GET-запросов с ETag: адрес -> { etag, data }.
+    // Повторный запрос отправляет If-None-Match, и на 304 возвращается сохранённый ответ
+    etagCache: new Map(),
+    
+    // Строка запроса из параметров (пустые значения пропускаются)
+    queryString: (params) => {
+        const query = new URLSearchParams();
+        Object.entries(params).forEach(([name, value]) => {
+            if (value !== null && value !== undefined && value !== '') {
+                query.append(name, value);
+            }
+        });
+        const result = query.toString();
+        return result ? `?${result}` : '';
+    },
+    
     // Отправка запроса
     request: async (endpoint, method = 'GET', data = null, includeToken = true) => {
         const headers = {
@@ -292,6 +390,11 @@ const api = {
             options.body = JSON.stringify(data);
         }
         
+        const cached = method === 'GET' ? api.etagCache.get(endpoint) : null;
+        if (cached) {
+            headers['If-None-Match'] = cached.etag;
+        }
+        
         console.log(`ОТЛАДКА API: Отправка запроса ${method} ${API_URL}${endpoint}`);
         
         // Улучшенное логирование запросов
@@ -308,6 +411,11 @@ const api = {
             // Логируем статус ответа
             window.appLogger.logInfo(`API ответ статус: ${response.status} ${response.statusText} для ${endpoint}`);
             
+            // Данные не изменились - тело не передавалось
+            if (response.status === 304 && cached) {
+                return structuredClone(cached.data);
+            }
+            
             // Клонируем ответ, чтобы можно было прочитать его несколько раз
             const responseClone = response.clone();
             
@@ -330,6 +438,10 @@ const api = {
             if (contentType && contentType.includes('application/json')) {
                 const jsonResponse = await response.json();
                 window.appLogger.logInfo(`API ответ данные: ${endpoint}`, jsonResponse);
+                const etag = response.headers.get('ETag');
+                if (method === 'GET' && etag) {
+                    api.etagCache.set(endpoint, { etag, data: structuredClone(jsonResponse) });
+                }
                 return jsonResponse;
             } else {
                 const responseText = await response.text();
@@ -416,8 +528,13 @@ const api = {
     },
     
     // Получение всех ключей (для админов)
-    getAllKeys: () => {
-        return api.request('/admin/keys');
+    getAllKeys: (params = {}) => {
+        return api.request('/admin/keys' + api.queryString(params));
+    },
+    
+    // Изменения таблицы админ-панели после курсора синхронизации (users, keys, invites)
+    getChanges: (table, since) => {
+        return api.request(`/admin/${table}/changes` + api.queryString({ since }));
     },
     
     // Отзыв ключа (для админов)
@@ -454,8 +571,8 @@ const api = {
     },
     
     // Получение списка пользователей (для админов и саппортов)
-    getUsers: () => {
-        return api.request('/admin/users');
+    getUsers: (params = {}) => {
+        return api.request('/admin/users' + api.queryString(params));
     },
     
     // Получение данных активности пользователей (для админов и саппортов)
@@ -463,6 +580,11 @@ const api = {
         return api.request('/admin/users/activity');
     },
     
+    // Активные загрузки модов и очередь (для админов)
+    getDownloads: () => {
+        return api.request('/admin/downloads');
+    },
+    
     // Бан пользователя
     banUser: (userId) => {
         return api.request(`/admin/users/${userId}/ban`, 'POST');
@@ -568,6 +690,18 @@ const utils = {
         return date.toLocaleString('ru-RU');
     },
     
+    // Форматирование размера в байтах
+    formatBytes: (bytes) => {
+        const units = ['Б', 'КБ', 'МБ', 'ГБ'];
+        let value = bytes;
+        let unit = 0;
+        while (value >= 1024 && unit < units.length - 1) {
+            value /= 1024;
+            unit++;
+        }
+        return `${value.toFixed(unit ? 1 : 0)} ${units[unit]}`;
+    },
+    
     // Форматирование оставшегося времени
     formatTimeLeft: (seconds) => {
         if (seconds <= 0) {
@@ -709,11 +843,9 @@ const navigation = {
                         console.error('Error loading discord status:', e);
                     }
                 } else if (page === 'admin') {
-                    try {
-                    loadAdminData();
-                    } catch (e) {
-                        console.error('Error loading admin data:', e);
-                    }
+                    adminModule.load()
+                        .then(() => loadAdminData())
+                        .catch(e => console.error('Error loading admin data:', e));
                 }
             } else if (page === 'home') {
                 const homePage = document.getElementById('home-page');
@@ -845,6 +977,7 @@ const auth = {
         token = null;
         userData = null;
         localStorage.removeItem('token');
+        api.etagCache.clear();
         
         try {
         // Скрытие элементов для авторизованных пользователей
@@ -1246,9 +1379,8 @@ async function generateInvite() {
         window.appLogger.logInfo("Ответ сервера при генерации приглашения", response);
         
         if (response && response.code) {
-            // Очищаем кэш и перезагружаем список приглашений
+            // Обновляем список приглашений (админ-панель запросит только изменения)
             window.appLogger.logInfo("Приглашение успешно создано:", response.code);
-            dataCache.clearCache('invites');
             
             // Определяем, в какой вкладке мы находимся
             let inAdminTab = false;
@@ -1263,6 +1395,7 @@ async function generateInvite() {
             try {
                 // Если мы в админке, обновляем список в админке
                 if (inAdminTab) {
+                    await adminModule.load();
                     await loadAdminInvites();
                 } else {
                     // Иначе обновляем обычный список приглашений
@@ -1339,725 +1472,6 @@ async function loadDiscordStatus() {
     }
 }
 
-// Загрузка админ-данных
-async function loadAdminData() {
-    // Загрузка списка пользователей
-    document.getElementById('users-loading').style.display = 'block';
-    document.getElementById('users-list').style.display = 'none';
-    
-    try {
-        let usersData;
-        
-        // Используем кэш, если он актуален
-        if (dataCache.isCacheValid('users')) {
-            usersData = { users: dataCache.users };
-        } else {
-            // Получаем данные активности пользователей
-            usersData = await api.getUsersActivity();
-            dataCache.updateCache('users', usersData.users);
-        }
-        
-        const users = usersData.users;
-        const tableBody = document.getElementById('users-table-body');
-        tableBody.innerHTML = '';
-        
-        // Фильтрация по поисковому запросу
-        const searchQuery = document.getElementById('users-search')?.value?.toLowerCase() || '';
-        let filteredUsers = users;
-        
-        if (searchQuery) {
-            filteredUsers = users.filter(user => 
-                user.username.toLowerCase().includes(searchQuery) || 
-                user.email.toLowerCase().includes(searchQuery) ||
-                (user.discord_username && user.discord_username.toLowerCase().includes(searchQuery))
-            );
-        }
-        
-        // Получаем только данные для текущей страницы
-        const pageUsers = pagination.getPageData('users', filteredUsers);
-        
-        // Отображаем текущую страницу данных
-        pageUsers.forEach(user => {
-            const row = document.createElement('tr');
-            row.innerHTML = `
-                <td>${user.id}</td>
-                <td>${user.username}</td>
-                <td>${user.email}</td>
-                <td>${utils.getUserRole(user)}</td>
-                <td>${user.discord_linked ? user.discord_username : 'Не привязан'}</td>
-                <td>${user.is_banned ? 'Заблокирован' : 'Активен'}</td>
-                <td>${user.last_login ? new Date(user.last_login).toLocaleString() : 'Никогда'}</td>
-                <td>${utils.formatIpAddress(user.last_ip)}</td>
-                <td><div class="action-buttons"></div></td>
-            `;
-            const actionsDiv = row.querySelector('.action-buttons');
-            
-            // Кнопка бан/разбан
-            if (userData && (userData.is_admin || userData.is_support)) {
-                if (user.is_banned) {
-                    const unbanUserBtn = document.createElement('button');
-                    unbanUserBtn.className = 'btn btn-success btn-sm ml-1';
-                    unbanUserBtn.textContent = 'Разбл';
-                    unbanUserBtn.title = 'Разблокировать пользователя';
-                    unbanUserBtn.addEventListener('click', async () => {
-                        try {
-                            await api.unbanUser(user.id);
-                            dataCache.clearCache('users');
-                            loadAdminData();
-                        } catch (error) {
-                            alert(`Ошибка разблокировки пользователя: ${error.message}`);
-                        }
-                    });
-                    actionsDiv.appendChild(unbanUserBtn);
-                } else {
-                    const banUserBtn = document.createElement('button');
-                    banUserBtn.className = 'btn btn-danger btn-sm ml-1';
-                    banUserBtn.textContent = 'Блок';
-                    banUserBtn.title = 'Заблокировать пользователя';
-                    banUserBtn.addEventListener('click', async () => {
-                        try {
-                            await api.banUser(user.id);
-                            dataCache.clearCache('users');
-                            loadAdminData();
-                        } catch (error) {
-                            alert(`Ошибка блокировки пользователя: ${error.message}`);
-                        }
-                    });
-                    actionsDiv.appendChild(banUserBtn);
-                }
-            }
-            
-            // Добавляем кнопку смены пароля для админов
-            if (userData && userData.is_admin) {
-                const changePasswordBtn = document.createElement('button');
-                changePasswordBtn.className = 'btn btn-info btn-sm ml-1';
-                changePasswordBtn.textContent = 'Пароль';
-                changePasswordBtn.title = 'Сменить пароль пользователя';
-                changePasswordBtn.addEventListener('click', (e) => {
-                    e.stopPropagation();
-                    showChangePasswordModal(user.id, user.username);
-                });
-                actionsDiv.appendChild(changePasswordBtn);
-            }
-            
-            if (user.discord_linked && userData && userData.is_admin) {
-                const unlinkBtn = document.createElement('button');
-                unlinkBtn.className = 'btn btn-warning btn-sm ml-1';
-                unlinkBtn.textContent = 'Отвязать Discord';
-                unlinkBtn.title = 'Отвязать Discord-аккаунт';
-                unlinkBtn.addEventListener('click', async (e) => {
-                    e.stopPropagation();
-                    if (confirm('Вы уверены, что хотите отвязать Discord у этого пользователя?')) {
-                        unlinkBtn.disabled = true;
-                        unlinkBtn.textContent = 'Отключение...';
-                        try {
-                            await api.unlinkDiscord(user.id);
-                            dataCache.clearCache('users');
-                            loadAdminData();
-                        } catch (error) {
-                            alert('Ошибка при отвязке Discord: ' + error.message);
-                            unlinkBtn.disabled = false;
-                            unlinkBtn.textContent = 'Отвязать Discord';
-                        }
-                    }
-                });
-                actionsDiv.appendChild(unlinkBtn);
-            }
-            if (userData && userData.is_admin) {
-                // Кнопки смены ролей
-                const makeAdminBtn = document.createElement('button');
-                makeAdminBtn.className = 'btn btn-primary btn-sm ml-1';
-                makeAdminBtn.textContent = 'A';
-                makeAdminBtn.title = 'Сделать администратором';
-                makeAdminBtn.addEventListener('click', async () => {
-                    try {
-                        await api.setUserRole(user.id, 'admin');
-                        dataCache.clearCache('users');
-                        loadAdminData();
-                    } catch (error) {
-                        alert(`Ошибка при назначении администратора: ${error.message}`);
-                    }
-                });
-                actionsDiv.appendChild(makeAdminBtn);
-
-                const makeSupportBtn = document.createElement('button');
-                makeSupportBtn.className = 'btn btn-info btn-sm ml-1';
-                makeSupportBtn.textContent = 'C';
-                makeSupportBtn.title = 'Сделать саппортом';
-                makeSupportBtn.addEventListener('click', async () => {
-                    try {
-                        await api.setUserRole(user.id, 'support');
-                        dataCache.clearCache('users');
-                        loadAdminData();
-                    } catch (error) {
-                        alert(`Ошибка при назначении саппорта: ${error.message}`);
-                    }
-                });
-                actionsDiv.appendChild(makeSupportBtn);
-
-                const makeUserBtn = document.createElement('button');
-                makeUserBtn.className = 'btn btn-secondary btn-sm ml-1';
-                makeUserBtn.textContent = 'Ю';
-                makeUserBtn.title = 'Сделать обычным пользователем';
-                makeUserBtn.addEventListener('click', async () => {
-                    try {
-                        await api.setUserRole(user.id, 'user');
-                        dataCache.clearCache('users');
-                        loadAdminData();
-                    } catch (error) {
-                        alert(`Ошибка при сбросе роли: ${error.message}`);
-                    }
-                });
-                actionsDiv.appendChild(makeUserBtn);
-                
-                // Кнопка удаления пользователя
-                const deleteUserBtn = document.createElement('button');
-                deleteUserBtn.className = 'btn btn-danger btn-sm ml-1';
-                deleteUserBtn.textContent = 'X';
-                deleteUserBtn.title = 'Удалить пользователя';
-                deleteUserBtn.addEventListener('click', async (e) => {
-                    e.stopPropagation();
-                    if (confirm(`Вы уверены, что хотите удалить пользователя ${user.username}?`)) {
-                        try {
-                            // Добавим API-метод для удаления пользователя если он будет создан
-                            alert('Функция удаления пользователя пока не реализована');
-                            // await api.deleteUser(user.id);
-                            // dataCache.clearCache('users');
-                            // loadAdminData();
-                        } catch (error) {
-                            alert(`Ошибка при удалении пользователя: ${error.message}`);
-                        }
-                    }
-                });
-                actionsDiv.appendChild(deleteUserBtn);
-            }
-            row.addEventListener('click', function(e) {
-                if (e.target.tagName === 'BUTTON' || e.target.closest('.action-buttons')) return;
-                document.querySelectorAll('#users-table tbody tr').forEach(r => r.classList.remove('active-row'));
-                row.classList.toggle('active-row');
-            });
-            tableBody.appendChild(row);
-        });
-        
-        // Добавляем пагинацию
-        const paginationContainer = document.getElementById('users-pagination');
-        if (paginationContainer) {
-            paginationContainer.innerHTML = pagination.generatePaginationHTML('users', filteredUsers.length);
-            
-            // Добавляем обработчики для кнопок пагинации
-            document.querySelectorAll('.pagination-link').forEach(link => {
-                link.addEventListener('click', function(e) {
-                    e.preventDefault();
-                    const type = this.getAttribute('data-type');
-                    const page = parseInt(this.getAttribute('data-page'));
-                    pagination.goToPage(type, page);
-                    loadAdminData(); // Перезагружаем с новой страницей
-                });
-            });
-        }
-        
-        document.getElementById('users-loading').style.display = 'none';
-        document.getElementById('users-list').style.display = 'block';
-        
-        // Загрузка приглашений в админке
-        loadAdminInvites();
-        
-        // Загрузка всех ключей
-        loadAllKeys();
-    } catch (error) {
-        console.error('Ошибка при загрузке списка пользователей:', error);
-        document.getElementById('users-loading').style.display = 'none';
-    }
-}
-
-
-// Функция для загрузки приглашений в админке
-async function loadAdminInvites() {    
-    try {
-        window.appLogger.logInfo("Начинаем загрузку приглашений в админке");
-        let invitesData = { invites: [] };
-        let limitsData = { global_limits: { admin: 0, support: 0, user: 0 } };
-        
-        // Очищаем кэш
-        dataCache.clearCache('invites');
-        dataCache.clearCache('inviteLimits');
-        
-        window.appLogger.logInfo("Запрашиваем новые данные для приглашений");
-        console.log("ОТЛАДКА: Запрашиваем данные приглашений из API");
-        
-        // Запрашиваем данные по очереди для более точной обработки ошибок
-        try {
-            limitsData = await api.getInviteLimits();
-            window.appLogger.logInfo("Получены данные лимитов", limitsData);
-        } catch (limitsError) {
-            window.appLogger.logError("Ошибка при загрузке лимитов", limitsError);
-            utils.showNotification('warning', 'Не удалось загрузить информацию о лимитах');
-        }
-        
-        try {
-            invitesData = await api.getInvites();
-            window.appLogger.logInfo("Получены данные приглашений", invitesData);
-            console.log("ОТЛАДКА: Полученный ответ API приглашений:", JSON.stringify(invitesData, null, 2));
-            console.log("ОТЛАДКА: Тип данных invites:", Array.isArray(invitesData.invites) ? "Массив" : typeof invitesData.invites);
-            console.log("ОТЛАДКА: Количество записей:", invitesData.invites ? invitesData.invites.length : 0);
-            if (invitesData.invites && invitesData.invites.length > 0) {
-                console.log("ОТЛАДКА: Структура первого приглашения:", JSON.stringify(invitesData.invites[0], null, 2));
-            }
-        } catch (invitesError) {
-            window.appLogger.logError("Ошибка при загрузке приглашений", invitesError);
-            console.error("ОТЛАДКА: Ошибка при загрузке приглашений:", invitesError);
-            utils.showNotification('warning', 'Не удалось загрузить список приглашений');
-        }
-        
-        window.appLogger.logInfo("Проверка данных приглашений и лимитов");
-        
-        // Проверяем, что данные лимитов получены в правильном формате
-        if (!limitsData || !limitsData.global_limits) {
-            window.appLogger.logError("Неверный формат данных лимитов:", limitsData);
-            // Создаем безопасную структуру данных по умолчанию
-            limitsData = { 
-                global_limits: { admin: 0, support: 0, user: 0 },
-                monthly_limit: 0,
-                used_invites: 0,
-                remaining_invites: 0
-            };
-        }
-        
-        // Проверяем, что данные приглашений получены в правильном формате
-        if (!invitesData || !invitesData.invites) {
-            window.appLogger.logError("Неверный формат данных приглашений:", invitesData);
-            invitesData = { invites: [] };
-            if (adminInvitesList) {
-                adminInvitesList.innerHTML = '<div class="alert alert-warning">Не удалось загрузить список приглашений. <button id="reload-admin-invites" class="btn btn-sm btn-primary ml-2">Попробовать снова</button></div>';
-                adminInvitesLoading.style.display = 'none';
-                adminInvitesList.style.display = 'block';
-                
-                // Добавляем обработчик для кнопки "Попробовать снова"
-                document.getElementById('reload-admin-invites')?.addEventListener('click', function() {
-                    // Очищаем кэш и запускаем повторную загрузку
-                    dataCache.clearCache('invites');
-                    loadAdminInvites();
-                    utils.showNotification('info', 'Обновление списка приглашений...');
-                });
-            }
-        } else if (!Array.isArray(invitesData.invites)) {
-            window.appLogger.logError("Неверный формат массива приглашений:", invitesData);
-            invitesData.invites = [];
-        }
-        
-        dataCache.updateCache('invites', invitesData.invites);
-        dataCache.updateCache('inviteLimits', limitsData);
-        
-        const invites = invitesData.invites;
-        window.appLogger.logInfo(`Количество загруженных приглашений: ${invites ? invites.length : 0}`);
-        
-        // Копируем значения лимитов в форму в админской вкладке ПриглОчки
-        const adminLimitValueAdmin = document.getElementById('admin-limit-value-admin');
-        const supportLimitValueAdmin = document.getElementById('support-limit-value-admin');
-        const userLimitValueAdmin = document.getElementById('user-limit-value-admin');
-        
-        if (adminLimitValueAdmin) adminLimitValueAdmin.value = limitsData.global_limits.admin;
-        if (supportLimitValueAdmin) supportLimitValueAdmin.value = limitsData.global_limits.support;
-        if (userLimitValueAdmin) userLimitValueAdmin.value = limitsData.global_limits.user;
-        
-        // Отображение приглашений
-        console.log("ОТЛАДКА: Перед отображением приглашений. Массив invites:", invites);
-        
-        if (!invites || invites.length === 0) {
-            window.appLogger.logInfo("Список приглашений пуст");
-            console.log("ОТЛАДКА: Приглашения отсутствуют или их длина равна 0");
-            
-            if (adminInvitesList) {
-                adminInvitesList.innerHTML = '<div class="alert alert-info">Нет приглашений для отображения. <button id="admin-create-invite" class="btn btn-primary btn-sm ml-2">Создать приглашение</button></div>';
-                adminInvitesList.style.display = 'block';
-                
-                // Добавляем обработчик для создания приглашения
-                document.getElementById('admin-create-invite')?.addEventListener('click', function() {
-                    generateInvite();
-                });
-            }
-            
-            // Отображаем пустую таблицу
-            if (adminInvitesLoading) adminInvitesLoading.style.display = 'none';
-            const tableBody = document.getElementById('admin-invites-table-body');
-            if (tableBody) tableBody.innerHTML = '<tr><td colspan="8" class="text-center">Нет приглашений для отображения</td></tr>';
-        } else {
-            console.log("ОТЛАДКА: Найдены приглашения, количество: " + invites.length);
-            // Фильтрация по поисковому запросу
-            const searchQuery = document.getElementById('admin-invites-search')?.value?.toLowerCase() || '';
-            let filteredInvites = invites;
-            
-            if (searchQuery) {
-                filteredInvites = invites.filter(invite => 
-                    invite.code.toLowerCase().includes(searchQuery) || 
-                    (invite.created_by && invite.created_by.username && invite.created_by.username.toLowerCase().includes(searchQuery)) ||
-                    (invite.used_by && invite.used_by.toLowerCase().includes(searchQuery))
-                );
-            }
-            
-            window.appLogger.logInfo("Отфильтрованные приглашения:", { total: filteredInvites.length });
-            
-            // Получаем данные только для текущей страницы
-            const pageInvites = pagination.getPageData('admin-invites', filteredInvites);
-            window.appLogger.logInfo("Приглашения для текущей страницы:", { count: pageInvites.length });
-            
-            const tableBody = document.getElementById('admin-invites-table-body');
-            
-            if (tableBody) {
-                tableBody.innerHTML = '';
-                
-                pageInvites.forEach(invite => {
-                    window.appLogger.logInfo("Добавление приглашения в таблицу", { id: invite.id, code: invite.code });
-                    const row = document.createElement('tr');
-                    const status = invite.used ? 'Использован' : 'Активен';
-                    
-                    // Добавляем чекбокс для выбора
-                    const checkboxCell = document.createElement('td');
-                    const checkbox = document.createElement('input');
-                    checkbox.type = 'checkbox';
-                    checkbox.className = 'admin-invite-checkbox';
-                    checkbox.dataset.inviteId = invite.id;
-                    checkbox.disabled = invite.used; // Нельзя выбрать использованные инвайты
-                    checkboxCell.appendChild(checkbox);
-                    row.appendChild(checkboxCell);
-                    
-                    // Создаем ячейки данных
-                    const codeCell = document.createElement('td');
-                    codeCell.textContent = invite.code;
-                    row.appendChild(codeCell);
-                    
-                    const createdCell = document.createElement('td');
-                    createdCell.textContent = utils.formatDate(invite.created_at);
-                    row.appendChild(createdCell);
-                    
-                    const expiresCell = document.createElement('td');
-                    expiresCell.textContent = utils.formatDate(invite.expires_at);
-                    row.appendChild(expiresCell);
-                    
-                    const statusCell = document.createElement('td');
-                    statusCell.textContent = status;
-                    row.appendChild(statusCell);
-                    
-                    const creatorCell = document.createElement('td');
-                    // Проверяем формат поля created_by (может быть объектом или строкой)
-                    if (invite.created_by && typeof invite.created_by === 'object' && invite.created_by.username) {
-                        creatorCell.textContent = invite.created_by.username;
-                    } else if (invite.created_by && typeof invite.created_by === 'string') {
-                        creatorCell.textContent = invite.created_by;
-                    } else {
-                        creatorCell.textContent = 'Неизвестно';
-                    }
-                    row.appendChild(creatorCell);
-                    
-                    const usedByCell = document.createElement('td');
-                    usedByCell.textContent = invite.used_by ? invite.used_by : 'Не использован';
-                    row.appendChild(usedByCell);
-                    
-                    // Добавляем ячейку действий
-                    const actionsCell = document.createElement('td');
-                    const actionsDiv = document.createElement('div');
-                    actionsDiv.className = 'action-buttons';
-                    actionsCell.appendChild(actionsDiv);
-                    
-                    // Добавляем кнопку удаления
-                    if (!invite.used) {
-                        const deleteBtn = document.createElement('button');
-                        deleteBtn.className = 'btn btn-danger btn-sm';
-                        deleteBtn.innerHTML = '<i class="fas fa-trash"></i>';
-                        deleteBtn.title = 'Удалить приглашение';
-                        deleteBtn.addEventListener('click', async (e) => {
-                            e.stopPropagation();
-                            if (confirm('Вы уверены, что хотите удалить это приглашение?')) {
-                                try {
-                                    await api.deleteInvite(invite.id);
-                                    dataCache.clearCache('invites');
-                                    loadAdminInvites();
-                } catch (error) {
-                                    alert(`Ошибка при удалении приглашения: ${error.message}`);
-                                }
-                            }
-                        });
-                        actionsDiv.appendChild(deleteBtn);
-                    }
-                    
-                    row.appendChild(actionsCell);
-                    tableBody.appendChild(row);
-                });
-            }
-            
-            // Добавляем пагинацию
-            const paginationContainer = document.getElementById('admin-invites-pagination');
-            if (paginationContainer) {
-                paginationContainer.innerHTML = pagination.generatePaginationHTML('admin-invites', filteredInvites.length);
-                
-                // Добавляем обработчики для кнопок пагинации
-                document.querySelectorAll('.pagination-link[data-type="admin-invites"]').forEach(link => {
-                    link.addEventListener('click', function(e) {
-                        e.preventDefault();
-                        const type = this.getAttribute('data-type');
-                        const page = parseInt(this.getAttribute('data-page'));
-                        pagination.goToPage(type, page);
-                        loadAdminInvites(); // Перезагружаем с новой страницей
-                    });
-                });
-            }
-        }
-    } catch (error) {
-        window.appLogger.logError('Ошибка при загрузке приглашений в админке:', error);
-        if (adminInvitesList) {
-            adminInvitesList.innerHTML = `
-                <div class="alert alert-danger">
-                    <h5>Ошибка при загрузке приглашений</h5>
-                    <p>${error.message}</p>
-                    <button id="retry-admin-invites-btn" class="btn btn-primary btn-sm">Попробовать снова</button>
-                </div>`;
-            adminInvitesList.style.display = 'block';
-            
-            // Добавляем обработчик для кнопки повторной загрузки
-            document.getElementById('retry-admin-invites-btn')?.addEventListener('click', function() {
-                dataCache.clearCache('invites');
-                loadAdminInvites();
-            });
-        }
-        
-        utils.showNotification('danger', `Ошибка при загрузке приглашений: ${error.message}`);
-    } finally {
-        if (adminInvitesLoading) adminInvitesLoading.style.display = 'none';
-    }
-
-// Добавляем функции для управления ролями пользователей
-function updateUsersList() {
-    loadAdminData();
-}
-
-function addRoleManagementButtons() {
-    document.querySelectorAll('.user-role-buttons').forEach(container => {
-        const userId = container.getAttribute('data-user-id');
-        
-        // Очищаем контейнер сначала
-        container.innerHTML = '';
-        
-        // Добавляем кнопки управления ролями
-        const makeAdminBtn = document.createElement('button');
-        makeAdminBtn.className = 'btn btn-primary btn-sm ml-1';
-        makeAdminBtn.style.padding = '0.2rem 0.4rem';
-        makeAdminBtn.style.fontSize = '0.75rem';
-        makeAdminBtn.textContent = 'A';
-        makeAdminBtn.title = 'Сделать администратором';
-        makeAdminBtn.addEventListener('click', async () => {
-            try {
-                await api.setUserRole(userId, 'admin');
-                updateUsersList();
-            } catch (error) {
-                alert(`Ошибка при назначении администратора: ${error.message}`);
-            }
-        });
-        
-        const makeSupportBtn = document.createElement('button');
-        makeSupportBtn.className = 'btn btn-info btn-sm ml-1';
-        makeSupportBtn.style.padding = '0.2rem 0.4rem';
-        makeSupportBtn.style.fontSize = '0.75rem';
-        makeSupportBtn.textContent = 'С';
-        makeSupportBtn.title = 'Сделать саппортом';
-        makeSupportBtn.addEventListener('click', async () => {
-            try {
-                await api.setUserRole(userId, 'support');
-                updateUsersList();
-            } catch (error) {
-                alert(`Ошибка при назначении саппорта: ${error.message}`);
-            }
-        });
-        
-        const makeUserBtn = document.createElement('button');
-        makeUserBtn.className = 'btn btn-secondary btn-sm ml-1';
-        makeUserBtn.style.padding = '0.2rem 0.4rem';
-        makeUserBtn.style.fontSize = '0.75rem';
-        makeUserBtn.textContent = 'Ю';
-        makeUserBtn.title = 'Сделать обычным пользователем';
-        makeUserBtn.addEventListener('click', async () => {
-            try {
-                await api.setUserRole(userId, 'user');
-                updateUsersList();
-            } catch (error) {
-                alert(`Ошибка при сбросе роли: ${error.message}`);
-            }
-        });
-        
-        container.appendChild(makeAdminBtn);
-        container.appendChild(makeSupportBtn);
-        container.appendChild(makeUserBtn);
-    });
-}
-
-// Загрузка всех ключей (для админов)
-async function loadAllKeys() {
-    const allKeysLoading = document.getElementById('all-keys-loading');
-    const allKeysList = document.getElementById('all-keys-list');
-    
-    if (allKeysLoading) allKeysLoading.style.display = 'block';
-    if (allKeysList) allKeysList.style.display = 'none';
-    
-    try {
-        let keysData;
-        
-        // Очищаем кэш для гарантии актуальности данных
-        dataCache.clearCache('allKeys');
-        
-        console.log("Запрашиваем данные всех ключей...");
-            keysData = await api.getAllKeys();
-        console.log("Получены данные ключей:", keysData);
-        
-        // Проверяем правильность формата данных
-        if (!keysData || !keysData.keys) {
-            console.error("Получены некорректные данные:", keysData);
-            throw new Error("Неверный формат данных от API");
-        }
-        
-        dataCache.updateCache('allKeys', keysData.keys);
-        
-        const keys = keysData.keys;
-        const tableBody = document.getElementById('all-keys-table-body');
-        if (!tableBody) {
-            console.error("Не найден элемент таблицы all-keys-table-body");
-            throw new Error("Элемент таблицы не найден");
-        }
-        
-        tableBody.innerHTML = '';
-        
-        // Фильтрация по поисковому запросу
-        const searchQuery = document.getElementById('all-keys-search')?.value?.toLowerCase() || '';
-        let filteredKeys = keys;
-        
-        if (searchQuery) {
-            filteredKeys = keys.filter(key => 
-                key.key.toLowerCase().includes(searchQuery) || 
-                (key.user && key.user.username.toLowerCase().includes(searchQuery))
-            );
-        }
-        
-        // Получаем данные только для текущей страницы
-        const pageKeys = pagination.getPageData('allKeys', filteredKeys);
-        
-        pageKeys.forEach(key => {
-            const row = document.createElement('tr');
-            const isActive = key.is_active ? 'Активен' : 'Отозван';
-            const status = key.is_active ? (key.time_left > 0 ? 'Активен' : 'Истёк') : 'Отозван';
-            
-            row.innerHTML = `
-                <td><input type="checkbox" class="key-checkbox" data-id="${key.id}"></td>
-                <td>${key.id}</td>
-                <td>${key.key}</td>
-                <td>${utils.formatDate(key.created_at)}</td>
-                <td>${utils.formatDate(key.expires_at)}</td>
-                <td>${utils.formatTimeLeft(key.time_left)}</td>
-                <td>${key.user ? key.user.username : 'Не привязан'}</td>
-                <td>${status}</td>
-                <td>
-                    ${key.is_active ? 
-                        `<button class="btn btn-danger btn-sm revoke-key-btn" data-id="${key.id}">Отозвать</button>` : 
-                        `<button class="btn btn-success btn-sm restore-key-btn" data-id="${key.id}">Восстановить</button>`
-                    }
-                </td>
-            `;
-            
-            tableBody.appendChild(row);
-        });
-        
-        // Добавляем пагинацию
-        const paginationContainer = document.getElementById('all-keys-pagination');
-        if (paginationContainer) {
-            paginationContainer.innerHTML = pagination.generatePaginationHTML('allKeys', filteredKeys.length);
-            
-            // Добавляем обработчики для кнопок пагинации
-            document.querySelectorAll('.pagination-link[data-type="allKeys"]').forEach(link => {
-                link.addEventListener('click', function(e) {
-                    e.preventDefault();
-                    const type = this.getAttribute('data-type');
-                    const page = parseInt(this.getAttribute('data-page'));
-                    pagination.goToPage(type, page);
-                    loadAllKeys(); // Перезагружаем с новой страницей
-                });
-            });
-        }
-        
-        // Добавляем обработчики для кнопок отзыва ключей
-        document.querySelectorAll('.revoke-key-btn').forEach(button => {
-            button.addEventListener('click', async () => {
-                const keyId = button.getAttribute('data-id');
-                if (confirm('Вы уверены, что хотите отозвать этот ключ?')) {
-                    try {
-                        button.disabled = true;
-                        button.textContent = 'Отзыв...';
-                        
-                        await api.revokeKey(keyId);
-                        dataCache.clearCache('allKeys'); // Очищаем кэш
-                        loadAllKeys(); // Перезагрузка списка после отзыва
-                    } catch (error) {
-                        alert(`Ошибка при отзыве ключа: ${error.message}`);
-                        button.disabled = false;
-                        button.textContent = 'Отозвать';
-                    }
-                }
-            });
-        });
-        
-        // Добавляем обработчики для кнопок восстановления ключей
-        document.querySelectorAll('.restore-key-btn').forEach(button => {
-            button.addEventListener('click', async () => {
-                const keyId = button.getAttribute('data-id');
-                if (confirm('Вы уверены, что хотите восстановить этот ключ?')) {
-                    try {
-                        button.disabled = true;
-                        button.textContent = 'Восстановление...';
-                        
-                        await api.restoreKey(keyId);
-                        dataCache.clearCache('allKeys'); // Очищаем кэш
-                        loadAllKeys(); // Перезагрузка списка после восстановления
-                    } catch (error) {
-                        alert(`Ошибка при восстановлении ключа: ${error.message}`);
-                        button.disabled = false;
-                        button.textContent = 'Восстановить';
-                    }
-                }
-            });
-        });
-        
-        // Обработчик для выбора всех ключей
-        const selectAllCheckbox = document.getElementById('select-all-keys');
-        if (selectAllCheckbox) {
-        selectAllCheckbox.checked = false;
-        selectAllCheckbox.addEventListener('change', () => {
-            const isChecked = selectAllCheckbox.checked;
-            document.querySelectorAll('.key-checkbox').forEach(checkbox => {
-                checkbox.checked = isChecked;
-            });
-        });
-        }
-        
-        if (allKeysList) allKeysList.style.display = 'block';
-        
-                } catch (error) {
-        console.error('Ошибка при загрузке ключей:', error);
-        const allKeysError = document.createElement('div');
-        allKeysError.className = 'alert alert-danger';
-        allKeysError.textContent = `Ошибка при загрузке ключей: ${error.message}`;
-        
-        if (allKeysList) {
-            allKeysList.innerHTML = '';
-            allKeysList.appendChild(allKeysError);
-            allKeysList.style.display = 'block';
-        }
-    } finally {
-        if (allKeysLoading) allKeysLoading.style.display = 'none';
-    }
-}
-
-// Вспомогательная функция для получения ID выбранных ключей
-function getSelectedKeyIds() {
-    const selectedCheckboxes = document.querySelectorAll('.key-checkbox:checked');
-    return Array.from(selectedCheckboxes).map(checkbox => parseInt(checkbox.getAttribute('data-id')));
-}
-
 // Утилиты для работы с темой
 const themeUtils = {
     // Проверяем предпочтительную тему пользователя
@@ -2150,229 +1564,22 @@ const i18n = {
     // Текущий язык
     currentLang: 'ru',
     
-    // Словари переводов
-    translations: {
-        'ru': {
-            // Общие
-            'app_name': 'ZalypaSPB',
-            'login': 'Вход',
-            'register': 'Регистрация',
-            'logout': 'Выход',
-            'home': 'Главная',
-            'keys': 'Ключи',
-            'invites': 'Приглашения',
-            'discord': 'Discord',
-            'admin': 'Админ-панель',
-            'loading': 'Загрузка...',
-            'save': 'Сохранить',
-            'cancel': 'Отмена',
-            'delete': 'Удалить',
-            'action_success': 'Операция выполнена успешно',
-            'action_error': 'Ошибка при выполнении операции',
-            'confirm_action': 'Вы уверены, что хотите выполнить это действие?',
-            'yes': 'Да',
-            'no': 'Нет',
-            'search': 'Поиск',
-            'export': 'Экспорт',
-            'columns': 'Колонки',
-            
-            // Пользователи
-            'username': 'Имя пользователя',
-            'email': 'Email',
-            'password': 'Пароль',
-            'confirm_password': 'Подтвердите пароль',
-            'role': 'Роль',
-            'status': 'Статус',
-            'last_login': 'Последний вход',
-            'ip_address': 'IP-адрес',
-            'actions': 'Действия',
-            'ban': 'Блокировать',
-            'unban': 'Разблокировать',
-            'banned': 'Заблокирован',
-            'active': 'Активен',
-            'admin_role': 'Администратор',
-            'support_role': 'Поддержка',
-            'user_role': 'Пользователь',
-            'make_admin': 'Сделать администратором',
-            'make_support': 'Сделать саппортом',
-            'make_user': 'Сделать пользователем',
-            'user_list': 'Список пользователей',
-            'discord_status': 'Discord',
-            'not_linked': 'Не привязан',
-            
-            // Ключи
-            'key': 'Ключ',
-            'created_at': 'Создан',
-            'expires_at': 'Истекает',
-            'time_left': 'Осталось',
-            'owner': 'Владелец',
-            'not_assigned': 'Не привязан',
-            'active_keys': 'Активные ключи',
-            'all_keys': 'Все ключи',
-            'revoke': 'Отозвать',
-            'restore': 'Восстановить',
-            'revoke_selected': 'Отозвать выбранные',
-            'restore_selected': 'Восстановить выбранные',
-            'delete_selected': 'Удалить выбранные',
-            'generate_key': 'Сгенерировать ключ',
-            'select_all': 'Выбрать все',
-            'no_keys': 'У вас нет активных ключей',
-            
-            // Приглашения
-            'code': 'Код',
-            'creator': 'Создатель',
-            'used_by': 'Использован',
-            'not_used': 'Не использован',
-            'my_invites': 'Мои приглашения',
-            'generate_invite': 'Создать приглашение',
-            'invite_limits': 'Лимиты приглашений',
-            'monthly_limit': 'Ежемесячный лимит',
-            'used_invites': 'Использовано приглашений',
-            'remaining_invites': 'Осталось приглашений',
-            'admin_invite_limits': 'Управление лимитами',
-            'admin_limit': 'Лимит для админов',
-            'support_limit': 'Лимит для саппортов',
-            'user_limit': 'Лимит для пользователей',
-            'no_invites': 'У вас нет приглашений',
-            
-            // Discord
-            'discord_integration': 'Интеграция с Discord',
-            'discord_instructions': 'Чтобы привязать аккаунт Discord, используйте команду в нашем боте:',
-            'discord_code': 'Ваш код привязки',
-            'discord_linked': 'Ваш аккаунт Discord успешно привязан',
-            'discord_username': 'Имя пользователя Discord',
-            'discord_commands': 'Команды бота',
-            'discord_command': 'Команда',
-            'discord_description': 'Описание',
-            
-            // Ошибки
-            'error_login': 'Ошибка входа. Проверьте имя пользователя и пароль.',
-            'error_register': 'Ошибка регистрации',
-            'error_empty_fields': 'Пожалуйста, заполните все поля',
-            'error_passwords_match': 'Пароли не совпадают',
-            'error_server': 'Ошибка сервера. Повторите попытку позже.',
-            
-            // Сообщения проверки пароля
-            'password_too_short': 'Пароль должен содержать не менее 8 символов',
-            'password_weak': 'Слабый пароль',
-            'password_medium': 'Средний пароль',
-            'password_strong': 'Надежный пароль',
-            'password_too_weak': 'Пароль слишком слабый. Используйте буквы, цифры и специальные символы',
-            'register_success': 'Регистрация прошла успешно!',
-            'error_validation': 'Ошибка валидации данных',
-            'error_unexpected': 'Произошла непредвиденная ошибка',
-            'error_access_denied': 'Доступ запрещен',
-        },
-        'en': {
-            // General
-            'app_name': 'ZalypaSPB',
-            'login': 'Login',
-            'register': 'Register',
-            'logout': 'Logout',
-            'home': 'Home',
-            'keys': 'Keys',
-            'invites': 'Invites',
-            'discord': 'Discord',
-            'admin': 'Admin Panel',
-            'loading': 'Loading...',
-            'save': 'Save',
-            'cancel': 'Cancel',
-            'delete': 'Delete',
-            'action_success': 'Operation completed successfully',
-            'action_error': 'Error performing operation',
-            'confirm_action': 'Are you sure you want to perform this action?',
-            'yes': 'Yes',
-            'no': 'No',
-            'search': 'Search',
-            'export': 'Export',
-            'columns': 'Columns',
-            
-            // Users
-            'username': 'Username',
-            'email': 'Email',
-            'password': 'Password',
-            'confirm_password': 'Confirm Password',
-            'role': 'Role',
-            'status': 'Status',
-            'last_login': 'Last Login',
-            'ip_address': 'IP Address',
-            'actions': 'Actions',
-            'ban': 'Ban',
-            'unban': 'Unban',
-            'banned': 'Banned',
-            'active': 'Active',
-            'admin_role': 'Administrator',
-            'support_role': 'Support',
-            'user_role': 'User',
-            'make_admin': 'Make Admin',
-            'make_support': 'Make Support',
-            'make_user': 'Make User',
-            'user_list': 'User List',
-            'discord_status': 'Discord',
-            'not_linked': 'Not Linked',
-            
-            // Keys
-            'key': 'Key',
-            'created_at': 'Created',
-            'expires_at': 'Expires',
-            'time_left': 'Time Left',
-            'owner': 'Owner',
-            'not_assigned': 'Not Assigned',
-            'active_keys': 'Active Keys',
-            'all_keys': 'All Keys',
-            'revoke': 'Revoke',
-            'restore': 'Restore',
-            'revoke_selected': 'Revoke Selected',
-            'restore_selected': 'Restore Selected',
-            'delete_selected': 'Delete Selected',
-            'generate_key': 'Generate Key',
-            'select_all': 'Select All',
-            'no_keys': 'You have no active keys',
-            
-            // Invites
-            'code': 'Code',
-            'creator': 'Creator',
-            'used_by': 'Used By',
-            'not_used': 'Not Used',
-            'my_invites': 'My Invites',
-            'generate_invite': 'Generate Invite',
-            'invite_limits': 'Invite Limits',
-            'monthly_limit': 'Monthly Limit',
-            'used_invites': 'Used Invites',
-            'remaining_invites': 'Remaining Invites',
-            'admin_invite_limits': 'Manage Limits',
-            'admin_limit': 'Admin Limit',
-            'support_limit': 'Support Limit',
-            'user_limit': 'User Limit',
-            'no_invites': 'You have no invites',
-            
-            // Discord
-            'discord_integration': 'Discord Integration',
-            'discord_instructions': 'To link your Discord account, use the command in our bot:',
-            'discord_code': 'Your link code',
-            'discord_linked': 'Your Discord account is successfully linked',
-            'discord_username': 'Discord Username',
-            'discord_commands': 'Bot Commands',
-            'discord_command': 'Command',
-            'discord_description': 'Description',
-            
-            // Errors
-            'error_login': 'Login error. Check your username and password.',
-            'error_register': 'Registration error',
-            'error_empty_fields': 'Please fill all fields',
-            'error_passwords_match': 'Passwords do not match',
-            'error_server': 'Server error. Please try again later.',
-            
-            // Password check messages
-            'password_too_short': 'Password must be at least 8 characters long',
-            'password_weak': 'Weak password',
-            'password_medium': 'Medium password',
-            'password_strong': 'Strong password',
-            'password_too_weak': 'Password is too weak. Use letters, numbers and special characters',
-            'register_success': 'Registration successful!',
-            'error_validation': 'Data validation error',
-            'error_unexpected': 'An unexpected error occurred',
-            'error_access_denied': 'Access denied',
+    // Словари переводов загружаются по требованию из i18n/<язык>.json
+    translations: {},
+    
+    // Загрузка словаря языка (один раз на язык)
+    loadLanguage: async function(lang) {
+        if (this.translations[lang]) {
+            return;
+        }
+        try {
+            const response = await fetch(assets.url(`i18n/${lang}.json`));
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            this.translations[lang] = await response.json();
+        } catch (error) {
+            console.error('Error loading translations for language:', lang, error);
         }
     },
     
@@ -2392,10 +1599,11 @@ const i18n = {
     },
     
     // Установка языка
-    setLanguage: function(lang) {
+    setLanguage: async function(lang) {
         try {
             if (this.languages[lang]) {
                 console.log('Setting language to:', lang);
+                await this.loadLanguage(lang);
                 this.currentLang = lang;
                 localStorage.setItem('language', lang);
                 this.updatePageText();
@@ -2485,7 +1693,7 @@ const i18n = {
     },
     
     // Инициализация
-    init: function() {
+    init: async function() {
         try {
             console.log('Initializing i18n system...');
             
@@ -2499,6 +1707,8 @@ const i18n = {
                 this.currentLang = this.languages[browserLang] ? browserLang : 'ru';
             }
             
+            await this.loadLanguage(this.currentLang);
+            
             // Добавляем переключатель языка
             this.addLanguageSwitcher();
             
@@ -2519,7 +1729,7 @@ async function initApp() {
         
         // Инициализируем системы
         themeUtils.init();
-        i18n.init();
+        await i18n.init();
         
         // Показываем первое сообщение через logger после его инициализации
         window.appLogger.logInfo("Инициализация приложения...");
@@ -2558,12 +1768,6 @@ async function initApp() {
         // Настройка обработчиков событий
         setupEventHandlers();
         
-        // Настройка обработчиков для логов
-        setupLogHandlers();
-        
-        // Настройка обработчиков админ-панели
-        setupAdminEventHandlers();
-        
         window.appLogger.logInfo("Инициализация приложения завершена успешно");
     } catch (error) {
         console.error("Error during app initialization:", error);
@@ -2881,91 +2085,6 @@ function setupEventHandlers() {
     }
 }
 
-// Добавляем обработчики для системы логов
-function setupLogHandlers() {
-    // Очистка логов
-    document.getElementById('clear-logs-btn')?.addEventListener('click', () => {
-        if (confirm('Вы уверены, что хотите очистить все логи?')) {
-            window.appLogger.clearLogs();
-        }
-    });
-    
-    // Переключение автоскролла
-    const autoScrollBtn = document.getElementById('toggle-auto-scroll-logs');
-    let autoScroll = true;
-    
-    autoScrollBtn?.addEventListener('click', () => {
-        autoScroll = !autoScroll;
-        autoScrollBtn.innerHTML = autoScroll ? 
-            '<i class="fas fa-scroll"></i> Авто-прокрутка: ВКЛ' : 
-            '<i class="fas fa-scroll"></i> Авто-прокрутка: ВЫКЛ';
-        
-        if (autoScroll) {
-            const logContainer = document.getElementById('admin-log-container');
-            if (logContainer) {
-                logContainer.scrollTop = 0; // Скролл в начало, так как логи отображаются в обратном порядке
-            }
-        }
-    });
-    
-    // Фильтрация логов
-    document.getElementById('filter-all-logs')?.addEventListener('click', function() {
-        filterLogs('all');
-        setActiveFilterButton(this);
-    });
-    
-    document.getElementById('filter-info-logs')?.addEventListener('click', function() {
-        filterLogs('info');
-        setActiveFilterButton(this);
-    });
-    
-    document.getElementById('filter-warning-logs')?.addEventListener('click', function() {
-        filterLogs('warning');
-        setActiveFilterButton(this);
-    });
-    
-    document.getElementById('filter-error-logs')?.addEventListener('click', function() {
-        filterLogs('danger');
-        setActiveFilterButton(this);
-    });
-    
-    // Поиск в логах
-    document.getElementById('log-search')?.addEventListener('input', debounce(function() {
-        filterLogs(currentLogFilter, this.value);
-    }, 300));
-    
-    // Обработчик загрузки логов при открытии вкладки
-    document.getElementById('logs-tab')?.addEventListener('click', () => {
-        window.appLogger.updateLogDisplay();
-    });
-}
-
-// Глобальная переменная для текущего фильтра логов
-let currentLogFilter = 'all';
-
-// Функция для установки активной кнопки фильтра
-function setActiveFilterButton(buttonElement) {
-    document.querySelectorAll('.btn-group button').forEach(btn => {
-        btn.classList.remove('active');
-    });
-    buttonElement.classList.add('active');
-}
-
-// Функция для фильтрации логов
-function filterLogs(type = 'all', searchText = '') {
-    currentLogFilter = type;
-    
-    const logEntries = document.querySelectorAll('.log-entry');
-    const searchLower = searchText.toLowerCase();
-    
-    logEntries.forEach(entry => {
-        let showByType = type === 'all' || entry.classList.contains(`alert-${type}`);
-        let showBySearch = !searchText || entry.textContent.toLowerCase().includes(searchLower);
-        
-        entry.style.display = showByType && showBySearch ? 'block' : 'none';
-    });
-}
-
 // Запуск приложения при загрузке страницы уже есть в другом месте кода 
 
 // Утилиты для экспорта данных
@@ -3092,7 +2211,7 @@ const tableUtils = {
         if (!table) return;
         
         const headerCells = table.querySelectorAll('thead th');
-        const rows = table.querySelectorAll('tbody tr');
+        const rows = table.querySelectorAll('tbody tr:not(.virtual-spacer)');
         
         // Применяем к заголовкам
         headerCells.forEach((cell, index) => {
@@ -3140,13 +2259,13 @@ const tableUtils = {
         // Поиск пользователей
         document.getElementById('users-search')?.addEventListener('input', debounce(() => {
             pagination.resetPage('users');
-            loadAdminData();
+            adminModule.load().then(() => loadAdminData());
         }, 300));
         
         // Поиск всех ключей
         document.getElementById('all-keys-search')?.addEventListener('input', debounce(() => {
             pagination.resetPage('allKeys');
-            loadAllKeys();
+            adminModule.load().then(() => loadAllKeys());
         }, 300));
         
         // Поиск личных ключей
@@ -3602,77 +2721,6 @@ if (usernameDisplay) {
 }
 // Это закомментировано, так как вызывает ошибку - переменная row не определена в этом контексте
 
-// Добавим функцию showChangePasswordModal
-function showChangePasswordModal(userId, username) {
-    // Удаляем старое модальное окно если есть
-    document.getElementById('admin-change-password-modal')?.remove();
-    const modal = document.createElement('div');
-    modal.id = 'admin-change-password-modal';
-    modal.innerHTML = `
-    <div class="modal fade show" tabindex="-1" style="display:block; background:rgba(0,0,0,0.5);">
-      <div class="modal-dialog">
-        <div class="modal-content">
-          <div class="modal-header">
-            <h5 class="modal-title">Смена пароля для пользователя: ${username}</h5>
-            <button type="button" class="close" id="close-admin-change-password-modal">&times;</button>
-          </div>
-          <div class="modal-body">
-            <input type="password" class="form-control mb-2" id="admin-new-password" placeholder="Новый пароль">
-            <input type="password" class="form-control mb-2" id="admin-confirm-password" placeholder="Подтвердите пароль">
-            <div class="alert alert-danger" id="admin-change-password-error" style="display:none"></div>
-          </div>
-          <div class="modal-footer">
-            <button class="btn btn-secondary" id="close-admin-change-password-modal2">Отмена</button>
-            <button class="btn btn-primary" id="admin-change-password-submit">Сменить</button>
-          </div>
-        </div>
-      </div>
-    </div>`;
-    document.body.appendChild(modal);
-    // Закрытие
-    const closeModal = () => modal.remove();
-    document.getElementById('close-admin-change-password-modal').onclick = closeModal;
-    document.getElementById('close-admin-change-password-modal2').onclick = closeModal;
-    // Сабмит
-    document.getElementById('admin-change-password-submit').onclick = async () => {
-        const newPassword = document.getElementById('admin-new-password').value;
-        const confirmPassword = document.getElementById('admin-confirm-password').value;
-        const errorDiv = document.getElementById('admin-change-password-error');
-        errorDiv.style.display = 'none';
-        if (newPassword !== confirmPassword) {
-            errorDiv.textContent = 'Пароли не совпадают';
-            errorDiv.style.display = 'block';
-            return;
-        }
-        if (newPassword.length < 8) {
-            errorDiv.textContent = 'Пароль слишком короткий';
-            errorDiv.style.display = 'block';
-            return;
-        }
-        try {
-            await api.adminChangeUserPassword(userId, newPassword);
-            notifications.show('Пароль успешно изменён', 'success');
-            closeModal();
-        } catch (e) {
-            errorDiv.textContent = e.message;
-            errorDiv.style.display = 'block';
-        }
-    };
-}
-
-// Обработчики переключения вкладок администратора
-document.querySelector('#all-keys-tab')?.addEventListener('click', loadAllKeys);
-
-// Настройка обработчиков админ-панели
-function setupAdminEventHandlers() {
-    // Обработчики для админ-панели (если они требуются)
-    document.querySelector('#all-keys-tab')?.addEventListener('click', loadAllKeys);
-    document.querySelector('#users-tab')?.addEventListener('click', () => {
-        updateUsersList();
-    });
-    document.querySelector('#invites-admin-tab')?.addEventListener('click', loadAdminInvites);
-}
-
 // Обработчик поиска ключей
 
 // Запуск приложения при загрузке страницы
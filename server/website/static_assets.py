@@ -0,0 +1,171 @@
+import os
+import re
+import sys
+import json
+import gzip
+import hashlib
+import logging
+
+# brotli - необязательная зависимость: без неё статика сжимается только gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Директория (внутри static) для копий файлов с хешем содержимого в имени
+BUILD_DIR = "dist"
+
+# Директории static, которые не относятся к SPA: моды, загрузки лоадера и сама сборка
+EXCLUDED_DIRS = {"mods", "downloads", BUILD_DIR}
+
+# Файлы, которые получают отпечаток в имени и кэшируются браузером навсегда
+FINGERPRINT_EXTENSIONS = {".js", ".css", ".json", ".svg", ".png", ".jpg", ".ico", ".woff", ".woff2"}
+
+# Текстовые файлы, для которых заранее создаются сжатые копии
+COMPRESSIBLE_EXTENSIONS = {".js", ".css", ".json", ".svg", ".html"}
+
+# Порядок - приоритет выбора сжатой копии
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+# Ссылки на локальные файлы в index.html: href="css/style.css", src="js/app.js"
+ASSET_REFERENCE = re.compile(r'(href|src)="(?!https?:|//|/|#|data:)([^"?#]+)"')
+
+
+def available_encodings():
+    return [e for e in ENCODING_SUFFIXES if e != "br" or brotli]
+
+
+def compress_data(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def write_file(path, data):
+    """Атомарно записывает файл (несколько воркеров могут собирать статику одновременно)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class StaticAssets:
+    """
+    Сборка статики SPA: файлы копируются в BUILD_DIR под именами с хешем содержимого
+    (js/app.js -> dist/js/app.3f2a9c1b7d.js) вместе со сжатыми копиями,
+    а index.html переписывается на эти имена. Такие файлы никогда не меняются,
+    поэтому отдаются с Cache-Control: immutable, а index.html - с проверкой по ETag.
+    """
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        # Исходный путь -> путь с отпечатком
+        self.mapping = {}
+        # Путь с отпечатком -> доступные сжатые копии
+        self.assets = {}
+        # Собранный index.html: {"etag", "body", "encodings": {кодировка: данные}}
+        self.index = None
+
+    def iter_sources(self):
+        for root, dirs, files in os.walk(self.static_folder):
+            relative_root = os.path.relpath(root, self.static_folder)
+            if relative_root == ".":
+                dirs[:] = [d for d in dirs if d not in EXCLUDED_DIRS and not d.startswith('.')]
+            else:
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+            for name in files:
+                if name.startswith('.') or os.path.splitext(name)[1] not in FINGERPRINT_EXTENSIONS:
+                    continue
+                path = os.path.normpath(os.path.join(relative_root, name))
+                yield path.replace(os.sep, "/")
+
+    def build(self):
+        """Создаёт копии с отпечатками, удаляет устаревшие и собирает index.html"""
+        mapping = {}
+        assets = {}
+
+        for source in self.iter_sources():
+            with open(os.path.join(self.static_folder, source), 'rb') as f:
+                data = f.read()
+
+            stem, extension = os.path.splitext(source)
+            fingerprinted = f"{BUILD_DIR}/{stem}.{hashlib.sha256(data).hexdigest()[:10]}{extension}"
+            target = os.path.join(self.static_folder, fingerprinted)
+
+            encodings = []
+            if extension in COMPRESSIBLE_EXTENSIONS:
+                for encoding in available_encodings():
+                    compressed_target = target + ENCODING_SUFFIXES[encoding]
+                    if not os.path.exists(compressed_target):
+                        write_file(compressed_target, compress_data(data, encoding))
+                    encodings.append(encoding)
+
+            # Имя определяется содержимым, поэтому существующий файл пересобирать не нужно
+            if not os.path.exists(target):
+                write_file(target, data)
+
+            mapping[source] = fingerprinted
+            assets[fingerprinted] = encodings
+
+        self.remove_stale(assets)
+        self.mapping = mapping
+        self.assets = assets
+        self.index = self.render_index()
+        logger.info(f"Статика собрана: {len(assets)} файлов")
+
+    def remove_stale(self, assets):
+        """Удаляет копии прежних версий файлов"""
+        build_root = os.path.join(self.static_folder, BUILD_DIR)
+        keep = set()
+        for fingerprinted in assets:
+            keep.add(fingerprinted)
+            for suffix in ENCODING_SUFFIXES.values():
+                keep.add(fingerprinted + suffix)
+
+        for root, _, files in os.walk(build_root):
+            for name in files:
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, self.static_folder).replace(os.sep, "/")
+                if relative not in keep and not name.startswith('.'):
+                    os.remove(path)
+
+    def render_index(self):
+        """index.html со ссылками на файлы с отпечатками и картой ресурсов для динамической загрузки"""
+        with open(os.path.join(self.static_folder, "index.html"), 'r', encoding='utf-8') as f:
+            html = f.read()
+
+        html = ASSET_REFERENCE.sub(
+            lambda m: f'{m.group(1)}="{self.mapping.get(m.group(2), m.group(2))}"',
+            html
+        )
+        # Карта исходных путей для файлов, которые SPA подгружает сама (fetch, import)
+        asset_map = f"<script>window.ASSET_MAP = {json.dumps(self.mapping, sort_keys=True)};</script>"
+        html = html.replace("</head>", f"    {asset_map}\n</head>", 1)
+
+        body = html.encode('utf-8')
+        return {
+            "etag": hashlib.sha256(body).hexdigest()[:16],
+            "body": body,
+            "encodings": {encoding: compress_data(body, encoding) for encoding in available_encodings()}
+        }
+
+    def is_fingerprinted(self, path):
+        return path in self.assets
+
+    def choose_encoding(self, path, accepted):
+        """Выбирает сжатую копию файла (или index.html при path=None) по кодировкам клиента"""
+        encodings = self.index["encodings"] if path is None else self.assets.get(path, [])
+        for encoding in ENCODING_SUFFIXES:
+            if encoding in accepted and encoding in encodings:
+                return encoding
+        return None
+
+
+if __name__ == "__main__":
+    # Шаг сборки перед выкладкой: python static_assets.py [директория_static]
+    logging.basicConfig(level=logging.INFO)
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+    StaticAssets(folder).build()